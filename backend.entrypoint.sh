@@ -14,6 +14,7 @@ echo "PostgreSQL is ready - continuing..."
 python manage.py collectstatic --noinput
 python manage.py makemigrations
 python manage.py migrate
+python manage.py backfill_playback
 python manage.py create_placeholders
 
 python manage.py shell <<EOF
@@ -34,4 +35,4 @@ EOF
 
 python manage.py rqworker default &
 
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000
+exec gunicorn -c gunicorn.conf.py
@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point: gunicorn.conf.py serves it with Uvicorn
+workers, and the streaming views in videos.views run natively on it.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -61,6 +62,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
@@ -178,6 +180,102 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media storage backend: "local" (media volume) or "s3" (any S3-compatible
+# bucket such as MinIO, requires django-storages[s3]).
+MEDIA_STORAGE_BACKEND = os.environ.get('MEDIA_STORAGE_BACKEND', 'local').lower()
+
+if MEDIA_STORAGE_BACKEND == 's3':
+    MEDIA_STORAGE = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.environ.get('MEDIA_S3_BUCKET', 'videoflix-media'),
+            "endpoint_url": os.environ.get('MEDIA_S3_ENDPOINT_URL') or None,
+            "access_key": os.environ.get('MEDIA_S3_ACCESS_KEY'),
+            "secret_key": os.environ.get('MEDIA_S3_SECRET_KEY'),
+            "region_name": os.environ.get('MEDIA_S3_REGION') or None,
+            "custom_domain": os.environ.get('MEDIA_S3_CUSTOM_DOMAIN') or None,
+            "querystring_auth": False,
+            "file_overwrite": True,
+        },
+    }
+else:
+    MEDIA_STORAGE = {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    }
+
+STORAGES = {
+    "default": MEDIA_STORAGE,
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# Segment and source delivery. "" streams files from Django (sendfile through
+# the WSGI file wrapper). "x-accel" returns X-Accel-Redirect for nginx, e.g.
+#   location /protected-media/ { internal; alias /app/media/; }
+# and "x-sendfile" returns X-Sendfile for Apache/lighttpd (local storage only).
+MEDIA_OFFLOAD = {
+    'MODE': os.environ.get('MEDIA_OFFLOAD', ''),
+    'ACCEL_PREFIX': os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/'),
+}
+
+# Rewritten HLS manifests: entries kept per process and seconds in Redis
+HLS_MANIFEST_CACHE = {
+    'LOCAL_ENTRIES': 512,
+    'TIMEOUT': 3600,
+}
+
+# Stream catalog (video/resolution -> storage prefix) lifetimes in seconds
+STREAM_CATALOG = {
+    'TIMEOUT': 24 * 3600,
+    'NEGATIVE_TIMEOUT': 30,
+    'LOCAL_TIMEOUT': 5,
+    'LOCAL_ENTRIES': 4096,
+}
+
+# Catalog search: PostgreSQL full-text search ranked by title/description
+# weight plus typo-tolerant trigram title matching (icontains elsewhere)
+VIDEO_SEARCH = {
+    'FULL_TEXT': os.environ.get('VIDEO_SEARCH_FULL_TEXT', 'True').lower() == 'true',
+    'MAX_RESULTS': 100,
+}
+
+# Search-as-you-type title suggestions: Redis key of the prefix index and
+# number of suggestions returned (default and maximum)
+VIDEO_SUGGESTIONS = {
+    'KEY': 'video_suggestions',
+    'LIMIT': 8,
+    'MAX_LIMIT': 20,
+}
+
+# Dashboard cache lifetimes in seconds: shared rails and hero video
+# (invalidated on every catalog change) and per-user continue-watching
+DASHBOARD_CACHE = {
+    'TIMEOUT': 3600,
+    'USER_TIMEOUT': 300,
+}
+
+# On-disk LRU cache of HLS segments on each web node, used with remote
+# storage only; the first segments of a video are pre-warmed per node
+SEGMENT_CACHE = {
+    'ENABLED': os.environ.get('SEGMENT_CACHE', 'False').lower() == 'true',
+    'DIR': os.environ.get('SEGMENT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'videoflix-segments'),
+    'MAX_BYTES': int(os.environ.get('SEGMENT_CACHE_MAX_MB', 2048)) * 1024 * 1024,
+    'PREWARM_SEGMENTS': 3,
+    'FETCH_TIMEOUT': 30,
+}
+
+# HMAC-signed segment URLs: lifetime in seconds and rounding of expiry times
+# (one URL per rendition and bucket, so manifests and edges can cache them)
+SIGNED_STREAM_URLS = {
+    'ENABLED': os.environ.get('SIGNED_STREAM_URLS', 'True').lower() == 'true',
+    'TTL': 4 * 3600,
+    'BUCKET': 600,
+}
+
+# Local scratch directory for encoding with remote storage (system temp dir if unset)
+MEDIA_WORK_DIR = os.environ.get('MEDIA_WORK_DIR') or None
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
@@ -246,12 +344,60 @@ FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://127.0.0.1:5500')
 
 AUTH_USER_MODEL = 'authentication.CustomUser'
 
+# Encoding ladder read by every encoder (see videos/encoding.py).
+# Each profile may set: width, height, codec (h264, hevc, av1), preset,
+# rate_control (crf, vbr, cbr), crf, bitrate (cap/target), audio_bitrate
+# and segment_duration. Example bandwidth-saving tier:
+#   '1080p-hevc': {'width': 1920, 'height': 1080, 'codec': 'hevc', 'crf': 24, 'bitrate': '3500k'}
+# The whole ladder can also be supplied as JSON in the VIDEO_QUALITIES env var.
 VIDEO_QUALITIES = {
-    '120p': {'width': 160, 'height': 120, 'bitrate': '200k'},
-    '360p': {'width': 640, 'height': 360, 'bitrate': '800k'},
-    '720p': {'width': 1280, 'height': 720, 'bitrate': '2500k'},
-    '1080p': {'width': 1920, 'height': 1080, 'bitrate': '5000k'},
+    '480p': {'width': 640, 'height': 360, 'codec': 'h264', 'preset': 'medium', 'crf': 32, 'bitrate': '400k'},
+    '720p': {'width': 1280, 'height': 720, 'codec': 'h264', 'preset': 'medium', 'crf': 23, 'bitrate': '2000k'},
+    '1080p': {'width': 1920, 'height': 1080, 'codec': 'h264', 'preset': 'medium', 'crf': 18, 'bitrate': '6000k'},
+}
+
+if os.environ.get('VIDEO_QUALITIES'):
+    import json
+    VIDEO_QUALITIES = json.loads(os.environ['VIDEO_QUALITIES'])
+
+PER_TITLE_ENCODING = {
+    'ENABLED': os.environ.get('PER_TITLE_ENCODING', 'True').lower() == 'true',
+    'SAMPLE_SECONDS': 4,
+    'SAMPLE_POINTS': [0.1, 0.5, 0.9],
+    'PROBE_HEIGHT': 240,
+    'REFERENCE_KBPS': 300,
+    'MIN_FACTOR': 0.4,
+    'MAX_FACTOR': 1.6,
+}
+
+UPLOAD_PREFLIGHT = {
+    'ENABLED': os.environ.get('UPLOAD_PREFLIGHT', 'True').lower() == 'true',
+    'TIMEOUT': 10,
+    'PROBE_SIZE': 5 * 1024 * 1024,
+    'ANALYZE_DURATION': 5 * 1000 * 1000,
 }
 
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'videos.upload_handlers.HashingMemoryFileUploadHandler',
+    'videos.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Multipart uploads larger than this are streamed to a temporary file
+# instead of being held in memory by the web worker.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024
+
+# Part files of chunked uploads live on the local disk of the web container.
+# Streaming ingest reads them from an RQ worker, so it only runs with local
+# media storage (web and workers share the media volume); with S3 storage,
+# streaming sessions are encoded by the regular pipeline after finalizing.
+CHUNKED_UPLOAD = {
+    'DIR': MEDIA_ROOT / 'uploads',
+    'CHUNK_SIZE': 8 * 1024 * 1024,
+    'MIN_CHUNK_SIZE': 256 * 1024,
+    'MAX_CHUNK_SIZE': 64 * 1024 * 1024,
+    'MAX_SIZE': 20 * 1024 * 1024 * 1024,
+    'EXPIRY_HOURS': 24,
+    'STREAM_POLL_INTERVAL': 0.5,
+    'STREAM_IDLE_TIMEOUT': 300,
+}
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024
@@ -0,0 +1,40 @@
+"""
+Gunicorn server profile.
+
+The application runs as ASGI (``core.asgi``) under Uvicorn workers: one
+event loop per core handles many concurrent, mostly idle streaming
+connections. ``GUNICORN_WORKER_CLASS=gthread`` switches back to threaded
+WSGI workers (``core.wsgi``), sized at two per core plus one.
+
+Every setting can be overridden with the environment variables below.
+"""
+
+import os
+import multiprocessing
+
+cores = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+
+if worker_class == 'uvicorn_worker.UvicornWorker':
+    default_workers = cores
+    wsgi_app = 'core.asgi:application'
+else:
+    default_workers = cores * 2 + 1
+    wsgi_app = 'core.wsgi:application'
+
+workers = int(os.getenv('GUNICORN_WORKERS') or default_workers)
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Players fetch a segment every few seconds; keep their connections open
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+
+# Recycle workers periodically (jittered so they don't restart together)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+accesslog = '-'
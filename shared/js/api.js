@@ -80,7 +80,7 @@ async function postData(endpoint, data) {
  * @returns {Promise<Response>} Fetch response object.
  */
 async function getData(uid, token) {
-    const endpoint = (uid && token) ? `activate/${uid}/${token}/` : `video/`
+    const endpoint = (uid && token) ? `activate/${uid}/${token}/` : `video/?legacy=1`
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
         method: 'GET',
         headers: {
@@ -2,7 +2,10 @@
 from django.contrib import admin
 from django.contrib import messages
 from django_rq import get_queue
+from .dashboard import invalidate_dashboard
 from .models import Video, Genre
+from .stream_catalog import refresh_stream_entry
+from .suggestions import update_suggestions
 from .utils import process_video_task
 
 
@@ -15,7 +18,12 @@ class GenreAdmin(admin.ModelAdmin):
 @admin.action(description="Mark selected videos as processed")
 def mark_as_processed(modeladmin, request, queryset):
     """Mark selected videos as processed."""
+    video_ids = list(queryset.values_list('id', flat=True))
     updated = queryset.update(is_processed=True)
+    for video_id in video_ids:
+        refresh_stream_entry(video_id)
+        update_suggestions(video_id)
+    invalidate_dashboard()
     messages.success(request, f'{updated} videos marked as processed.')
 
 
@@ -40,6 +48,6 @@ class VideoAdmin(admin.ModelAdmin):
     list_filter = ("is_processed", "genre", "created_at")
     search_fields = ("title", "uploaded_by__email")
     ordering = ("-created_at",)
-    fields = ("title", "description", "genre", "video_file", "thumbnail", "is_processed", "uploaded_by")
-    readonly_fields = ("uploaded_by",)
+    fields = ("title", "description", "genre", "video_file", "thumbnail", "is_processed", "uploaded_by", "complexity_score", "encoding_ladder")
+    readonly_fields = ("uploaded_by", "complexity_score", "encoding_ladder")
     actions = [mark_as_processed, queue_video_processing]
@@ -1,6 +1,16 @@
+import re
 from rest_framework import serializers
-from ..models import Video, Genre, VideoQuality, WatchProgress
-from ..utils import is_video_file
+from django.conf import settings
+from django.utils import timezone
+from django.utils.duration import duration_string
+from rest_framework.settings import ISO_8601, api_settings
+from ..models import Video, Genre, WatchProgress, UploadSession
+from ..utils import (
+    is_video_file, compute_content_hash, duplicate_video_fields,
+    find_processed_duplicate, reuse_renditions,
+    preflight_uploaded_file, VideoPreflightError
+)
+from ..playback import PLAYBACK_VERSION, get_playback
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -13,41 +23,88 @@ class GenreSerializer(serializers.ModelSerializer):
         read_only_fields = ['slug']
 
 
-class VideoQualitySerializer(serializers.ModelSerializer):
+PLACEHOLDER_URL = '/static/images/video-placeholder.png'
+
+# Absolute paths that ``build_absolute_uri`` would only prefix with the host
+PLAIN_PATH = re.compile(r"/[A-Za-z0-9\-._~/%!*()'=:;$&+,@]*")
+
+
+def url_builder(request):
     """
-    Serializer for video quality versions.
+    Get a function turning stored URLs into what
+    ``request.build_absolute_uri`` returns, or None without request.
+    
+    Plain absolute paths are prefixed with the host directly; anything else
+    goes through ``build_absolute_uri``.
     """
-    video_url = serializers.SerializerMethodField()
+    if not request:
+        return None
+    host = request.build_absolute_uri('/')[:-1]
     
-    class Meta:
-        model = VideoQuality
-        fields = ['quality', 'file_size', 'is_ready', 'video_url']
+    def build(url):
+        if PLAIN_PATH.fullmatch(url) and not url.startswith('//') and '/./' not in url and '/../' not in url:
+            return host + url
+        return request.build_absolute_uri(url)
+    return build
+
+
+def absolute_url(build_url, url):
+    """Prefix a stored URL with the request host (unchanged without request)."""
+    if build_url and url:
+        return build_url(url)
+    return url or None
+
+
+def playback_qualities(playback: dict, build_url) -> list:
+    """Get the quality versions of a playback descriptor with their full URLs."""
+    return [{
+        'quality': rendition['quality'],
+        'file_size': rendition['size'],
+        'is_ready': rendition['ready'],
+        'video_url': build_url(rendition['url']) if build_url and rendition['url'] else None,
+    } for rendition in playback['renditions']]
+
+
+def playback_video_file(playback: dict, build_url):
+    """Get the list URL of a video - preferably a mid-quality version."""
+    if not build_url:
+        return playback['source'] or None
     
-    def get_video_url(self, obj):
-        """Get the full URL for the video quality file."""
+    rendition = next(
+        (r for r in playback['renditions'] if r['quality'] == '720p' and r['ready'] and r['url']), None
+    )
+    return absolute_url(build_url, rendition['url'] if rendition else playback['source'])
+
+
+class PlaybackSerializerMixin:
+    """
+    Video fields read from the playback descriptor (see ``playback``).
+    
+    Only the host of the request is prefixed, so serializing a video runs
+    no queries and no storage calls.
+    """
+    
+    def build_url(self):
+        """Get the URL builder of the request (None without request)."""
         request = self.context.get('request')
-        if request and obj.file_path:
-            from django.conf import settings
-            import os
-            
-            file_path = str(obj.file_path)
-            
-            if file_path.startswith(str(settings.MEDIA_ROOT)):
-                relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace('\\', '/')
-            else:
-                relative_path = file_path.replace('\\', '/').lstrip('/')
-            
-            return request.build_absolute_uri(settings.MEDIA_URL + relative_path)
-        return None
+        return request.build_absolute_uri if request else None
+    
+    def get_qualities(self, obj):
+        """Get the quality versions with their full URLs."""
+        return playback_qualities(get_playback(obj), self.build_url())
+    
+    def get_thumbnail_url(self, obj):
+        """Return absolute URL for thumbnail."""
+        return absolute_url(self.build_url(), get_playback(obj)['thumbnail'] or PLACEHOLDER_URL)
 
 
-class VideoListSerializer(serializers.ModelSerializer):
+class VideoListSerializer(PlaybackSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for video list view.
     """
     genre = GenreSerializer(read_only=True)
     category = serializers.CharField(source='genre.name', read_only=True)
-    qualities = VideoQualitySerializer(many=True, read_only=True)
+    qualities = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
     video_file = serializers.SerializerMethodField()
     
@@ -58,55 +115,18 @@ class VideoListSerializer(serializers.ModelSerializer):
             'thumbnail_url', 'video_file', 'qualities', 'duration', 'created_at'
         ]
     
-    def get_thumbnail_url(self, obj):
-        """Return absolute URL for thumbnail."""
-        request = self.context.get('request')
-        
-        if obj.thumbnail and obj.thumbnail.name:
-            if request:
-                return request.build_absolute_uri(obj.thumbnail.url)
-            else:
-                return obj.thumbnail.url
-        
-        placeholder_url = '/static/images/video-placeholder.png'
-        if request:
-            return request.build_absolute_uri(placeholder_url)
-        return placeholder_url
-    
     def get_video_file(self, obj):
         """Return absolute URL for video file - preferably a mid-quality version."""
-        request = self.context.get('request')
-        if not request:
-            return obj.video_file.url if obj.video_file else None
-        
-        try:
-            quality_720p = obj.qualities.filter(quality='720p', is_ready=True).first()
-            if quality_720p and quality_720p.file_path:
-                from django.conf import settings
-                import os
-                
-                file_path = str(quality_720p.file_path)
-                if file_path.startswith(str(settings.MEDIA_ROOT)):
-                    relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace('\\', '/')
-                else:
-                    relative_path = file_path.replace('\\', '/').lstrip('/')
-                
-                return request.build_absolute_uri(settings.MEDIA_URL + relative_path)
-        except:
-            pass
-        
-        if obj.video_file:
-            return request.build_absolute_uri(obj.video_file.url)
-        return None
+        return playback_video_file(get_playback(obj), self.build_url())
 
 
-class VideoDetailSerializer(serializers.ModelSerializer):
+class VideoDetailSerializer(PlaybackSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for video detail view.
     """
     genre = GenreSerializer(read_only=True)
     category = serializers.CharField(source='genre.name', read_only=True)
-    qualities = VideoQualitySerializer(many=True, read_only=True)
+    qualities = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
     video_file = serializers.SerializerMethodField()
     
@@ -117,27 +137,118 @@ class VideoDetailSerializer(serializers.ModelSerializer):
             'video_file', 'duration', 'is_processed', 'qualities', 'created_at'
         ]
     
-    def get_thumbnail_url(self, obj):
-        """Return absolute URL for thumbnail."""
-        request = self.context.get('request')
-        
-        if obj.thumbnail and obj.thumbnail.name:
-            if request:
-                return request.build_absolute_uri(obj.thumbnail.url)
-            else:
-                return obj.thumbnail.url
-        
-        placeholder_url = '/static/images/video-placeholder.png'
-        if request:
-            return request.build_absolute_uri(placeholder_url)
-        return placeholder_url
-    
     def get_video_file(self, obj):
         """Return absolute URL for original video file - quality switching handled via qualities array."""
-        request = self.context.get('request')
-        if request and obj.video_file:
-            return request.build_absolute_uri(obj.video_file.url)
-        return obj.video_file.url if obj.video_file else None
+        return absolute_url(self.build_url(), get_playback(obj)['source'])
+
+
+# Columns serialized by the fast list path; heavy columns (probe data,
+# encoding ladder, search vector) are never loaded
+VIDEO_ROW_FIELDS = (
+    'id', 'title', 'description', 'genre_id', 'genre__name', 'genre__slug',
+    'duration', 'is_processed', 'created_at', 'playback',
+)
+
+datetime_field = serializers.DateTimeField()
+
+
+def datetime_formatter():
+    """
+    Get a function formatting datetimes like ``serializers.DateTimeField``.
+    
+    ISO 8601 output in the current time zone is formatted directly; other
+    configurations go through the field.
+    """
+    output_format = api_settings.DATETIME_FORMAT
+    if not isinstance(output_format, str) or output_format.lower() != ISO_8601 or not settings.USE_TZ:
+        return datetime_field.to_representation
+    current_timezone = timezone.get_current_timezone()
+    
+    def format_datetime(value):
+        if not timezone.is_aware(value):
+            return datetime_field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+
+def video_rows(queryset):
+    """Project a video queryset onto the columns of ``serialize_video_rows``."""
+    return queryset.values(*VIDEO_ROW_FIELDS)
+
+
+def complete_playback(rows: list) -> list:
+    """
+    Fill in the descriptors of rows written before descriptors existed,
+    with one batched qualities lookup.
+    """
+    stale = [row['id'] for row in rows if (row['playback'] or {}).get('version') != PLAYBACK_VERSION]
+    if stale:
+        playbacks = {
+            video.id: get_playback(video)
+            for video in Video.objects.filter(id__in=stale).prefetch_related('qualities')
+        }
+        for row in rows:
+            if row['id'] in playbacks:
+                row['playback'] = playbacks[row['id']]
+    return rows
+
+
+def serialize_video_row(row: dict, build_url=None, detail: bool = False, format_datetime=None) -> dict:
+    """
+    Serialize a ``video_rows`` row without DRF field machinery.
+    
+    Produces exactly the output of ``VideoListSerializer`` (or of
+    ``VideoDetailSerializer`` with ``detail``) for the same video.
+    
+    Args:
+        row: Projected video with a current playback descriptor
+        build_url: ``url_builder`` of the current request (None without request)
+        detail: Use the detail layout
+        format_datetime: ``datetime_formatter`` result, reused across rows
+    
+    Returns:
+        Serialized video
+    """
+    playback = row['playback']
+    genre = {'id': row['genre_id'], 'name': row['genre__name'], 'slug': row['genre__slug']}
+    thumbnail_url = absolute_url(build_url, playback['thumbnail'] or PLACEHOLDER_URL)
+    qualities = playback_qualities(playback, build_url)
+    duration = duration_string(row['duration']) if row['duration'] is not None else None
+    created_at = (format_datetime or datetime_formatter())(row['created_at']) if row['created_at'] else None
+    
+    if detail:
+        return {
+            'id': row['id'], 'title': row['title'], 'description': row['description'],
+            'genre': genre, 'category': row['genre__name'], 'thumbnail_url': thumbnail_url,
+            'video_file': absolute_url(build_url, playback['source']), 'duration': duration,
+            'is_processed': row['is_processed'], 'qualities': qualities, 'created_at': created_at,
+        }
+    return {
+        'id': row['id'], 'title': row['title'], 'description': row['description'],
+        'genre': genre, 'category': row['genre__name'], 'thumbnail_url': thumbnail_url,
+        'video_file': playback_video_file(playback, build_url), 'qualities': qualities,
+        'duration': duration, 'created_at': created_at,
+    }
+
+
+def serialize_video_rows(rows, request=None) -> list:
+    """
+    Serialize ``video_rows`` rows in the ``VideoListSerializer`` layout.
+    
+    Args:
+        rows: Projected videos
+        request: Current request for absolute URLs
+    
+    Returns:
+        List of serialized videos
+    """
+    build_url = url_builder(request)
+    format_datetime = datetime_formatter()
+    return [
+        serialize_video_row(row, build_url, format_datetime=format_datetime)
+        for row in complete_playback(list(rows))
+    ]
 
 
 class VideoUploadSerializer(serializers.ModelSerializer):
@@ -163,6 +274,11 @@ class VideoUploadSerializer(serializers.ModelSerializer):
                 "Video file too large. Maximum size is 500MB."
             )
         
+        try:
+            value.probe_info = preflight_uploaded_file(value)
+        except VideoPreflightError as e:
+            raise serializers.ValidationError(str(e))
+        
         return value
     
     def validate_genre_id(self, value):
@@ -175,11 +291,83 @@ class VideoUploadSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        """Create video with genre."""
+        """Create video with genre, reusing renditions of identical uploads."""
         genre_id = validated_data.pop('genre_id')
         genre = Genre.objects.get(id=genre_id)
         validated_data['genre'] = genre
         
+        content_hash = compute_content_hash(validated_data['video_file'])
+        validated_data['content_hash'] = content_hash
+        validated_data['probe_info'] = getattr(validated_data['video_file'], 'probe_info', {})
+        
+        source = find_processed_duplicate(content_hash)
+        if source is None:
+            return super().create(validated_data)
+        
+        thumbnail = validated_data.get('thumbnail')
+        validated_data.update(duplicate_video_fields(source))
+        if thumbnail:
+            validated_data['thumbnail'] = thumbnail
+        
+        video = super().create(validated_data)
+        reuse_renditions(video, source)
+        return video
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for resumable chunked upload sessions.
+    """
+    genre_id = serializers.IntegerField(write_only=True)
+    chunk_size = serializers.IntegerField(required=False)
+    chunk_count = serializers.ReadOnlyField()
+    received_bytes = serializers.ReadOnlyField()
+    missing_chunks = serializers.ReadOnlyField()
+    video_id = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'total_size', 'chunk_size', 'chunk_count',
+            'title', 'description', 'genre_id', 'streaming', 'status',
+            'ingest_status', 'received_chunks', 'received_bytes',
+            'missing_chunks', 'video_id', 'created_at'
+        ]
+        read_only_fields = ['id', 'status', 'ingest_status', 'received_chunks', 'created_at']
+    
+    def validate_filename(self, value):
+        """Validate video file format."""
+        if not is_video_file(value):
+            raise serializers.ValidationError(
+                "Unsupported video format. Please upload MP4, AVI, MOV, MKV, WMV, FLV, or WebM files."
+            )
+        return value
+    
+    def validate_total_size(self, value):
+        """Validate announced file size."""
+        max_size = settings.CHUNKED_UPLOAD['MAX_SIZE']
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(
+                f"Video file size must be between 1 byte and {max_size // (1024 * 1024)}MB."
+            )
+        return value
+    
+    def validate_chunk_size(self, value):
+        """Validate requested chunk size."""
+        if not settings.CHUNKED_UPLOAD['MIN_CHUNK_SIZE'] <= value <= settings.CHUNKED_UPLOAD['MAX_CHUNK_SIZE']:
+            raise serializers.ValidationError("Unsupported chunk size.")
+        return value
+    
+    def validate_genre_id(self, value):
+        """Validate genre exists."""
+        if not Genre.objects.filter(id=value).exists():
+            raise serializers.ValidationError("Invalid genre selected.")
+        return value
+    
+    def create(self, validated_data):
+        """Create session with genre and default chunk size."""
+        validated_data['genre'] = Genre.objects.get(id=validated_data.pop('genre_id'))
+        validated_data.setdefault('chunk_size', settings.CHUNKED_UPLOAD['CHUNK_SIZE'])
         return super().create(validated_data)
 
 
@@ -201,41 +389,29 @@ class WatchProgressSerializer(serializers.ModelSerializer):
 class DashboardSerializer(serializers.Serializer):
     """
     Serializer for dashboard data.
+    Expects the loaded data of ``dashboard.build_dashboard`` (videos as
+    ``video_rows`` rows) and runs no queries.
     """
-    hero_video = VideoDetailSerializer(read_only=True)
+    hero_video = serializers.SerializerMethodField()
     genres = serializers.SerializerMethodField()
     continue_watching = serializers.SerializerMethodField()
     
+    def get_hero_video(self, obj):
+        """Get the featured video."""
+        if obj['hero_video'] is None:
+            return None
+        return serialize_video_row(obj['hero_video'], detail=True)
+    
     def get_genres(self, obj):
         """Get videos grouped by genre."""
-        genres_data = []
-        for genre in Genre.objects.all():
-            videos = Video.objects.filter(
-                genre=genre,
-                is_processed=True
-            ).order_by('-created_at')[:10]
-            
-            if videos.exists():
-                genres_data.append({
-                    'genre': GenreSerializer(genre).data,
-                    'videos': VideoListSerializer(videos, many=True).data
-                })
-        
-        return genres_data
+        return [{
+            'genre': genre,
+            'videos': [serialize_video_row(row) for row in videos]
+        } for genre, videos in obj['genres']]
     
     def get_continue_watching(self, obj):
         """Get user's continue watching list."""
-        user = self.context.get('user')
-        if not user or not user.is_authenticated:
-            return []
-        
-        progress_list = WatchProgress.objects.filter(
-            user=user,
-            is_completed=False,
-            current_time__gt=0
-        ).select_related('video').order_by('-last_watched')[:5]
-        
         return [{
             'video': VideoListSerializer(p.video).data,
             'progress': WatchProgressSerializer(p).data
-        } for p in progress_list]
+        } for p in obj['continue_watching']]
@@ -1,15 +1,22 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.conf import settings
 from django_rq import get_queue
-from ..models import Video, Genre, WatchProgress
+from ..models import Video, Genre, WatchProgress, UploadSession
+from .pagination import KeysetPagination
 from .serializers import (
     VideoListSerializer, VideoDetailSerializer, VideoUploadSerializer,
-    WatchProgressSerializer, GenreSerializer, DashboardSerializer
+    WatchProgressSerializer, GenreSerializer,
+    UploadSessionSerializer, serialize_video_rows, video_rows
 )
+from ..dashboard import get_dashboard_data
+from ..search import full_text_search_enabled, search_videos
+from ..suggestions import suggest
 from ..utils import process_video_task
+from ..storage import media_exists
+from .. import chunked_upload
 
 
 class GenreListView(generics.ListAPIView):
@@ -24,13 +31,18 @@ class GenreListView(generics.ListAPIView):
 class VideoListView(generics.ListAPIView):
     """
     Get list of videos with filtering and search.
+    
+    Pages are keyset-paginated newest first; ``?legacy=1`` returns the
+    whole catalog as one array for older frontends. Full-text searches are
+    ordered by relevance and return the best matches as a single page.
     """
     serializer_class = VideoListSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """Filter videos by genre and search query."""
-        queryset = Video.objects.filter(is_processed=True)
+        queryset = Video.objects.filter(is_processed=True).order_by('-created_at', '-id')
         
         genre = self.request.query_params.get('genre')
         if genre:
@@ -38,18 +50,27 @@ class VideoListView(generics.ListAPIView):
         
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
-            )
+            queryset = search_videos(queryset, search)
         
-        return queryset.order_by('-created_at')
+        return queryset
     
     def list(self, request, *args, **kwargs):
-        """Return videos as direct array for frontend compatibility."""
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """Return a page of videos, or all videos as direct array in legacy mode."""
+        ranked = bool(request.query_params.get('search')) and full_text_search_enabled()
+        rows = video_rows(self.filter_queryset(self.get_queryset()))
+        
+        if request.query_params.get('legacy', '').lower() in ('1', 'true'):
+            if ranked:
+                rows = rows[:settings.VIDEO_SEARCH['MAX_RESULTS']]
+            return Response(serialize_video_rows(rows, request))
+        
+        if ranked:
+            # Relevance has no keyset to continue from
+            rows = rows[:self.paginator.get_page_size(request)]
+            return Response({'next': None, 'results': serialize_video_rows(rows, request)})
+        
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(serialize_video_rows(page, request))
 
 
 class VideoDetailView(generics.RetrieveAPIView):
@@ -69,13 +90,105 @@ class VideoUploadView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_create(self, serializer):
-        """Save video and start processing."""
+        """Save video and start processing unless renditions were reused."""
         video = serializer.save(uploaded_by=self.request.user)
         
+        if video.is_processed:
+            return
+        
         queue = get_queue('default')
         queue.enqueue(process_video_task, video.id)
 
 
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a resumable chunked upload.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def perform_create(self, serializer):
+        """Save session and preallocate its part file."""
+        session = serializer.save(user=self.request.user)
+        chunked_upload.create_part_file(session)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def upload_session_detail(request, upload_id):
+    """
+    Get upload progress (GET), upload one chunk (PUT) or abort (DELETE).
+    
+    Chunks are sent as the raw request body. The offset is taken from the
+    Content-Range header ("bytes start-end/total") or the ``offset`` query
+    parameter and must be a multiple of the session chunk size.
+    """
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    
+    if request.method == 'DELETE':
+        try:
+            chunked_upload.abort_upload(session)
+        except chunked_upload.UploadInProgressError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    if request.method == 'PUT':
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return Response({'error': 'Invalid Content-Length header.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        content_range = request.META.get('HTTP_CONTENT_RANGE')
+        
+        if content_range:
+            parsed = chunked_upload.parse_content_range(content_range)
+            if parsed is None or parsed[2] != session.total_size or parsed[0] > parsed[1]:
+                return Response({'error': 'Invalid Content-Range header.'}, status=status.HTTP_400_BAD_REQUEST)
+            if parsed[1] - parsed[0] + 1 != length:
+                return Response(
+                    {'error': 'Content-Length does not match the Content-Range header.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            offset = parsed[0]
+        else:
+            try:
+                offset = int(request.query_params.get('offset', ''))
+            except ValueError:
+                return Response({'error': 'Chunk offset is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            session = chunked_upload.write_chunk(session, offset, length, request.stream)
+        except chunked_upload.UploadInProgressError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except chunked_upload.ChunkedUploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(UploadSessionSerializer(session).data)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def complete_upload_session(request, upload_id):
+    """
+    Validate the assembled file and create the video.
+    """
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    
+    try:
+        video = chunked_upload.finalize_upload(session, validate=chunked_upload.preflight_assembled_file)
+    except chunked_upload.UploadInProgressError as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except chunked_upload.ChunkedUploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(
+        VideoDetailSerializer(video, context={'request': request}).data,
+        status=status.HTTP_201_CREATED
+    )
+
+
 class WatchProgressView(generics.CreateAPIView, generics.UpdateAPIView):
     """
     Update watch progress for a video.
@@ -123,12 +236,28 @@ def dashboard_data(request):
     """
     Get dashboard data including hero video and genre-based videos.
     """
-    hero_video = Video.objects.filter(is_processed=True).order_by('-created_at').first()
+    return Response(get_dashboard_data(request.user))
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def video_suggestions(request):
+    """
+    Get title completions for search-as-you-type.
     
-    data = {'hero_video': hero_video}
-    serializer = DashboardSerializer(data, context={'user': request.user})
+    Answered from the prefix index without authentication or database
+    queries; ``q`` is the typed text, ``limit`` the number of suggestions.
+    """
+    try:
+        limit = int(request.query_params.get('limit', 0)) or None
+    except ValueError:
+        limit = None
     
-    return Response(serializer.data)
+    query = request.query_params.get('q', '')
+    response = Response({'query': query, 'suggestions': suggest(query, limit)})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
 
 
 @api_view(['DELETE'])
@@ -149,162 +278,6 @@ def delete_video(request, video_id):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def hls_manifest(request, movie_id, resolution):
-    """
-    Serve HLS manifest file for video streaming.
-    Uses mentor's FFmpeg HLS conversion approach.
-    """
-    from django.http import HttpResponse, Http404
-    from ..hls_utils import hls_processor
-    
-    try:
-        video = Video.objects.get(id=movie_id, is_processed=True)
-    except Video.DoesNotExist:
-        raise Http404("Video not found")
-    
-    try:
-        from ..models import VideoQuality
-        from django.conf import settings
-        import os
-        
-        quality_obj = VideoQuality.objects.get(video=video, quality=resolution)
-        if quality_obj.file_path and quality_obj.is_ready:
-            hls_manifest_path = os.path.join(quality_obj.file_path, 'index.m3u8')
-            
-            if os.path.exists(hls_manifest_path):
-                with open(hls_manifest_path, 'r') as f:
-                    content = f.read()
-                
-                base_url = request.build_absolute_uri(f'/api/video/{movie_id}/{resolution}/')
-                updated_content = []
-                
-                for line in content.split('\n'):
-                    if line.strip().endswith('.ts'):
-                        segment_name = line.strip()
-                        updated_content.append(base_url + segment_name)
-                    else:
-                        updated_content.append(line)
-                
-                final_content = '\n'.join(updated_content)
-                
-                response = HttpResponse(final_content, content_type='application/vnd.apple.mpegurl')
-                response['Cache-Control'] = 'no-cache'
-                response['Access-Control-Allow-Origin'] = '*'
-                response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-                response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-                return response
-    except VideoQuality.DoesNotExist:
-        pass
-    
-    if hls_processor.hls_exists(video.id):
-        try:
-            manifest_path = hls_processor.get_m3u8_path(video.id)
-            with open(manifest_path, 'r') as f:
-                content = f.read()
-            
-            response = HttpResponse(content, content_type='application/vnd.apple.mpegurl')
-            response['Cache-Control'] = 'no-cache'
-            response['Access-Control-Allow-Origin'] = '*'
-            response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            return response
-            
-        except Exception:
-            pass
-    
-    if video.video_file:
-        video_url = None
-        
-        try:
-            from ..models import VideoQuality
-            quality_obj = VideoQuality.objects.get(video=video, quality=resolution)
-            if quality_obj.file_path and quality_obj.is_ready:
-                from django.conf import settings
-                import os
-                
-                file_path = str(quality_obj.file_path)
-                if file_path.startswith(str(settings.MEDIA_ROOT)):
-                    relative_path = os.path.relpath(file_path, settings.MEDIA_ROOT).replace('\\', '/')
-                else:
-                    relative_path = file_path.replace('\\', '/').lstrip('/')
-                
-                video_url = request.build_absolute_uri(settings.MEDIA_URL + relative_path)
-        except VideoQuality.DoesNotExist:
-            pass
-        
-        if not video_url:
-            video_url = request.build_absolute_uri(video.video_file.url)
-        
-        manifest_content = f"""
-{video_url}
-"""
-        
-        response = HttpResponse(manifest_content, content_type='application/vnd.apple.mpegurl')
-        response['Cache-Control'] = 'no-cache'
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        return response
-    
-    raise Http404("Video file not found")
-
-
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def hls_segment(request, movie_id, resolution, segment):
-    """
-    Serve HLS video segments for streaming.
-    Uses quality-specific segments created by our FFmpeg conversion.
-    """
-    from django.http import HttpResponse, Http404
-    import os
-    from ..hls_utils import hls_processor
-    
-    try:
-        video = Video.objects.get(id=movie_id, is_processed=True)
-    except Video.DoesNotExist:
-        raise Http404("Video not found")
-    
-    try:
-        segment_path = os.path.join(hls_processor.get_hls_directory(video.id), segment)
-        if os.path.exists(segment_path):
-            with open(segment_path, 'rb') as f:
-                content = f.read()
-            
-            response = HttpResponse(content, content_type='video/MP2T')
-            response['Cache-Control'] = 'max-age=3600'
-            response['Access-Control-Allow-Origin'] = '*'
-            response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            return response
-    except Exception:
-        pass
-    
-    try:
-        from ..models import VideoQuality
-        quality_obj = VideoQuality.objects.get(video=video, quality=resolution)
-        
-        if quality_obj.file_path and quality_obj.is_ready:
-            segment_path = os.path.join(quality_obj.file_path, segment)
-            
-            if os.path.exists(segment_path):
-                with open(segment_path, 'rb') as f:
-                    content = f.read()
-                
-                response = HttpResponse(content, content_type='video/MP2T')
-                response['Cache-Control'] = 'max-age=3600'
-                response['Access-Control-Allow-Origin'] = '*'
-                response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-                response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-                return response
-    except VideoQuality.DoesNotExist:
-        pass
-    
-    raise Http404("Segment not found")
-
-
 @api_view(['GET'])
 @permission_classes([permissions.IsAdminUser])
 def processing_status(request):
@@ -313,7 +286,6 @@ def processing_status(request):
     Only accessible by admin users.
     """
     from django.utils import timezone
-    import os
     
     videos = Video.objects.all().order_by('-created_at')
     
@@ -332,9 +304,9 @@ def processing_status(request):
         
         if video.video_file:
             try:
-                if os.path.exists(video.video_file.path):
+                if media_exists(video.video_file.name):
                     video_data['file_exists'] = True
-                    video_data['file_size'] = os.path.getsize(video.video_file.path)
+                    video_data['file_size'] = video.video_file.size
             except Exception:
                 pass
         
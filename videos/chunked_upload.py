@@ -0,0 +1,461 @@
+"""
+Resumable chunked uploads for large video files.
+
+A session preallocates a sparse ``.part`` file. Every chunk is streamed from
+the request body straight to its offset in that file, so chunks can arrive in
+any order and in parallel without being buffered in memory. Finalizing stores
+the assembled file in media storage and creates the Video; it waits for chunks
+in flight and refuses new ones, so the file cannot change while it is hashed.
+
+Streaming sessions additionally start an ingest job as soon as the first
+chunk lands. It pipes the contiguous prefix of the part file into FFmpeg
+while the rest is still uploading, so the lowest rendition and the thumbnail
+are ready shortly after the last byte arrives. The worker reads the part
+file directly, so streaming ingest is limited to local media storage, where
+web and worker containers share the media volume; with remote storage,
+streaming sessions are encoded by the regular pipeline after finalizing.
+"""
+
+import os
+import fcntl
+import shutil
+import logging
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .models import Video, VideoQuality, UploadSession, rendition_path, video_upload_path
+from .segment_index import write_segment_index
+from .storage import is_local_storage, publish_directory, save_file
+from .utils import (
+    VideoPreflightError,
+    clean_filename,
+    compute_content_hash,
+    duplicate_video_fields,
+    find_processed_duplicate,
+    preflight_video,
+    reuse_renditions,
+)
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """Raised when a chunk or finalize request cannot be accepted."""
+
+
+class UploadInProgressError(ChunkedUploadError):
+    """Raised when another request is finalizing the session."""
+
+
+def get_part_path(session: UploadSession) -> str:
+    """Get the path of the partially assembled file for a session."""
+    return os.path.join(settings.CHUNKED_UPLOAD['DIR'], f'{session.id}.part')
+
+
+def get_stream_dir(session: UploadSession) -> str:
+    """Get the staging directory for outputs of a streaming ingest."""
+    return os.path.join(settings.CHUNKED_UPLOAD['DIR'], str(session.id))
+
+
+def streaming_ingest_enabled() -> bool:
+    """Check if RQ workers can read part files (local media storage only)."""
+    return is_local_storage()
+
+
+def create_part_file(session: UploadSession) -> str:
+    """
+    Preallocate the (sparse) part file for a new session.
+
+    Args:
+        session: Upload session
+
+    Returns:
+        Path of the part file
+    """
+    part_path = get_part_path(session)
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    with open(part_path, 'wb') as part_file:
+        part_file.truncate(session.total_size)
+    return part_path
+
+
+def parse_content_range(header: str):
+    """
+    Parse a ``Content-Range: bytes start-end/total`` header.
+
+    Args:
+        header: Header value
+
+    Returns:
+        Tuple (start, end, total) or None if the header is malformed
+    """
+    try:
+        unit, byte_range = header.strip().split(' ', 1)
+        span, total = byte_range.split('/', 1)
+        start, end = span.split('-', 1)
+        if unit != 'bytes':
+            return None
+        return int(start), int(end), int(total)
+    except ValueError:
+        return None
+
+
+def check_accepts_chunks(status: str):
+    """
+    Refuse chunks for a session that is no longer active.
+
+    Args:
+        status: Current status of the session
+
+    Raises:
+        UploadInProgressError: If the session is being finalized
+        ChunkedUploadError: If the session is complete or aborted
+    """
+    if status == 'finalizing':
+        raise UploadInProgressError('Upload is being finalized.')
+    if status != 'active':
+        raise ChunkedUploadError('Upload session is not active.')
+
+
+def write_chunk(session: UploadSession, offset: int, length: int, stream) -> UploadSession:
+    """
+    Stream one chunk from the request body to its offset in the part file.
+
+    Args:
+        session: Active upload session
+        offset: Byte offset of the chunk, a multiple of the chunk size
+        length: Number of bytes announced for the chunk
+        stream: File-like request body
+
+    Returns:
+        The refreshed session with the chunk recorded
+    """
+    check_accepts_chunks(session.status)
+
+    if offset < 0 or offset % session.chunk_size:
+        raise ChunkedUploadError(f'Offset must be a multiple of the chunk size ({session.chunk_size}).')
+
+    index = offset // session.chunk_size
+    if index >= session.chunk_count:
+        raise ChunkedUploadError('Offset is beyond the end of the file.')
+
+    expected = min(session.chunk_size, session.total_size - offset)
+    if length != expected:
+        raise ChunkedUploadError(f'Chunk at offset {offset} must be {expected} bytes.')
+
+    try:
+        fd = os.open(get_part_path(session), os.O_WRONLY)
+    except FileNotFoundError:
+        raise ChunkedUploadError('Upload data is no longer available.')
+
+    written = 0
+    try:
+        # Held while writing: claim_upload waits for it before finalizing,
+        # and every chunk starting after that sees the new status here
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        check_accepts_chunks(UploadSession.objects.filter(id=session.id).values_list('status', flat=True).first())
+
+        while written < expected:
+            block = stream.read(min(READ_BLOCK_SIZE, expected - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            written += len(block)
+    finally:
+        os.close(fd)
+
+    if written != expected:
+        raise ChunkedUploadError(f'Incomplete chunk: received {written} of {expected} bytes.')
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session.id)
+        if session.status == 'aborted':
+            raise ChunkedUploadError('Upload session is not active.')
+        if index not in session.received_chunks:
+            session.received_chunks = sorted(session.received_chunks + [index])
+            session.save(update_fields=['received_chunks', 'updated_at'])
+
+        if (session.streaming and not session.ingest_status and session.contiguous_bytes
+                and streaming_ingest_enabled()):
+            session.ingest_status = 'running'
+            session.save(update_fields=['ingest_status', 'updated_at'])
+            transaction.on_commit(lambda: queue_stream_ingest(session.id))
+
+    return session
+
+
+def queue_stream_ingest(session_id):
+    """
+    Queue the streaming ingest job for a session.
+
+    Args:
+        session_id: ID of the upload session
+    """
+    from django_rq import get_queue
+    from .tasks import ingest_upload_stream
+
+    try:
+        get_queue('default').enqueue(ingest_upload_stream, session_id)
+    except Exception as e:
+        logger.error(f"Could not queue streaming ingest for upload {session_id}: {e}")
+        UploadSession.objects.filter(id=session_id).update(ingest_status='failed')
+
+
+def claim_upload(session: UploadSession) -> UploadSession:
+    """
+    Mark a fully received session as finalizing so that only one request
+    works on its part file.
+
+    Chunks still being written are waited for (they hold a shared lock on
+    the part file); chunks arriving afterwards are refused, so the file
+    cannot change while it is hashed and stored.
+
+    Args:
+        session: Upload session with all chunks received
+
+    Returns:
+        The locked-in session; a session that already completed is returned
+        unchanged
+    """
+    fd = None
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+
+            if session.status == 'complete' and session.video_id:
+                return session
+            if session.status == 'finalizing':
+                raise UploadInProgressError('Upload is already being finalized.')
+            if session.status != 'active':
+                raise ChunkedUploadError('Upload session is not active.')
+            if session.missing_chunks:
+                raise ChunkedUploadError(f'{len(session.missing_chunks)} chunks are still missing.')
+
+            try:
+                fd = os.open(get_part_path(session), os.O_RDONLY)
+            except FileNotFoundError:
+                raise ChunkedUploadError('Upload data is no longer available.')
+            # Kept until the new status is committed
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size != session.total_size:
+                raise ChunkedUploadError('Assembled file size does not match the announced size.')
+
+            session.status = 'finalizing'
+            session.save(update_fields=['status', 'updated_at'])
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return session
+
+
+def store_part_file(session: UploadSession, video: Video) -> str:
+    """
+    Store the assembled file as the source of a new video.
+
+    The part file itself stays in place until the video is committed. With
+    local storage the source is a hard link to it, so nothing is copied.
+
+    Args:
+        session: Finalizing upload session
+        video: Unsaved video the file belongs to
+
+    Returns:
+        Storage name of the source file
+    """
+    part_path = get_part_path(session)
+    name = default_storage.get_available_name(
+        video_upload_path(video, clean_filename(session.filename))
+    )
+    if not is_local_storage():
+        return save_file(name, part_path)
+
+    destination = default_storage.path(name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(part_path, destination)
+    except OSError:
+        shutil.copyfile(part_path, destination)
+    return name
+
+
+def remove_part_file(session: UploadSession):
+    """Delete the part file of a session if it still exists."""
+    try:
+        os.remove(get_part_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def finalize_upload(session: UploadSession, validate=None) -> Video:
+    """
+    Validate the assembled file and create the Video for it.
+
+    Validation, the content hash (one sequential pass, because chunks may
+    have arrived out of order) and storing the source run outside any
+    transaction while the session is marked as finalizing. Only creating
+    the video and completing the session hold the row lock, and the part
+    file is removed once that commits.
+
+    Args:
+        session: Upload session with all chunks received
+        validate: Optional callable receiving the assembled file path; it
+            returns probe information to store with the video, or raises
+            ChunkedUploadError to reject the file
+
+    Returns:
+        The created Video
+    """
+    session = claim_upload(session)
+    if session.status == 'complete':
+        return session.video
+
+    part_path = get_part_path(session)
+    stored_name = None
+    try:
+        probe_info = validate(part_path) if validate else {}
+
+        with open(part_path, 'rb') as part_file:
+            content_hash = compute_content_hash(File(part_file))
+
+        video = Video(
+            title=session.title,
+            description=session.description,
+            genre=session.genre,
+            uploaded_by=session.user,
+            content_hash=content_hash,
+            probe_info=probe_info or {}
+        )
+
+        source = find_processed_duplicate(content_hash)
+        if source is None:
+            stored_name = store_part_file(session, video)
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(id=session.id)
+            if session.status != 'finalizing':
+                raise ChunkedUploadError('Upload session was aborted.')
+
+            if source is not None:
+                for field, value in duplicate_video_fields(source).items():
+                    setattr(video, field, value)
+                video.save()
+                reuse_renditions(video, source)
+            else:
+                video.video_file.name = stored_name
+                # A running ingest queues the remaining renditions when it publishes
+                video._defer_processing = session.ingest_status == 'running'
+                video.save()
+
+            session.status = 'complete'
+            session.video = video
+            session.save(update_fields=['status', 'video', 'updated_at'])
+
+            transaction.on_commit(lambda: remove_part_file(session))
+            if session.ingest_status == 'done':
+                transaction.on_commit(lambda: publish_stream_outputs(session))
+    except Exception:
+        if stored_name:
+            default_storage.delete(stored_name)
+        UploadSession.objects.filter(id=session.id, status='finalizing').update(status='active')
+        raise
+
+    logger.info(f"Chunked upload {session.id} finalized as video {video.id}")
+    return video
+
+
+def publish_stream_outputs(session: UploadSession):
+    """
+    Move the outputs of a finished streaming ingest to the video and queue
+    the remaining renditions.
+
+    Args:
+        session: Completed upload session with a finished ingest
+    """
+    from django_rq import get_queue
+    from .tasks import create_video_qualities
+
+    video = session.video
+    stream_dir = get_stream_dir(session)
+
+    if session.ingest_status == 'done' and not video.is_processed:
+        hls_root = os.path.join(stream_dir, 'hls')
+        for quality in os.listdir(hls_root) if os.path.isdir(hls_root) else []:
+            if VideoQuality.objects.filter(video=video, quality=quality).exists():
+                continue
+            prefix = rendition_path(video.id, quality)
+            write_segment_index(os.path.join(hls_root, quality))
+            VideoQuality.objects.create(
+                video=video,
+                quality=quality,
+                file_path=prefix,
+                file_size=publish_directory(os.path.join(hls_root, quality), prefix),
+                is_ready=True
+            )
+            logger.info(f"Published streamed {quality} rendition for video {video.id}")
+
+        thumbnail_path = os.path.join(stream_dir, 'thumb.jpg')
+        if not video.thumbnail and os.path.exists(thumbnail_path):
+            with open(thumbnail_path, 'rb') as thumb_file:
+                video.thumbnail.save(f"thumb_{video.id}.jpg", File(thumb_file), save=True)
+
+    shutil.rmtree(stream_dir, ignore_errors=True)
+
+    if not video.is_processed:
+        get_queue('default').enqueue(create_video_qualities, video.id)
+
+
+def preflight_assembled_file(part_path: str) -> dict:
+    """
+    Validate an assembled upload with the pre-flight probe.
+
+    Args:
+        part_path: Path of the assembled file
+
+    Returns:
+        Probe summary to store with the video
+    """
+    try:
+        return preflight_video(part_path)
+    except VideoPreflightError as e:
+        raise ChunkedUploadError(str(e))
+
+
+def remove_upload_data(session: UploadSession):
+    """Delete the part file and streaming outputs of a session."""
+    remove_part_file(session)
+    shutil.rmtree(get_stream_dir(session), ignore_errors=True)
+
+
+def abort_upload(session: UploadSession, include_finalizing: bool = False) -> UploadSession:
+    """
+    Abort an active upload session and remove its partial data.
+
+    Completed and already aborted sessions are left as they are, so a client
+    retrying ``complete`` still gets its video.
+
+    Args:
+        session: Upload session
+        include_finalizing: Also abort a session marked as finalizing, for
+            stale sessions whose finalize request died
+
+    Returns:
+        The session in its resulting state
+
+    Raises:
+        UploadInProgressError: If another request is finalizing the session
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session.id)
+
+        if session.status == 'finalizing' and not include_finalizing:
+            raise UploadInProgressError('Upload is being finalized.')
+        if session.status not in ('active', 'finalizing'):
+            return session
+
+        session.status = 'aborted'
+        session.save(update_fields=['status', 'updated_at'])
+        transaction.on_commit(lambda: remove_upload_data(session))
+    return session
@@ -0,0 +1,239 @@
+"""
+Dashboard assembly with a constant number of queries.
+
+The newest videos of every genre are fetched in one query ranked with
+``ROW_NUMBER() OVER (PARTITION BY genre_id ORDER BY created_at DESC)``
+and the rails, the hero video and the user's continue-watching list are
+serialized from memory using each video's playback descriptor. The number
+of queries does not depend on how many genres or videos exist.
+
+The serialized hero video and rails are the same for every user and are
+cached in Redis under a catalog version; publishing, editing or deleting
+a video bumps the version (see ``signals``). Each user's continue-watching
+block is cached separately for a few minutes and merged on top, so a warm
+dashboard request costs two cache reads and no queries.
+"""
+
+import time
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import Video, WatchProgress
+
+logger = logging.getLogger(__name__)
+
+VIDEOS_PER_GENRE = 10
+CONTINUE_WATCHING_LIMIT = 5
+
+VERSION_KEY = 'dashboard:version'
+
+
+def ranked_genre_videos(per_genre: int = VIDEOS_PER_GENRE) -> list:
+    """
+    Fetch the newest processed videos of every genre.
+
+    Args:
+        per_genre: Number of videos per genre
+
+    Returns:
+        List of ``video_rows`` rows grouped by genre name and newest first
+        within a genre
+    """
+    from .api.serializers import complete_playback, video_rows
+
+    return complete_playback(list(video_rows(
+        Video.objects.filter(is_processed=True)
+        .annotate(genre_rank=Window(
+            RowNumber(),
+            partition_by=[F('genre_id')],
+            order_by=[F('created_at').desc(), F('id').desc()]
+        ))
+        .filter(genre_rank__lte=per_genre)
+        .order_by('genre__name', 'genre_rank')
+    )))
+
+
+def genre_rails(videos: list) -> list:
+    """
+    Group ranked videos into (genre, videos) rails.
+
+    Args:
+        videos: Result of ``ranked_genre_videos``
+
+    Returns:
+        List of (serialized genre, list of rows) tuples in genre order
+    """
+    rails = []
+    for video in videos:
+        if not rails or rails[-1][0]['id'] != video['genre_id']:
+            rails.append(({'id': video['genre_id'], 'name': video['genre__name'], 'slug': video['genre__slug']}, []))
+        rails[-1][1].append(video)
+    return rails
+
+
+def continue_watching(user, limit: int = CONTINUE_WATCHING_LIMIT) -> list:
+    """
+    Get the unfinished videos of a user, most recently watched first.
+
+    Args:
+        user: Current user (anonymous users get an empty list)
+        limit: Maximum number of entries
+
+    Returns:
+        List of WatchProgress with video and genre loaded
+    """
+    if not user or not user.is_authenticated:
+        return []
+
+    return list(
+        WatchProgress.objects.filter(
+            user=user,
+            is_completed=False,
+            current_time__gt=timedelta(0)
+        )
+        .select_related('video__genre')
+        .order_by('-last_watched')[:limit]
+    )
+
+
+def shared_dashboard() -> dict:
+    """
+    Collect the part of the dashboard that is the same for every user.
+
+    Returns:
+        Dictionary with ``hero_video`` and ``genres`` (rails)
+    """
+    videos = ranked_genre_videos()
+    # The newest video overall is the newest of its genre, so it is loaded already
+    hero_video = max(videos, key=lambda video: (video['created_at'], video['id']), default=None)
+
+    return {
+        'hero_video': hero_video,
+        'genres': genre_rails(videos),
+    }
+
+
+def build_dashboard(user) -> dict:
+    """
+    Collect everything the dashboard shows.
+
+    Args:
+        user: Current user
+
+    Returns:
+        Dictionary with ``hero_video``, ``genres`` (rails) and
+        ``continue_watching`` for ``DashboardSerializer``
+    """
+    return {**shared_dashboard(), 'continue_watching': continue_watching(user)}
+
+
+def catalog_version() -> int:
+    """
+    Get the current dashboard catalog version, creating it if missing.
+
+    The version starts at the current time in milliseconds, so a version
+    lost from Redis never comes back as one whose entries are still cached.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def shared_key(version: int) -> str:
+    """Build the cache key of the shared dashboard part."""
+    return f'dashboard:shared:{version}'
+
+
+def user_key(user_id, version: int) -> str:
+    """Build the cache key of a user's continue-watching block."""
+    return f'dashboard:user:{user_id}:{version}'
+
+
+def store(key: str, value, timeout: int):
+    """Write a dashboard part to the cache, ignoring cache outages."""
+    try:
+        cache.set(key, value, timeout)
+    except Exception as e:
+        logger.warning(f"Dashboard cache unavailable: {e}")
+
+
+def get_dashboard_data(user) -> dict:
+    """
+    Get the serialized dashboard of a user from the cache.
+
+    Missing parts are built and cached; the continue-watching entries embed
+    video data too, so their key includes the catalog version as well.
+
+    Args:
+        user: Current user
+
+    Returns:
+        Serialized dashboard (``DashboardSerializer`` output)
+    """
+    from .api.serializers import DashboardSerializer
+
+    authenticated = bool(user and user.is_authenticated)
+    try:
+        version = catalog_version()
+        keys = [shared_key(version)] + ([user_key(user.id, version)] if authenticated else [])
+        cached = cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Dashboard cache unavailable: {e}")
+        return DashboardSerializer(build_dashboard(user)).data
+
+    shared = cached.get(keys[0])
+    if shared is None:
+        data = DashboardSerializer({**shared_dashboard(), 'continue_watching': []}).data
+        shared = {'hero_video': data['hero_video'], 'genres': data['genres']}
+        store(keys[0], shared, settings.DASHBOARD_CACHE['TIMEOUT'])
+
+    watching = cached.get(keys[1]) if authenticated else []
+    if watching is None:
+        watching = DashboardSerializer().get_continue_watching(
+            {'continue_watching': continue_watching(user)}
+        )
+        store(keys[1], watching, settings.DASHBOARD_CACHE['USER_TIMEOUT'])
+
+    return {**shared, 'continue_watching': watching}
+
+
+def invalidate_dashboard():
+    """
+    Retire the cached shared dashboard (and every continue-watching block)
+    once the current transaction commits.
+    """
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            # No version yet: the next request creates one
+            pass
+        except Exception as e:
+            logger.warning(f"Dashboard cache unavailable: {e}")
+
+    transaction.on_commit(bump)
+
+
+def invalidate_user_dashboard(user_id):
+    """
+    Drop a user's cached continue-watching block once the current
+    transaction commits.
+
+    Args:
+        user_id: ID of the user
+    """
+    def drop():
+        try:
+            version = cache.get(VERSION_KEY)
+            if version is not None:
+                cache.delete(user_key(user_id, version))
+        except Exception as e:
+            logger.warning(f"Dashboard cache unavailable: {e}")
+
+    transaction.on_commit(drop)
@@ -0,0 +1,182 @@
+"""
+Encoding ladder registry.
+
+All encoders read their quality profiles from ``settings.VIDEO_QUALITIES``
+through this module, so new tiers (e.g. HEVC or AV1 renditions) can be
+added by configuration only.
+"""
+
+import os
+import re
+import logging
+from django.conf import settings
+from .signing import SOURCE_RENDITION
+
+logger = logging.getLogger(__name__)
+
+CODEC_ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+    'av1': 'libsvtav1',
+}
+
+# Quality names are stored in VideoQuality.quality and used in storage
+# paths and stream URLs
+QUALITY_NAME_MAX_LENGTH = 32
+QUALITY_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+PROFILE_DEFAULTS = {
+    'codec': 'h264',
+    'preset': 'medium',
+    'rate_control': 'crf',
+    'crf': '23',
+    'bitrate': '2000k',
+    'audio_bitrate': '128k',
+    'segment_duration': 10,
+}
+
+MAX_CRF = {
+    'h264': 51,
+    'hevc': 51,
+    'av1': 63,
+}
+
+SEGMENT_CONTENT_TYPES = {
+    '.ts': 'video/MP2T',
+    '.m4s': 'video/iso.segment',
+    '.mp4': 'video/mp4',
+}
+
+
+def get_encoding_ladder() -> dict:
+    """
+    Get all configured quality profiles with defaults applied.
+
+    Returns:
+        Dictionary mapping quality name to its full profile, in ladder order
+    """
+    ladder = {}
+    for quality, profile in settings.VIDEO_QUALITIES.items():
+        if (len(quality) > QUALITY_NAME_MAX_LENGTH or not QUALITY_NAME_PATTERN.match(quality)
+                or quality == SOURCE_RENDITION):
+            logger.error(f"Invalid quality name '{quality}', skipping")
+            continue
+        merged = {**PROFILE_DEFAULTS, **profile}
+        if merged['codec'] not in CODEC_ENCODERS:
+            logger.error(f"Unknown codec '{merged['codec']}' for quality {quality}, skipping")
+            continue
+        merged['crf'] = str(merged['crf'])
+        merged['preset'] = str(merged['preset'])
+        ladder[quality] = merged
+    return ladder
+
+
+def get_profile(quality: str) -> dict:
+    """
+    Get the profile for a single quality.
+
+    Args:
+        quality: Quality name (e.g. 720p)
+
+    Returns:
+        Profile dictionary, or None if the quality is not configured
+    """
+    return get_encoding_ladder().get(quality)
+
+
+def quality_choices() -> list:
+    """Model field choices for all configured qualities."""
+    return [(quality, quality) for quality in get_encoding_ladder()]
+
+
+def uses_fmp4_segments(profile: dict) -> bool:
+    """HEVC and AV1 renditions need fragmented MP4 segments in HLS."""
+    return profile['codec'] != 'h264'
+
+
+def kbps(bitrate: str) -> int:
+    """Convert a bitrate string such as '2000k' to an integer kbps value."""
+    return int(str(bitrate).rstrip('kK'))
+
+
+def build_video_args(profile: dict) -> list:
+    """
+    Build FFmpeg video/audio encoding arguments for a profile.
+
+    Args:
+        profile: Quality profile (overrides already applied)
+
+    Returns:
+        List of FFmpeg arguments
+    """
+    codec = profile['codec']
+    bitrate_kbps = kbps(profile['bitrate'])
+
+    args = [
+        '-c:v', CODEC_ENCODERS[codec],
+        '-preset', profile['preset'],
+        '-vf', f"scale={profile['width']}:{profile['height']}",
+    ]
+
+    rate_control = profile['rate_control']
+    if rate_control == 'cbr':
+        args += [
+            '-b:v', f'{bitrate_kbps}k',
+            '-minrate', f'{bitrate_kbps}k',
+            '-maxrate', f'{bitrate_kbps}k',
+            '-bufsize', f'{bitrate_kbps}k',
+        ]
+    elif rate_control == 'vbr':
+        args += [
+            '-b:v', f'{bitrate_kbps}k',
+            '-bufsize', f'{bitrate_kbps * 2}k',
+        ]
+    else:
+        args += [
+            '-crf', profile['crf'],
+            '-maxrate', f'{bitrate_kbps}k',
+            '-bufsize', f'{bitrate_kbps * 2}k',
+        ]
+
+    if codec == 'hevc':
+        args += ['-tag:v', 'hvc1']
+
+    args += ['-c:a', 'aac', '-b:a', profile['audio_bitrate']]
+    return args
+
+
+def build_hls_args(profile: dict, output_dir: str) -> list:
+    """
+    Build FFmpeg HLS muxer arguments for a profile.
+
+    Args:
+        profile: Quality profile
+        output_dir: Output directory for playlist and segments
+
+    Returns:
+        List of FFmpeg arguments, ending with the playlist path
+    """
+    segment_duration = str(profile['segment_duration'])
+    args = [
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_duration})',
+        '-hls_time', segment_duration,
+        '-hls_list_size', '0',
+    ]
+
+    if uses_fmp4_segments(profile):
+        args += [
+            '-hls_segment_type', 'fmp4',
+            '-hls_fmp4_init_filename', 'init.mp4',
+            '-hls_segment_filename', os.path.join(output_dir, 'segment_%03d.m4s'),
+        ]
+    else:
+        args += ['-hls_segment_filename', os.path.join(output_dir, 'segment_%03d.ts')]
+
+    args += ['-y', os.path.join(output_dir, 'index.m3u8')]
+    return args
+
+
+def segment_content_type(segment: str) -> str:
+    """Get the HTTP content type for an HLS segment file."""
+    extension = os.path.splitext(segment)[1].lower()
+    return SEGMENT_CONTENT_TYPES.get(extension, 'application/octet-stream')
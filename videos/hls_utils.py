@@ -6,8 +6,12 @@ Uses FFmpeg with mentor-provided command for HLS conversion.
 import os
 import subprocess
 import logging
-from django.conf import settings
-from django.core.files.storage import default_storage
+from .models import legacy_hls_path
+from .segment_index import write_segment_index
+from .storage import (
+    delete_prefix, join_name, list_prefix, local_copy, media_exists,
+    media_url, rendition_workspace
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +19,9 @@ logger = logging.getLogger(__name__)
 class HLSProcessor:
     """
     HLS video processor using FFmpeg with mentor's specifications.
+    Output is published to media storage below ``hls/<video_id>/``.
     """
     
-    def __init__(self):
-        self.hls_base_path = os.path.join(settings.MEDIA_ROOT, 'hls')
-        os.makedirs(self.hls_base_path, exist_ok=True)
-    
     def convert_to_hls(self, video_instance, force=False):
         """
         Convert video to HLS format using mentor's FFmpeg command:
@@ -35,91 +36,82 @@ class HLSProcessor:
             return False
         
         try:
-            input_path = video_instance.video_file.path
-            
-            hls_dir = os.path.join(self.hls_base_path, str(video_instance.id))
-            os.makedirs(hls_dir, exist_ok=True)
-            
-            output_m3u8 = os.path.join(hls_dir, 'index.m3u8')
-            
-            cmd = [
-                'ffmpeg',
-                '-i', input_path,
-                '-codec:', 'copy',
-                '-start_number', '0',
-                '-hls_time', '10',
-                '-hls_list_size', '0',
-                '-f', 'hls',
-                output_m3u8
-            ]
-            
-            if force:
-                cmd.insert(1, '-y')
-            
-            logger.info(f'Converting video {video_instance.id} to HLS')
-            logger.debug(f'FFmpeg command: {" ".join(cmd)}')
+            with local_copy(video_instance.video_file.name) as input_path, \
+                    rendition_workspace(self.get_hls_directory(video_instance.id)) as hls_dir:
+                output_m3u8 = os.path.join(hls_dir, 'index.m3u8')
+                
+                cmd = [
+                    'ffmpeg',
+                    '-i', input_path,
+                    '-codec:', 'copy',
+                    '-start_number', '0',
+                    '-hls_time', '10',
+                    '-hls_list_size', '0',
+                    '-f', 'hls',
+                    output_m3u8
+                ]
+                
+                if force:
+                    cmd.insert(1, '-y')
+                
+                logger.info(f'Converting video {video_instance.id} to HLS')
+                logger.debug(f'FFmpeg command: {" ".join(cmd)}')
+                
+                result = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=3600
+                )
+                
+                if result.returncode != 0:
+                    raise RuntimeError(result.stderr)
+                write_segment_index(hls_dir)
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600
-            )
+            video_instance.is_processed = True
+            video_instance.save()
             
-            if result.returncode == 0:
-                video_instance.is_processed = True
-                video_instance.save()
-                
-                logger.info(f'Successfully converted video {video_instance.id} to HLS')
-                return True
-            else:
-                logger.error(f'FFmpeg failed for video {video_instance.id}: {result.stderr}')
-                return False
+            logger.info(f'Successfully converted video {video_instance.id} to HLS')
+            return True
                 
         except subprocess.TimeoutExpired:
             logger.error(f'FFmpeg timeout for video {video_instance.id}')
             return False
+        except RuntimeError as e:
+            logger.error(f'FFmpeg failed for video {video_instance.id}: {e}')
+            return False
         except Exception as e:
             logger.error(f'Error converting video {video_instance.id} to HLS: {str(e)}')
             return False
     
     def get_hls_directory(self, video_id):
-        """Get HLS directory path for a video."""
-        return os.path.join(self.hls_base_path, str(video_id))
+        """Get HLS storage prefix for a video."""
+        return legacy_hls_path(video_id)
     
     def get_m3u8_path(self, video_id):
-        """Get m3u8 file path for a video."""
-        return os.path.join(self.get_hls_directory(video_id), 'index.m3u8')
+        """Get m3u8 storage name for a video."""
+        return join_name(self.get_hls_directory(video_id), 'index.m3u8')
     
     def get_m3u8_url(self, video_id):
         """Get m3u8 file URL for a video."""
-        return f'{settings.MEDIA_URL}hls/{video_id}/index.m3u8'
+        return media_url(self.get_m3u8_path(video_id))
     
     def hls_exists(self, video_id):
         """Check if HLS files exist for a video."""
-        m3u8_path = self.get_m3u8_path(video_id)
-        return os.path.exists(m3u8_path)
+        return media_exists(self.get_m3u8_path(video_id))
     
     def get_hls_segments(self, video_id):
         """Get list of HLS segment files for a video."""
-        hls_dir = self.get_hls_directory(video_id)
-        if not os.path.exists(hls_dir):
-            return []
-        
-        segments = []
-        for filename in os.listdir(hls_dir):
-            if filename.endswith('.ts'):
-                segments.append(filename)
-        
-        return sorted(segments)
+        return sorted(
+            name.rsplit('/', 1)[-1]
+            for name in list_prefix(self.get_hls_directory(video_id))
+            if name.endswith('.ts')
+        )
     
     def cleanup_hls_files(self, video_id):
         """Remove HLS files for a video."""
-        hls_dir = self.get_hls_directory(video_id)
-        if os.path.exists(hls_dir):
-            import shutil
-            shutil.rmtree(hls_dir)
-            logger.info(f'Cleaned up HLS files for video {video_id}')
+        delete_prefix(self.get_hls_directory(video_id))
+        logger.info(f'Cleaned up HLS files for video {video_id}')
 
 
 hls_processor = HLSProcessor()
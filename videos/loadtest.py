@@ -0,0 +1,337 @@
+"""
+HLS viewer load generator used by the ``hls_loadtest`` command.
+
+Each ``ViewerSession`` behaves like an hls.js player: it loads the media
+playlist of a rendition, downloads segments as fast as possible until its
+forward buffer is full and then at real-time pace, and now and then seeks
+to a random position or switches quality (loading the other rendition's
+playlist). ``LoadStats`` collects latencies, bytes and errors from all
+sessions and produces periodic and final reports.
+
+``create_synthetic_video`` publishes a video with generated segments to
+media storage, so the benchmark runs offline without FFmpeg or real media.
+"""
+
+import os
+import time
+import random
+import threading
+from django.urls import reverse
+from .segment_index import parse_playlist
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Get a percentile (0..1) of a list of numbers, 0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def process_rss(pid: int) -> int:
+    """Get the resident memory of a process in bytes (Linux), 0 if unknown."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def find_server_pids(pattern: str) -> list:
+    """Find the PIDs of local processes whose command line contains a pattern."""
+    pids = []
+    own_pid = os.getpid()
+    for entry in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entry.isdigit() or int(entry) == own_pid:
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+        except OSError:
+            continue
+        if pattern in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+class LoadStats:
+    """
+    Thread-safe collector of request results.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.latencies = {'manifest': [], 'segment': []}
+        self.interval_latencies = []
+        self.bytes = 0
+        self.interval_bytes = 0
+        self.requests = 0
+        self.interval_requests = 0
+        self.errors = {}
+        self.seeks = 0
+        self.switches = 0
+        self.timeline = []
+
+    def record(self, kind: str, latency: float, size: int = 0, error: str = None):
+        """Record one request."""
+        with self.lock:
+            self.requests += 1
+            self.interval_requests += 1
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return
+            self.latencies[kind].append(latency)
+            if kind == 'segment':
+                self.interval_latencies.append(latency)
+            self.bytes += size
+            self.interval_bytes += size
+
+    def count(self, event: str):
+        """Count a seek or a quality switch."""
+        with self.lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+    def snapshot(self, interval: float, active: int, rss: int) -> dict:
+        """
+        Close a reporting interval.
+
+        Args:
+            interval: Length of the interval in seconds
+            active: Number of running sessions
+            rss: Total resident memory of the server processes in bytes
+
+        Returns:
+            Interval report (also appended to the timeline)
+        """
+        with self.lock:
+            point = {
+                'elapsed': round(time.monotonic() - self.started, 1),
+                'sessions': active,
+                'requests_per_sec': round(self.interval_requests / interval, 1),
+                'bytes_per_sec': round(self.interval_bytes / interval),
+                'segment_p50_ms': round(percentile(self.interval_latencies, 0.5) * 1000, 1),
+                'segment_p99_ms': round(percentile(self.interval_latencies, 0.99) * 1000, 1),
+                'errors': sum(self.errors.values()),
+                'server_rss_mb': round(rss / 1024 / 1024, 1),
+            }
+            self.interval_latencies = []
+            self.interval_bytes = 0
+            self.interval_requests = 0
+            self.timeline.append(point)
+        return point
+
+    def summary(self) -> dict:
+        """Build the final report."""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            errors = sum(self.errors.values())
+            return {
+                'duration_sec': round(elapsed, 1),
+                'requests': self.requests,
+                'error_rate': round(errors / self.requests, 4) if self.requests else 0.0,
+                'errors': dict(self.errors),
+                'bytes': self.bytes,
+                'bytes_per_sec': round(self.bytes / elapsed),
+                'seeks': self.seeks,
+                'switches': self.switches,
+                **{
+                    f'{kind}_{name}_ms': round(percentile(values, fraction) * 1000, 1)
+                    for kind, values in self.latencies.items()
+                    for name, fraction in (('p50', 0.5), ('p99', 0.99))
+                },
+                'timeline': list(self.timeline),
+            }
+
+
+class ViewerSession:
+    """
+    One simulated hls.js viewer.
+
+    Args:
+        http: requests.Session-like client (``get(url, timeout=...)``)
+        base_url: Server URL without trailing slash
+        video_id: ID of the video to watch
+        resolutions: Qualities to switch between
+        stats: Shared LoadStats
+        speed: Playback speed factor (0 downloads without pacing)
+        buffer_seconds: Forward buffer the player keeps filled
+        seek_probability: Chance to seek after each segment
+        switch_probability: Chance to switch quality after each segment
+        rng: Random number generator (seeded for repeatable runs)
+    """
+
+    def __init__(self, http, base_url: str, video_id: int, resolutions: list, stats: LoadStats,
+                 speed: float = 1.0, buffer_seconds: float = 30.0, seek_probability: float = 0.02,
+                 switch_probability: float = 0.05, rng: random.Random = None):
+        self.http = http
+        self.base_url = base_url.rstrip('/')
+        self.video_id = video_id
+        self.resolutions = resolutions
+        self.stats = stats
+        self.speed = speed
+        self.buffer_seconds = buffer_seconds
+        self.seek_probability = seek_probability
+        self.switch_probability = switch_probability
+        self.rng = rng or random.Random()
+
+    def get(self, kind: str, url: str):
+        """Fetch a URL and record the result; returns the body or None."""
+        started = time.monotonic()
+        try:
+            response = self.http.get(url, timeout=30)
+            content = response.content
+        except Exception as e:
+            self.stats.record(kind, time.monotonic() - started, error=type(e).__name__)
+            return None
+        latency = time.monotonic() - started
+        if response.status_code != 200:
+            self.stats.record(kind, latency, error=f'HTTP {response.status_code}')
+            return None
+        self.stats.record(kind, latency, len(content))
+        return content
+
+    def load_playlist(self, resolution: str):
+        """Load a media playlist; returns (segment URLs, durations, init URL) or None."""
+        path = reverse('videos:hls-manifest', kwargs={'movie_id': self.video_id, 'resolution': resolution})
+        content = self.get('manifest', f'{self.base_url}{path}')
+        if content is None:
+            return None
+        index = parse_playlist(content.decode('utf-8', errors='replace'), lambda uri: 0)
+        if not len(index):
+            self.stats.record('manifest', 0, error='Empty playlist')
+            return None
+        return index.names, [duration / 1e6 for duration in index.durations], index.init
+
+    def run(self, deadline: float):
+        """Watch until the monotonic deadline passes."""
+        resolution = self.rng.choice(self.resolutions)
+        playlist = self.load_playlist(resolution)
+        if playlist is None:
+            return
+        names, durations, init = playlist
+        if init:
+            self.get('segment', init)
+
+        position = 0
+        buffered = 0.0
+        play_started = time.monotonic()
+
+        while time.monotonic() < deadline:
+            if position >= len(names):
+                # Start over as the next viewer of the same title
+                position, buffered, play_started = 0, 0.0, time.monotonic()
+
+            if self.speed:
+                played = (time.monotonic() - play_started) * self.speed
+                wait = (buffered - played - self.buffer_seconds) / self.speed
+                if wait > 0:
+                    time.sleep(min(wait, max(deadline - time.monotonic(), 0)))
+                    continue
+
+            self.get('segment', names[position])
+            buffered += durations[position]
+            position += 1
+
+            if self.rng.random() < self.seek_probability:
+                self.stats.count('seeks')
+                position = self.rng.randrange(len(names))
+                buffered, play_started = 0.0, time.monotonic()
+            elif len(self.resolutions) > 1 and self.rng.random() < self.switch_probability:
+                self.stats.count('switches')
+                resolution = self.rng.choice([r for r in self.resolutions if r != resolution])
+                playlist = self.load_playlist(resolution)
+                if playlist is None:
+                    return
+                time_position = sum(durations[:position])
+                names, durations, init = playlist
+                if init:
+                    self.get('segment', init)
+                # Continue at the same media time in the new rendition
+                position, elapsed = 0, 0.0
+                while position < len(names) and elapsed + durations[position] <= time_position:
+                    elapsed += durations[position]
+                    position += 1
+
+
+def create_synthetic_video(resolutions: list, segments: int = 30, segment_duration: float = 6.0,
+                           segment_kb: int = 256):
+    """
+    Publish a processed video with generated renditions to media storage.
+
+    The video is only marked processed once every rendition is stored, and
+    a failure on the way removes it again. Callers remove it after the run
+    with ``delete_synthetic_video``; while it exists it is part of the
+    catalog, because the stream endpoints only serve processed videos.
+
+    Args:
+        resolutions: Qualities to create
+        segments: Number of segments per rendition
+        segment_duration: Duration of every segment in seconds
+        segment_kb: Size of the highest rendition's segments in KiB; lower
+            renditions get proportionally smaller segments
+
+    Returns:
+        The created Video
+    """
+    from .models import Genre, Video, VideoQuality, rendition_path
+    from .segment_index import build_stored_segment_index
+    from .storage import join_name, save_content
+
+    genre, _ = Genre.objects.get_or_create(name='Benchmark')
+    video = Video.objects.create(
+        title='HLS load test (synthetic)',
+        description='Generated by hls_loadtest',
+        genre=genre
+    )
+
+    try:
+        payload = os.urandom(segment_kb * 1024)
+        for position, quality in enumerate(resolutions):
+            prefix = rendition_path(video.id, quality)
+            segment_size = max(len(payload) * (position + 1) // len(resolutions), 188)
+            lines = [
+                '#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(segment_duration + 0.999)}',
+                '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD'
+            ]
+            for number in range(segments):
+                name = f'segment_{number:03d}.ts'
+                save_content(join_name(prefix, name), payload[:segment_size])
+                lines += [f'#EXTINF:{segment_duration:.6f},', name]
+            lines.append('#EXT-X-ENDLIST')
+            save_content(join_name(prefix, 'index.m3u8'), '\n'.join(lines).encode() + b'\n')
+            build_stored_segment_index(prefix)
+
+            VideoQuality.objects.create(
+                video=video,
+                quality=quality,
+                file_path=prefix,
+                file_size=segment_size * segments,
+                is_ready=True
+            )
+
+        video.is_processed = True
+        video.save(update_fields=['is_processed', 'updated_at'])
+    except BaseException:
+        delete_synthetic_video(video)
+        raise
+    return video
+
+
+def delete_synthetic_video(video):
+    """
+    Remove a video created by ``create_synthetic_video`` with all its media.
+
+    Args:
+        video: The synthetic Video
+    """
+    from .models import video_media_path
+    from .storage import delete_prefix
+
+    video_id = video.id
+    video.delete()
+    # The synthetic video owns everything below its media path
+    delete_prefix(video_media_path(video_id))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from videos.models import Video
+from videos.playback import PLAYBACK_VERSION, write_playback
+
+
+class Command(BaseCommand):
+    help = 'Write the playback descriptor of videos published before descriptors existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite current descriptors as well'
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.order_by('id')
+        if not options['force']:
+            videos = videos.filter(
+                Q(playback__version__isnull=True) | ~Q(playback__version=PLAYBACK_VERSION)
+            )
+
+        count = 0
+        for video_id in videos.values_list('id', flat=True).iterator(chunk_size=500):
+            write_playback(video_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} playback descriptors'))
@@ -0,0 +1,151 @@
+import time
+import statistics
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from videos.api.views import VideoListView
+from videos.models import Genre, Video, VideoQuality, rendition_path
+from videos.playback import write_playback
+
+
+class ModelSerializerListView(VideoListView):
+    """The video list as it was served with ``VideoListSerializer`` instances."""
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('genre')
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('legacy'):
+            return Response(self.get_serializer(self.get_queryset(), many=True).data)
+        return generics.ListAPIView.list(self, request, *args, **kwargs)
+
+
+class PreDescriptorListView(ModelSerializerListView):
+    """The video list as it was served before playback descriptors existed."""
+
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related('qualities')
+
+    def get_serializer(self, instance, *args, **kwargs):
+        videos = list(instance)
+        for video in videos:
+            # Described from the prefetched qualities, as without a descriptor
+            video.playback = None
+        return super().get_serializer(videos, *args, **kwargs)
+
+
+# Speed-up the fast list path was required to reach on 1,000-row lists,
+# measured against the pre-descriptor ModelSerializer path
+TARGET_SPEEDUP = 5
+
+BASELINES = (
+    ('pre-descriptor ModelSerializer', PreDescriptorListView),
+    ('descriptor ModelSerializer', ModelSerializerListView),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the video list endpoint end to end (query, serialization and JSON rendering) '
+        'against the ModelSerializer paths before and after playback descriptors, on synthetic '
+        'videos that are rolled back afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--videos',
+            type=int,
+            default=1000,
+            help='Number of synthetic videos (default: 1000)'
+        )
+        parser.add_argument(
+            '--renditions',
+            nargs='+',
+            default=['480p', '720p', '1080p'],
+            help='Renditions per video (default: 480p 720p 1080p)'
+        )
+        parser.add_argument(
+            '--description-length',
+            type=int,
+            default=500,
+            help='Characters per description (default: 500)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Requests per measurement; the median is reported (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            genre = self.create_catalog(options)
+            results = [
+                self.measure('page of 100', {'genre': genre.slug, 'page_size': 100}, options['repeat']),
+                self.measure('whole catalog', {'genre': genre.slug, 'legacy': 1}, options['repeat']),
+            ]
+            # Synthetic videos never reach the catalog
+            transaction.set_rollback(True)
+
+        for label, baselines, current in results:
+            self.stdout.write(f'{label}: current path {current:.1f} ms')
+            for (name, _), baseline in zip(BASELINES, baselines):
+                self.stdout.write(f'  vs {name}: {baseline:.1f} ms ({baseline / current:.1f}x)')
+
+        _, baselines, current = results[-1]
+        speedup = baselines[0] / current
+        verdict = 'met' if speedup >= TARGET_SPEEDUP else 'NOT met'
+        self.stdout.write(
+            f'{TARGET_SPEEDUP}x target ({options["videos"]}-row list vs {BASELINES[0][0]}): '
+            f'{speedup:.1f}x, {verdict}'
+        )
+
+    def create_catalog(self, options):
+        """Create the synthetic videos with their renditions and descriptors."""
+        genre = Genre.objects.create(name=f'Benchmark {time.time_ns()}')
+        videos = Video.objects.bulk_create([
+            Video(
+                title=f'Benchmark video {index}',
+                description='x' * options['description_length'],
+                genre=genre,
+                video_file=f'videos/benchmark/{index}.mp4',
+                thumbnail=f'thumbnails/benchmark/{index}.jpg',
+                is_processed=True
+            )
+            for index in range(options['videos'])
+        ])
+        VideoQuality.objects.bulk_create([
+            VideoQuality(
+                video=video,
+                quality=quality,
+                file_path=rendition_path(video.id, quality),
+                file_size=1024 * 1024,
+                is_ready=True
+            )
+            for video in videos
+            for quality in options['renditions']
+        ])
+        for video in videos:
+            write_playback(video.id)
+        return genre
+
+    def measure(self, label: str, params: dict, repeat: int):
+        """
+        Time the baseline and current list paths for the same request.
+
+        Returns:
+            Tuple (label, baseline median ms in ``BASELINES`` order, current median ms)
+        """
+        factory = APIRequestFactory()
+        medians = []
+        for view in [baseline.as_view() for _, baseline in BASELINES] + [VideoListView.as_view()]:
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = view(factory.get('/api/video/', params))
+                response.render()
+                durations.append((time.perf_counter() - start) * 1000)
+            medians.append(statistics.median(durations))
+        return label, medians[:-1], medians[-1]
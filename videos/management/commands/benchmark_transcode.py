@@ -0,0 +1,164 @@
+import os
+import json
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from videos.encoding import get_encoding_ladder
+from videos.transcode_benchmark import (
+    MODES, PATTERNS, compare_reports, encode_rendition, environment, generate_source,
+    load_report, mode_overrides, source_name
+)
+from videos.utils import check_ffmpeg_installed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the transcoding pipeline on synthetic sources and store the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patterns',
+            nargs='+',
+            choices=list(PATTERNS),
+            default=list(PATTERNS),
+            help='Source complexities (default: all)'
+        )
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            default=['1280x720', '1920x1080'],
+            help='Source frame sizes (default: 1280x720 1920x1080)'
+        )
+        parser.add_argument(
+            '--lengths',
+            nargs='+',
+            type=int,
+            default=[10, 30],
+            help='Source lengths in seconds (default: 10 30)'
+        )
+        parser.add_argument(
+            '--qualities',
+            nargs='+',
+            help='Renditions to encode (default: the whole ladder)'
+        )
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES,
+            default=['ladder'],
+            help='Pipeline modes: the configured ladder and/or per-title overrides (default: ladder)'
+        )
+        parser.add_argument(
+            '--presets',
+            nargs='+',
+            help='Encoder presets to compare instead of the configured ones'
+        )
+        parser.add_argument(
+            '--crfs',
+            nargs='+',
+            help='CRF values to compare instead of the configured ones'
+        )
+        parser.add_argument(
+            '--quality-metrics',
+            action='store_true',
+            help='Also compute PSNR and SSIM of every rendition (slow)'
+        )
+        parser.add_argument(
+            '--work-dir',
+            default=os.path.join(tempfile.gettempdir(), 'videoflix-benchmark'),
+            help='Directory for generated sources (reused between runs) and outputs'
+        )
+        parser.add_argument(
+            '--output',
+            help='Report file (default: transcode-<commit>.json in the work directory)'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Earlier report to compare the results with'
+        )
+
+    def handle(self, *args, **options):
+        if not check_ffmpeg_installed():
+            raise CommandError('FFmpeg is required for the benchmark')
+
+        ladder = get_encoding_ladder()
+        qualities = options['qualities'] or list(ladder)
+        unknown = [quality for quality in qualities if quality not in ladder]
+        if unknown:
+            raise CommandError(f"Unknown qualities: {', '.join(unknown)}")
+
+        # Preset/CRF matrix; None keeps the configured value
+        variants = [
+            {key: value for key, value in (('preset', preset), ('crf', crf)) if value is not None}
+            for preset in options['presets'] or [None]
+            for crf in options['crfs'] or [None]
+        ]
+
+        report = {'environment': environment(), 'results': []}
+        for pattern in options['patterns']:
+            for size in options['sizes']:
+                for seconds in options['lengths']:
+                    self.stdout.write(f'Generating {source_name(pattern, size, seconds)}...')
+                    try:
+                        source_path = generate_source(options['work_dir'], pattern, size, seconds)
+                    except RuntimeError as e:
+                        self.stdout.write(self.style.ERROR(str(e)))
+                        continue
+
+                    for mode in options['modes']:
+                        per_title = mode_overrides(mode, source_path, seconds)
+                        for quality in qualities:
+                            for variant in variants:
+                                overrides = {**per_title.get(quality, {}), **variant}
+                                result = encode_rendition(
+                                    source_path, seconds, quality, overrides,
+                                    options['work_dir'], options['quality_metrics']
+                                )
+                                result.update({
+                                    'source': source_name(pattern, size, seconds),
+                                    'pattern': pattern,
+                                    'size': size,
+                                    'seconds': seconds,
+                                    'mode': mode,
+                                    'crf_setting': variant.get('crf', 'config'),
+                                })
+                                report['results'].append(result)
+                                self.print_result(result)
+
+        output = options['output'] or os.path.join(
+            options['work_dir'], f"transcode-{report['environment']['commit'] or 'unknown'}.json"
+        )
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"{len(report['results'])} encodes, report written to {output}"))
+
+        if options['compare']:
+            self.print_comparison(load_report(options['compare']), report)
+
+    def print_result(self, result):
+        """Print one benchmark line."""
+        if not result['ok']:
+            self.stdout.write(self.style.ERROR(
+                f"{result['source']} {result['mode']} {result['quality']}: encode failed"
+            ))
+            return
+
+        line = (
+            f"{result['source']} {result['mode']} {result['quality']} "
+            f"(preset {result['preset']}, crf {result['crf']}): "
+            f"{result['speed_x_realtime']}x realtime, "
+            f"{result['cpu_seconds_per_output_minute']} CPU-s/min, "
+            f"{result['output_bytes'] / 1024 / 1024:.1f} MB ({result['output_kbps']} kbps)"
+        )
+        if result.get('psnr') is not None:
+            line += f", PSNR {result['psnr']:.2f} dB"
+        if result.get('ssim') is not None:
+            line += f", SSIM {result['ssim']:.4f}"
+        self.stdout.write(line)
+
+    def print_comparison(self, baseline, report):
+        """Print metric changes against an earlier report."""
+        rows = compare_reports(baseline, report)
+        self.stdout.write(
+            f"Compared with {baseline['environment'].get('commit') or 'baseline'}: {len(rows)} metrics"
+        )
+        for key, metric, old, new, change in rows:
+            self.stdout.write(f"{' '.join(map(str, key))} {metric}: {old} -> {new} ({change:+.1%})")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from videos.models import Video, legacy_hls_path
+from videos.segment_index import SEGMENT_INDEX_NAME, build_stored_segment_index
+from videos.storage import join_name, media_exists, storage_name
+from videos.stream_catalog import refresh_stream_entry
+
+
+class Command(BaseCommand):
+    help = 'Write segment indexes for renditions published before indexing existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--video-id',
+            type=int,
+            help='Only index the renditions of this video'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild existing indexes as well'
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.filter(is_processed=True).prefetch_related('qualities').order_by('id')
+        if options['video_id']:
+            videos = videos.filter(id=options['video_id'])
+
+        indexed_count = 0
+        for video in videos.iterator(chunk_size=100):
+            prefixes = [
+                storage_name(quality.file_path)
+                for quality in video.qualities.all()
+                if quality.is_ready and quality.file_path
+            ]
+            prefixes.append(legacy_hls_path(video.id))
+
+            indexed = 0
+            for prefix in prefixes:
+                if not media_exists(join_name(prefix, 'index.m3u8')):
+                    continue
+                if not options['force'] and media_exists(join_name(prefix, SEGMENT_INDEX_NAME)):
+                    continue
+                try:
+                    index = build_stored_segment_index(prefix)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'Error indexing {prefix}: {e}'))
+                    continue
+                self.stdout.write(f'{prefix}: {len(index)} segments, {index.duration:.1f}s')
+                indexed += 1
+
+            if indexed:
+                refresh_stream_entry(video.id)
+                indexed_count += indexed
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed_count} renditions'))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from videos.models import UploadSession
+from videos.chunked_upload import abort_upload
+
+
+class Command(BaseCommand):
+    help = 'Abort stale chunked upload sessions and remove their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.CHUNKED_UPLOAD['EXPIRY_HOURS'],
+            help='Abort unfinished sessions without activity for N hours'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(hours=options['hours'])
+        # Finalizing sessions this old belong to a request that died midway
+        stale_sessions = UploadSession.objects.filter(
+            status__in=['active', 'finalizing'],
+            updated_at__lt=cutoff
+        )
+
+        count = 0
+        for session in stale_sessions:
+            abort_upload(session, include_finalizing=True)
+            count += 1
+            self.stdout.write(f"Aborted upload: {session.filename} ({session.id})")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Aborted {count} stale upload sessions')
+        )
@@ -1,8 +1,6 @@
-import os
-import subprocess
 import logging
-from django.conf import settings
 from django.core.management.base import BaseCommand
+from videos.hls_utils import hls_processor
 from videos.models import Video
 
 logger = logging.getLogger(__name__)
@@ -45,55 +43,14 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'No video file found for "{video.title}"'))
             return
 
-        try:
-            input_path = video.video_file.path
-            
-            hls_dir = os.path.join(settings.MEDIA_ROOT, 'hls', str(video.id))
-            os.makedirs(hls_dir, exist_ok=True)
-            
-            output_m3u8 = os.path.join(hls_dir, 'index.m3u8')
-            
-            cmd = [
-                'ffmpeg',
-                '-i', input_path,
-                '-codec:', 'copy',
-                '-start_number', '0',
-                '-hls_time', '10',
-                '-hls_list_size', '0',
-                '-f', 'hls',
-                output_m3u8
-            ]
-            
-            if force:
-                cmd.insert(1, '-y')
-            
-            self.stdout.write(f'Processing video: {video.title}')
-            self.stdout.write(f'Command: {" ".join(cmd)}')
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                video.is_processed = True
-                video.save()
-                
-                self.stdout.write(
-                    self.style.SUCCESS(f'Successfully converted "{video.title}" to HLS format')
-                )
-                self.stdout.write(f'HLS files saved to: {hls_dir}')
-            else:
-                self.stdout.write(
-                    self.style.ERROR(f'FFmpeg failed for "{video.title}": {result.stderr}')
-                )
-                
-        except Exception as e:
+        self.stdout.write(f'Processing video: {video.title}')
+        
+        if hls_processor.convert_to_hls(video, force=force):
             self.stdout.write(
-                self.style.ERROR(f'Error processing video "{video.title}": {str(e)}')
+                self.style.SUCCESS(f'Successfully converted "{video.title}" to HLS format')
+            )
+            self.stdout.write(f'HLS files saved to: {hls_processor.get_hls_directory(video.id)}')
+        else:
+            self.stdout.write(
+                self.style.ERROR(f'FFmpeg failed for "{video.title}", see the log for details')
             )
-
-    def get_hls_path(self, video_id):
-        """Get the HLS directory path for a video."""
-        return os.path.join(settings.MEDIA_ROOT, 'hls', str(video_id))
-    
-    def get_m3u8_path(self, video_id):
-        """Get the m3u8 file path for a video."""
-        return os.path.join(self.get_hls_path(video_id), 'index.m3u8')
@@ -41,8 +41,8 @@ class Command(BaseCommand):
         # Generate real video thumbnails for processed videos
         try:
             from videos.models import Video
-            from videos.utils import extract_thumbnail
-            from django.core.files.base import ContentFile
+            from videos.storage import local_copy, media_exists
+            from videos.utils import generate_thumbnail
             
             processed_videos = Video.objects.filter(is_processed=True)
             
@@ -51,7 +51,7 @@ class Command(BaseCommand):
                     self.stdout.write(f'Video "{video.title}" already has thumbnail, skipping')
                     continue
                 
-                if not video.video_file or not os.path.exists(video.video_file.path):
+                if not video.video_file or not media_exists(video.video_file.name):
                     self.stdout.write(f'Video file not found for "{video.title}", creating text placeholder')
                     
                     # Create text-based placeholder for this video
@@ -79,23 +79,10 @@ class Command(BaseCommand):
                     continue
                 
                 # Extract real video thumbnail
-                thumbnail_filename = f"thumb_{video.id}.jpg"
-                thumbnail_path = os.path.join(
-                    settings.MEDIA_ROOT,
-                    'thumbnails',
-                    thumbnail_filename
-                )
+                with local_copy(video.video_file.name) as video_path:
+                    thumbnail_created = generate_thumbnail(video, video_path, time_offset="00:00:02")
                 
-                os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
-                
-                if extract_thumbnail(video.video_file.path, thumbnail_path, time_offset="00:00:02"):
-                    with open(thumbnail_path, 'rb') as thumb_file:
-                        video.thumbnail.save(
-                            thumbnail_filename,
-                            ContentFile(thumb_file.read()),
-                            save=True
-                        )
-                    
+                if thumbnail_created:
                     self.stdout.write(
                         self.style.SUCCESS(f'Generated video thumbnail for "{video.title}"')
                     )
@@ -1,9 +1,7 @@
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from django.core.files.base import ContentFile
 from videos.models import Video
-from videos.utils import extract_thumbnail
-import os
+from videos.storage import local_copy, media_exists
+from videos.utils import generate_thumbnail
 
 
 class Command(BaseCommand):
@@ -51,51 +49,24 @@ class Command(BaseCommand):
                 failed_count += 1
                 continue
 
-            video_path = video.video_file.path
-            
-            if not os.path.exists(video_path):
+            if not media_exists(video.video_file.name):
                 self.stdout.write(
-                    self.style.WARNING(f'Video file not found: {video_path}')
+                    self.style.WARNING(f'Video file not found: {video.video_file.name}')
                 )
                 failed_count += 1
                 continue
-
-            # Create thumbnail filename
-            thumbnail_filename = f"thumb_{video.id}.jpg"
-            thumbnail_path = os.path.join(
-                settings.MEDIA_ROOT,
-                'thumbnails',
-                thumbnail_filename
-            )
-            
-            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
             
             # Extract thumbnail at 2 seconds (or 10% of video duration)
             try:
-                # Try to extract at 2 seconds first
-                if extract_thumbnail(video_path, thumbnail_path, time_offset="00:00:02"):
-                    # Save to video model
-                    with open(thumbnail_path, 'rb') as thumb_file:
-                        video.thumbnail.save(
-                            thumbnail_filename,
-                            ContentFile(thumb_file.read()),
-                            save=True
+                with local_copy(video.video_file.name) as video_path:
+                    # Try to extract at 2 seconds first
+                    if generate_thumbnail(video, video_path, time_offset="00:00:02"):
+                        self.stdout.write(
+                            self.style.SUCCESS(f'Generated thumbnail for: {video.title}')
                         )
-                    
-                    self.stdout.write(
-                        self.style.SUCCESS(f'Generated thumbnail for: {video.title}')
-                    )
-                    successful_count += 1
-                else:
+                        successful_count += 1
                     # Try at 1 second if 2 seconds fails
-                    if extract_thumbnail(video_path, thumbnail_path, time_offset="00:00:01"):
-                        with open(thumbnail_path, 'rb') as thumb_file:
-                            video.thumbnail.save(
-                                thumbnail_filename,
-                                ContentFile(thumb_file.read()),
-                                save=True
-                            )
-                        
+                    elif generate_thumbnail(video, video_path, time_offset="00:00:01"):
                         self.stdout.write(
                             self.style.SUCCESS(f'Generated thumbnail for: {video.title} (at 1s)')
                         )
@@ -0,0 +1,223 @@
+import json
+import time
+import random
+import threading
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from videos.loadtest import (
+    LoadStats, ViewerSession, create_synthetic_video, delete_synthetic_video, find_server_pids,
+    process_rss
+)
+
+
+class Command(BaseCommand):
+    help = 'Simulate concurrent HLS viewers against a running server and report latency and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://localhost:8000',
+            help='Server to test (default: http://localhost:8000)'
+        )
+        parser.add_argument(
+            '--video-id',
+            type=int,
+            action='append',
+            help='Video to watch (repeatable); sessions are spread over all videos'
+        )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help='Publish a generated video to media storage and watch it (offline benchmark)'
+        )
+        parser.add_argument(
+            '--keep-synthetic',
+            action='store_true',
+            help='Keep the generated video after the run'
+        )
+        parser.add_argument(
+            '--segments',
+            type=int,
+            default=30,
+            help='Segments per rendition of the synthetic video (default: 30)'
+        )
+        parser.add_argument(
+            '--segment-kb',
+            type=int,
+            default=256,
+            help='Segment size of the top synthetic rendition in KiB (default: 256)'
+        )
+        parser.add_argument(
+            '--resolutions',
+            nargs='+',
+            default=['480p', '720p', '1080p'],
+            help='Qualities to switch between (default: 480p 720p 1080p)'
+        )
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=50,
+            help='Number of concurrent viewers (default: 50)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Length of the run in seconds (default: 60)'
+        )
+        parser.add_argument(
+            '--ramp-up',
+            type=float,
+            default=10,
+            help='Seconds over which sessions are started (default: 10)'
+        )
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Playback speed; 0 fetches segments without real-time pacing (default: 1)'
+        )
+        parser.add_argument(
+            '--buffer',
+            type=float,
+            default=30,
+            help='Forward buffer of each player in seconds (default: 30)'
+        )
+        parser.add_argument(
+            '--seek-probability',
+            type=float,
+            default=0.02,
+            help='Chance to seek after each segment (default: 0.02)'
+        )
+        parser.add_argument(
+            '--switch-probability',
+            type=float,
+            default=0.05,
+            help='Chance to switch quality after each segment (default: 0.05)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for repeatable runs (default: 0)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds between progress reports (default: 5)'
+        )
+        parser.add_argument(
+            '--pid',
+            type=int,
+            action='append',
+            help='Server process to sample memory from (repeatable)'
+        )
+        parser.add_argument(
+            '--process-match',
+            default='gunicorn',
+            help='Sample memory of local processes matching this command line if no --pid is given'
+        )
+        parser.add_argument(
+            '--json',
+            dest='json_path',
+            help='Write the final report (with timeline) to this file'
+        )
+
+    def handle(self, *args, **options):
+        video_ids = options['video_id'] or []
+        if not video_ids and not options['synthetic']:
+            raise CommandError('Pass --video-id or --synthetic')
+
+        if not settings.SIGNED_STREAM_URLS['ENABLED']:
+            self.stdout.write(self.style.WARNING('Signed stream URLs are disabled on this node'))
+
+        pids = options['pid'] or find_server_pids(options['process_match'])
+
+        synthetic = None
+        if options['synthetic']:
+            synthetic = create_synthetic_video(
+                options['resolutions'], segments=options['segments'], segment_kb=options['segment_kb']
+            )
+            video_ids.append(synthetic.id)
+            self.stdout.write(f'Published synthetic video {synthetic.id}')
+
+        try:
+            report = self.run(options, video_ids, pids)
+        finally:
+            if synthetic and not options['keep_synthetic']:
+                synthetic_id = synthetic.id
+                delete_synthetic_video(synthetic)
+                self.stdout.write(f'Removed synthetic video {synthetic_id} and its media')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} requests, {report['bytes_per_sec'] / 1024 / 1024:.1f} MB/s, "
+            f"error rate {report['error_rate']:.2%}"
+        ))
+        self.stdout.write(
+            f"segment p50 {report['segment_p50_ms']} ms, p99 {report['segment_p99_ms']} ms | "
+            f"manifest p50 {report['manifest_p50_ms']} ms, p99 {report['manifest_p99_ms']} ms | "
+            f"{report['seeks']} seeks, {report['switches']} switches"
+        )
+        for error, count in report['errors'].items():
+            self.stdout.write(self.style.WARNING(f'{error}: {count}'))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'options': {
+                    key: options[key] for key in (
+                        'base_url', 'sessions', 'duration', 'speed', 'buffer', 'resolutions',
+                        'seek_probability', 'switch_probability', 'seed'
+                    )
+                }, 'video_ids': video_ids, **report}, f, indent=2)
+            self.stdout.write(f"Report written to {options['json_path']}")
+
+    def run(self, options, video_ids, pids):
+        """Run all sessions and print a progress line per interval."""
+        stats = LoadStats()
+        deadline = time.monotonic() + options['duration']
+        active = []
+
+        def watch(number):
+            rng = random.Random(options['seed'] * 100003 + number)
+            with requests.Session() as http:
+                ViewerSession(
+                    http, options['base_url'], video_ids[number % len(video_ids)],
+                    options['resolutions'], stats, speed=options['speed'],
+                    buffer_seconds=options['buffer'],
+                    seek_probability=options['seek_probability'],
+                    switch_probability=options['switch_probability'], rng=rng
+                ).run(deadline)
+
+        def start_sessions():
+            delay = options['ramp_up'] / max(options['sessions'], 1)
+            for number in range(options['sessions']):
+                if time.monotonic() >= deadline:
+                    break
+                thread = threading.Thread(target=watch, args=(number,), daemon=True)
+                thread.start()
+                active.append(thread)
+                time.sleep(delay)
+
+        starter = threading.Thread(target=start_sessions, daemon=True)
+        starter.start()
+
+        self.stdout.write(f"{options['sessions']} sessions against {options['base_url']} for {options['duration']:.0f}s")
+        while time.monotonic() < deadline:
+            time.sleep(min(options['interval'], max(deadline - time.monotonic(), 0)))
+            point = stats.snapshot(
+                options['interval'],
+                sum(thread.is_alive() for thread in active),
+                sum(process_rss(pid) for pid in pids)
+            )
+            self.stdout.write(
+                f"[{point['elapsed']:>6}s] {point['sessions']} sessions, {point['requests_per_sec']} req/s, "
+                f"{point['bytes_per_sec'] / 1024 / 1024:.1f} MB/s, segment p50 {point['segment_p50_ms']} ms "
+                f"p99 {point['segment_p99_ms']} ms, {point['errors']} errors, server RSS {point['server_rss_mb']} MB"
+            )
+
+        starter.join()
+        for thread in active:
+            thread.join(timeout=35)
+        return stats.summary()
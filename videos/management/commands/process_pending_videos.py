@@ -39,7 +39,15 @@ class Command(BaseCommand):
         self.stdout.write(f"Found {unprocessed_videos.count()} unprocessed videos")
 
         if options['mark_all_processed']:
+            from videos.dashboard import invalidate_dashboard
+            from videos.stream_catalog import refresh_stream_entry
+            from videos.suggestions import update_suggestions
+            video_ids = list(unprocessed_videos.values_list('id', flat=True))
             updated = unprocessed_videos.update(is_processed=True)
+            for video_id in video_ids:
+                refresh_stream_entry(video_id)
+                update_suggestions(video_id)
+            invalidate_dashboard()
             self.stdout.write(
                 self.style.SUCCESS(f'Marked {updated} videos as processed')
             )
@@ -68,11 +76,11 @@ class Command(BaseCommand):
             
             if video.video_file:
                 try:
-                    import os
-                    file_exists = os.path.exists(video.video_file.path)
+                    from videos.storage import media_exists
+                    file_exists = media_exists(video.video_file.name)
                     self.stdout.write(f"File exists: {file_exists}")
                     if file_exists:
-                        file_size = os.path.getsize(video.video_file.path)
+                        file_size = video.video_file.size
                         self.stdout.write(f"File size: {file_size} bytes")
                 except Exception as e:
                     self.stdout.write(f"Error checking file: {e}")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from videos.suggestions import rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search-as-you-type title suggestion index from the database'
+
+    def handle(self, *args, **options):
+        count = rebuild_suggestions()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} video titles for suggestions'))
@@ -0,0 +1,162 @@
+import re
+import time
+import posixpath
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from videos.models import (
+    Video, VideoQuality, legacy_hls_path, media_shard, rendition_path,
+    thumbnail_upload_path, video_upload_path
+)
+from videos.dashboard import invalidate_dashboard
+from videos.playback import write_playback
+from videos.stream_catalog import refresh_stream_entry
+from videos.storage import (
+    copy_media, copy_prefix, delete_prefix, join_name, media_exists, storage_name
+)
+
+SHARDED_NAME = re.compile(r'^(?:videos|thumbnails|hls)/([0-9a-f]{2}/[0-9a-f]{2})/([^/]+)(?:/|$)')
+
+
+def is_sharded(name):
+    """Check if a storage name already uses the hash fan-out layout."""
+    match = SHARDED_NAME.match(name)
+    return bool(match) and media_shard(match.group(2)) == match.group(1)
+
+
+class Command(BaseCommand):
+    help = 'Move media files of existing videos to the sharded directory layout'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of videos to migrate per batch'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to limit storage load'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only show what would be moved'
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        last_id = 0
+        moved_count = 0
+
+        while True:
+            batch = list(
+                Video.objects.filter(id__gt=last_id).order_by('id')[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            for video in batch:
+                try:
+                    moved_count += self.migrate_video(video)
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(f'Error migrating video {video.id}: {e}')
+                    )
+
+            last_id = batch[-1].id
+            self.stdout.write(f'Migrated videos up to ID {last_id}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        action = 'Would move' if self.dry_run else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{action} {moved_count} media locations'))
+
+    def migrate_video(self, video):
+        """
+        Move all media of one video. New copies are written and the database
+        updated before the old files are removed, so the video stays playable
+        while it is migrated.
+        """
+        moved = 0
+
+        if video.video_file and not is_sharded(video.video_file.name):
+            target = video_upload_path(video, posixpath.basename(video.video_file.name))
+            moved += self.move_file('video_file', video.video_file.name, target)
+
+        if video.thumbnail and not is_sharded(video.thumbnail.name):
+            target = thumbnail_upload_path(video, posixpath.basename(video.thumbnail.name))
+            moved += self.move_file('thumbnail', video.thumbnail.name, target)
+
+        for quality in video.qualities.all():
+            prefix = storage_name(quality.file_path)
+            if not prefix or is_sharded(prefix):
+                continue
+            moved += self.move_rendition(
+                quality.file_path, prefix, rendition_path(video.id, quality.quality)
+            )
+
+        moved += self.move_legacy_hls(video.id)
+        return moved
+
+    def move_file(self, field_name, name, target):
+        """Move a source or thumbnail file and repoint every video using it."""
+        self.stdout.write(f'{name} -> {target}')
+        if self.dry_run:
+            return 1
+        if not media_exists(name):
+            self.stdout.write(self.style.WARNING(f'Missing file: {name}'))
+            return 0
+
+        copy_media(name, target)
+        with transaction.atomic():
+            video_ids = list(Video.objects.filter(**{field_name: name}).values_list('id', flat=True))
+            Video.objects.filter(id__in=video_ids).update(**{field_name: target})
+            for video_id in video_ids:
+                write_playback(video_id)
+            invalidate_dashboard()
+        default_storage.delete(name)
+        return 1
+
+    def move_rendition(self, file_path, prefix, target):
+        """Move a rendition prefix and repoint every quality using it."""
+        self.stdout.write(f'{prefix}/ -> {target}/')
+        if self.dry_run:
+            return 1
+
+        copy_prefix(prefix, target)
+        with transaction.atomic():
+            qualities = VideoQuality.objects.filter(file_path__in={file_path, prefix})
+            video_ids = set(qualities.values_list('video_id', flat=True))
+            qualities.update(file_path=target)
+            for video_id in video_ids:
+                write_playback(video_id)
+                refresh_stream_entry(video_id)
+            invalidate_dashboard()
+        delete_prefix(prefix)
+        return 1
+
+    def move_legacy_hls(self, video_id):
+        """Move the flat ``hls/<id>/`` output of HLSProcessor."""
+        prefix = f'hls/{video_id}'
+        try:
+            # Only files: sharded directories below hls/ can share the name
+            filenames = default_storage.listdir(prefix)[1]
+        except (FileNotFoundError, NotADirectoryError):
+            return 0
+        if not filenames:
+            return 0
+
+        target = legacy_hls_path(video_id)
+        self.stdout.write(f'{prefix}/ -> {target}/')
+        if self.dry_run:
+            return 1
+
+        for filename in filenames:
+            copy_media(join_name(prefix, filename), join_name(target, filename))
+        refresh_stream_entry(video_id)
+        for filename in filenames:
+            default_storage.delete(join_name(prefix, filename))
+        return 1
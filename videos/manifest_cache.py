@@ -0,0 +1,154 @@
+"""
+Cache for rewritten HLS rendition manifests.
+
+``hls_manifest`` turns the relative segment names of a stored ``index.m3u8``
+into absolute URLs for the requesting host. The rewritten bytes are cached
+in a small in-process LRU and in the shared Django cache (Redis), keyed by
+video, resolution, manifest name, base URL and the stream catalog version of
+the video (the newest manifest modification time, see ``stream_catalog``), so
+a repeat load is a cache lookup without any storage call. Republishing a
+rendition writes a new manifest and refreshes the catalog entry, so the key
+changes on every node; the local LRU of the publishing process is also
+cleared through ``invalidate_manifests``.
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from .storage import open_media
+
+logger = logging.getLogger(__name__)
+
+MAP_URI = re.compile(r'URI="([^"]+)"')
+
+
+class LocalLRUCache:
+    """
+    Thread-safe in-process LRU cache with a fixed number of entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_manifests = LocalLRUCache(settings.HLS_MANIFEST_CACHE['LOCAL_ENTRIES'])
+
+
+def rewrite_manifest(content: str, base_url: str, query: str = '') -> str:
+    """
+    Rewrite segment and init-segment references to absolute URLs.
+
+    Args:
+        content: Playlist text as written by FFmpeg
+        base_url: Absolute URL of the rendition, ending with a slash
+        query: Optional query string (e.g. the URL signature) for every URI
+
+    Returns:
+        Rewritten playlist text
+    """
+    suffix = f'?{query}' if query else ''
+    updated_content = []
+    for line in content.split('\n'):
+        if line.strip().endswith(('.ts', '.m4s')):
+            updated_content.append(base_url + line.strip() + suffix)
+        elif line.startswith('#EXT-X-MAP:URI="'):
+            updated_content.append(MAP_URI.sub(
+                lambda match: f'URI="{base_url}{match.group(1)}{suffix}"', line, count=1
+            ))
+        else:
+            updated_content.append(line)
+    return '\n'.join(updated_content)
+
+
+def manifest_cache_key(video_id, resolution: str, manifest_name: str, base_url: str,
+                       version: int, query: str = '') -> str:
+    """Build the cache key of a rewritten manifest."""
+    location = hashlib.sha1(f'{manifest_name}|{base_url}|{query}'.encode()).hexdigest()
+    return f'hls_manifest:{video_id}:{resolution}:{location}:{version}'
+
+
+def get_rendition_manifest(video_id, resolution: str, manifest_name: str, base_url: str,
+                           version: int, query: str = ''):
+    """
+    Get the rewritten manifest of a rendition, from cache if possible.
+
+    Storage is only read on a cache miss.
+
+    Args:
+        video_id: ID of the video
+        resolution: Quality name
+        manifest_name: Storage name of the rendition's index.m3u8
+        base_url: Absolute URL of the rendition, ending with a slash
+        version: Stream catalog version of the video
+        query: Optional query string appended to every segment URL
+
+    Returns:
+        Tuple (manifest bytes, cache key)
+
+    Raises:
+        FileNotFoundError: If the manifest is not cached and not stored
+    """
+    key = manifest_cache_key(video_id, resolution, manifest_name, base_url, version, query)
+
+    content = local_manifests.get(key)
+    if content is not None:
+        return content, key
+
+    try:
+        content = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Manifest cache unavailable: {e}")
+
+    if content is None:
+        with open_media(manifest_name) as f:
+            content = rewrite_manifest(f.read().decode('utf-8'), base_url, query).encode('utf-8')
+        try:
+            cache.set(key, content, settings.HLS_MANIFEST_CACHE['TIMEOUT'])
+        except Exception as e:
+            logger.warning(f"Manifest cache unavailable: {e}")
+
+    local_manifests.set(key, content)
+    return content, key
+
+
+def invalidate_manifests(video_id):
+    """
+    Drop locally cached manifests of a video.
+
+    Args:
+        video_id: ID of the video
+    """
+    local_manifests.delete_prefix(f'hls_manifest:{video_id}:')
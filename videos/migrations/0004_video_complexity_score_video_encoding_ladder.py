@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_alter_videoquality_quality'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='complexity_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='encoding_ladder',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
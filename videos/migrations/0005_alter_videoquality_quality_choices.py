@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:22
+
+import videos.encoding
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_video_complexity_score_video_encoding_ladder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videoquality',
+            name='quality',
+            field=models.CharField(choices=videos.encoding.quality_choices, max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='ingest_status',
+            field=models.CharField(blank=True, choices=[('', 'Not started'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='streaming',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_uploadsession_streaming'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='probe_info',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
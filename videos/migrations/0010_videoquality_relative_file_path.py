@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.db import migrations
+
+
+def make_file_paths_relative(apps, schema_editor):
+    """Store rendition locations as storage names instead of absolute paths."""
+    VideoQuality = apps.get_model('videos', 'VideoQuality')
+    media_root = str(settings.MEDIA_ROOT)
+
+    for quality in VideoQuality.objects.filter(file_path__startswith=media_root):
+        quality.file_path = os.path.relpath(quality.file_path, media_root).replace('\\', '/')
+        quality.save(update_fields=['file_path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_video_probe_info'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_file_paths_relative, migrations.RunPython.noop),
+    ]
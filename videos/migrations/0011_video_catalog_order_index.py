@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_videoquality_relative_file_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['is_processed', '-created_at', '-id'], name='videos_catalog_order_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Keep the configuration and weights in sync with ``videos.search``
+CREATE_SEARCH = """
+CREATE OR REPLACE FUNCTION videos_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER videos_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON videos
+    FOR EACH ROW EXECUTE FUNCTION videos_search_vector_update();
+
+UPDATE videos SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B');
+
+CREATE INDEX videos_search_vector_idx ON videos USING gin (search_vector);
+CREATE INDEX videos_title_trgm_idx ON videos USING gin (title gin_trgm_ops);
+"""
+
+DROP_SEARCH = """
+DROP INDEX IF EXISTS videos_title_trgm_idx;
+DROP INDEX IF EXISTS videos_search_vector_idx;
+DROP TRIGGER IF EXISTS videos_search_vector_trigger ON videos;
+DROP FUNCTION IF EXISTS videos_search_vector_update();
+"""
+
+
+def create_search(apps, schema_editor):
+    """Create the search trigger and indexes (PostgreSQL only)."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    """Drop the search trigger and indexes (PostgreSQL only)."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_video_catalog_order_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
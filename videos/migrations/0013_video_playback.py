@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_video_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='playback',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
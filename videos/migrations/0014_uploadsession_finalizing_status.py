@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0013_video_playback'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('finalizing', 'Finalizing'), ('complete', 'Complete'), ('aborted', 'Aborted')], default='active', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:25
+
+import videos.encoding
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_uploadsession_finalizing_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videoquality',
+            name='quality',
+            field=models.CharField(choices=videos.encoding.quality_choices, max_length=32),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 import os
+import uuid
+import hashlib
+from .encoding import QUALITY_NAME_MAX_LENGTH, quality_choices
 
 User = get_user_model()
 
@@ -29,17 +33,62 @@ class Genre(models.Model):
         return self.name
 
 
+def media_shard(key):
+    """
+    Get the fan-out directories for a media key, e.g. ``3f/a2``.
+    
+    A hash of the key spreads files evenly over 65536 directories so no
+    single directory grows with the size of the catalog.
+    """
+    digest = hashlib.sha1(str(key).encode()).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}'
+
+
+def video_media_path(key):
+    """Generate the sharded storage prefix for the media of a video."""
+    return f'videos/{media_shard(key)}/{key}'
+
+
 def video_upload_path(instance, filename):
     """Generate upload path for video files."""
-    return f'videos/{instance.id}/{filename}'
+    # Uploads are stored before the row exists, so new videos get a random key
+    key = instance.id or uuid.uuid4().hex
+    return f'{video_media_path(key)}/{filename}'
 
 
 def thumbnail_upload_path(instance, filename):
     """Generate upload path for thumbnail files."""
-    return f'thumbnails/{instance.id}/{filename}'
+    key = instance.id or uuid.uuid4().hex
+    return f'thumbnails/{media_shard(key)}/{key}/{filename}'
 
 
-class Video(models.Model):
+def rendition_path(video_id, quality):
+    """Generate storage prefix for the HLS rendition of a quality."""
+    return f'{video_media_path(video_id)}/hls/{quality}'
+
+
+def legacy_hls_path(video_id):
+    """Generate storage prefix for stream-copy HLS output of HLSProcessor."""
+    return f'hls/{media_shard(video_id)}/{video_id}'
+
+
+class LoadedValuesModel(models.Model):
+    """
+    Model remembering the column values its instances were loaded with, so
+    signal handlers can tell whether a save changed the fields they serve.
+    """
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class Video(LoadedValuesModel):
     """
     Video model for storing video content.
     """
@@ -50,6 +99,14 @@ class Video(models.Model):
     thumbnail = models.ImageField(upload_to=thumbnail_upload_path, blank=True, null=True)
     duration = models.DurationField(null=True, blank=True)
     is_processed = models.BooleanField(default=False)
+    complexity_score = models.FloatField(null=True, blank=True)
+    encoding_ladder = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    probe_info = models.JSONField(default=dict, blank=True)
+    # Rendition URLs, sizes and duration for serializers (see ``playback``)
+    playback = models.JSONField(default=dict, blank=True, editable=False)
+    # Weighted title/description vector, maintained by a database trigger on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_videos', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -57,6 +114,10 @@ class Video(models.Model):
     class Meta:
         db_table = 'videos'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the catalog (see ``api.pagination``)
+            models.Index(fields=['is_processed', '-created_at', '-id'], name='videos_catalog_order_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -72,18 +133,12 @@ class Video(models.Model):
         return '/static/images/video-placeholder.png'
 
 
-class VideoQuality(models.Model):
+class VideoQuality(LoadedValuesModel):
     """
     Different quality versions of a video.
     """
-    QUALITY_CHOICES = [
-        ('480p', '480p'),
-        ('720p', '720p'),
-        ('1080p', '1080p'),
-    ]
-    
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='qualities')
-    quality = models.CharField(max_length=10, choices=QUALITY_CHOICES)
+    quality = models.CharField(max_length=QUALITY_NAME_MAX_LENGTH, choices=quality_choices)
     file_path = models.CharField(max_length=500)
     file_size = models.BigIntegerField(default=0)
     is_ready = models.BooleanField(default=False)
@@ -129,18 +184,97 @@ class WatchProgress(models.Model):
         return min(100, (current_seconds / total_seconds) * 100)
 
 
+class UploadSession(models.Model):
+    """
+    Resumable chunked upload of a large video file.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('finalizing', 'Finalizing'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+    INGEST_STATUS_CHOICES = [
+        ('', 'Not started'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received_chunks = models.JSONField(default=list, blank=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='upload_sessions')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    streaming = models.BooleanField(default=False)
+    ingest_status = models.CharField(max_length=20, choices=INGEST_STATUS_CHOICES, default='', blank=True)
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'video_upload_sessions'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.id})"
+    
+    @property
+    def chunk_count(self):
+        """Number of chunks the file is split into."""
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    @property
+    def received_bytes(self):
+        """Number of bytes received so far."""
+        received = len(self.received_chunks) * self.chunk_size
+        if self.chunk_count - 1 in self.received_chunks:
+            received -= self.chunk_count * self.chunk_size - self.total_size
+        return received
+    
+    @property
+    def contiguous_bytes(self):
+        """Number of bytes available without gaps from the start of the file."""
+        received = set(self.received_chunks)
+        index = 0
+        while index in received:
+            index += 1
+        return min(index * self.chunk_size, self.total_size)
+    
+    @property
+    def missing_chunks(self):
+        """Indexes of chunks that have not been received yet."""
+        received = set(self.received_chunks)
+        return [index for index in range(self.chunk_count) if index not in received]
+
+
 @receiver(post_save, sender=Video)
 def process_video_for_hls(sender, instance, created, **kwargs):
     """
     Automatically process uploaded videos for HLS streaming.
     Uses mentor's FFmpeg command for conversion.
+    
+    Videos that arrive processed (renditions reused from a duplicate) and
+    re-uploads of content another video already has are skipped.
     """
-    if created and instance.video_file:
-        from .hls_utils import hls_processor
-        
-        try:
-            hls_processor.convert_to_hls(instance)
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error processing video {instance.id} for HLS: {str(e)}")
+    if not created or not instance.video_file or instance.is_processed:
+        return
+    
+    if instance.content_hash and Video.objects.filter(
+        content_hash=instance.content_hash
+    ).exclude(id=instance.id).exists():
+        return
+    
+    from .hls_utils import hls_processor
+    
+    try:
+        hls_processor.convert_to_hls(instance)
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error processing video {instance.id} for HLS: {str(e)}")
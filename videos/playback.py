@@ -0,0 +1,93 @@
+"""
+Denormalized playback descriptor of a video.
+
+Whenever a video or one of its renditions changes, the pipeline writes a
+compact JSON descriptor onto the video row (``Video.playback``): the
+storage URLs of the source, the thumbnail and every rendition with its
+size and readiness, plus the duration. Serializers read the descriptor
+and only prefix the host, so listing videos needs neither the qualities
+table nor storage calls per row. Rows written before the descriptor
+existed are filled in by ``backfill_playback``; until then they are
+described from their qualities on the fly.
+"""
+
+import logging
+from .models import Video, VideoQuality
+from .storage import media_url, storage_name
+
+logger = logging.getLogger(__name__)
+
+# Bump when the descriptor layout changes; older descriptors are rebuilt
+PLAYBACK_VERSION = 1
+
+
+def file_url(field) -> str:
+    """Get the URL of a file field, '' if empty."""
+    return field.url if field and field.name else ''
+
+
+def build_playback(video, qualities) -> dict:
+    """
+    Build the playback descriptor of a video.
+
+    Args:
+        video: Video instance
+        qualities: Its VideoQuality instances, in display order
+
+    Returns:
+        Descriptor dictionary
+    """
+    return {
+        'version': PLAYBACK_VERSION,
+        'duration': video.duration.total_seconds() if video.duration else None,
+        'source': file_url(video.video_file),
+        'thumbnail': file_url(video.thumbnail),
+        'renditions': [
+            {
+                'quality': quality.quality,
+                'url': media_url(storage_name(quality.file_path)) if quality.file_path else '',
+                'size': quality.file_size,
+                'ready': quality.is_ready,
+            }
+            for quality in qualities
+        ],
+    }
+
+
+def get_playback(video) -> dict:
+    """
+    Get the playback descriptor of a video, building it if missing or old.
+
+    Args:
+        video: Video instance
+
+    Returns:
+        Descriptor dictionary
+    """
+    if (video.playback or {}).get('version') == PLAYBACK_VERSION:
+        return video.playback
+    return build_playback(video, sorted(video.qualities.all(), key=lambda quality: quality.id))
+
+
+def write_playback(video_id) -> dict:
+    """
+    Rebuild the stored descriptor of a video from the database.
+
+    The row is updated without model signals, so this is safe to call from
+    ``post_save`` handlers.
+
+    Args:
+        video_id: ID of the video
+
+    Returns:
+        The written descriptor, or None if the video does not exist
+    """
+    video = Video.objects.filter(id=video_id).first()
+    if not video:
+        return None
+
+    playback = build_playback(video, VideoQuality.objects.filter(video_id=video_id).order_by('id'))
+    if playback != video.playback:
+        Video.objects.filter(id=video_id).update(playback=playback)
+        logger.debug(f"Playback descriptor of video {video_id} updated")
+    return playback
@@ -0,0 +1,51 @@
+"""
+Catalog search.
+
+On PostgreSQL, videos carry a ``search_vector`` with the title weighted
+above the description, maintained by a trigger and stored in a GIN index
+(migration 0012). A query matches through that vector or through a trigram
+similarity of the title (``pg_trgm`` GIN index), so misspelled titles are
+still found, and results are ordered by full-text rank, then similarity.
+Both conditions are served by indexes, so a search reads only matching rows.
+
+Other databases (and ``VIDEO_SEARCH['FULL_TEXT'] = False``) fall back to
+``icontains`` on title and description.
+"""
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.db.models.functions import Coalesce
+
+SEARCH_CONFIG = 'english'
+
+
+def full_text_search_enabled(using: str = 'default') -> bool:
+    """Check whether ranked full-text search is available on a database."""
+    return settings.VIDEO_SEARCH['FULL_TEXT'] and connections[using].vendor == 'postgresql'
+
+
+def search_videos(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Filter a video queryset by a search query.
+
+    Args:
+        queryset: Videos to search
+        query: Search text as entered by the user
+
+    Returns:
+        Matching videos; ordered by relevance when full-text search is
+        enabled, otherwise unordered
+    """
+    if not full_text_search_enabled(queryset.db):
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(
+        Q(search_vector=search_query) | Q(title__trigram_similar=query)
+    ).annotate(
+        rank=Coalesce(SearchRank(F('search_vector'), search_query), 0.0),
+        similarity=TrigramSimilarity('title', query),
+    ).order_by('-rank', '-similarity', '-created_at', '-id')
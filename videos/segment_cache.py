@@ -0,0 +1,299 @@
+"""
+On-disk LRU cache of HLS segments on each web node.
+
+With remote storage every segment request would otherwise go back to the
+origin. Cached copies live below ``SEGMENT_CACHE['DIR']`` keyed by storage
+name and the stream version from the catalog (the modification time of the
+video's manifests), so republishing a video makes every node fetch the new
+segments. The least recently served files are evicted once the directory
+grows beyond ``MAX_BYTES``.
+
+Concurrent misses for the same segment are coalesced: the first request
+creates a ``.lock`` file exclusively, all others (in this or another worker
+process) wait for the segment to appear. The download itself goes to a
+private temporary file that is renamed into place only once its size
+matches the stored file, so a lock taken over from a slow writer never
+publishes or deletes another writer's partial copy.
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .manifest_cache import MAP_URI, LocalLRUCache
+from .storage import is_local_storage, join_name, media_stat, open_media
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+LOW_WATER_MARK = 0.9
+
+prewarmed = LocalLRUCache(1024)
+prewarm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='segment-prewarm')
+
+
+def segment_cache_enabled() -> bool:
+    """Check if segments are cached locally (remote storage only)."""
+    return settings.SEGMENT_CACHE['ENABLED'] and not is_local_storage()
+
+
+class SegmentCache:
+    """
+    Bounded directory of segment copies shared by all worker processes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stored_bytes = None
+        self.lock = threading.Lock()
+
+    def path(self, name: str, version) -> str:
+        """Get the local path of a cached segment."""
+        digest = hashlib.sha1(f'{name}|{version}'.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + posixpath.splitext(name)[1])
+
+    def get(self, name: str, version):
+        """
+        Get the local path of a segment if it is cached.
+
+        Args:
+            name: Storage name of the segment
+            version: Stream version of the video
+
+        Returns:
+            Local path, or None on a miss
+        """
+        path = self.path(name, version)
+        try:
+            # The modification time orders the LRU
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, name: str, version):
+        """
+        Get the local path of a segment, downloading it on a miss.
+
+        Args:
+            name: Storage name of the segment
+            version: Stream version of the video
+
+        Returns:
+            Local path, or None if the segment does not exist or another
+            download did not finish in time
+        """
+        path = self.get(name, version)
+        if path:
+            return path
+
+        path = self.path(name, version)
+        lock_path = path + '.lock'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        timeout = settings.SEGMENT_CACHE['FETCH_TIMEOUT']
+        deadline = time.monotonic() + timeout
+
+        while True:
+            try:
+                lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                break
+            except FileExistsError:
+                pass
+
+            # Another request is downloading this segment
+            if os.path.exists(path):
+                return path
+            try:
+                stale = time.time() - os.path.getmtime(lock_path) > timeout
+            except FileNotFoundError:
+                continue
+            if stale:
+                # A writer that is merely slow still finishes its own file
+                self.remove(lock_path)
+                continue
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+        lock_stat = os.fstat(lock_fd)
+        os.close(lock_fd)
+        try:
+            # The previous download may have finished in the meantime
+            if os.path.exists(path):
+                return path
+            if not self.download(name, path):
+                return None
+        finally:
+            self.release(lock_path, lock_stat)
+
+        self.account(os.path.getsize(path))
+        return path
+
+    def download(self, name: str, path: str) -> bool:
+        """
+        Download a segment into a private temporary file and move it into
+        place once it is complete.
+
+        Args:
+            name: Storage name of the segment
+            path: Local path to publish the copy at
+
+        Returns:
+            False if the segment does not exist
+        """
+        media = media_stat(name)
+        if media is None:
+            return False
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file, open_media(name) as source:
+                while True:
+                    block = source.read(1024 * 1024)
+                    if not block:
+                        break
+                    temp_file.write(block)
+            size = os.path.getsize(temp_path)
+            if size != media[0]:
+                raise OSError(f'Segment {name} downloaded {size} of {media[0]} bytes')
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        finally:
+            self.remove(temp_path)
+        return True
+
+    def release(self, lock_path: str, lock_stat):
+        """Remove a download lock unless a waiter already replaced it."""
+        try:
+            current = os.stat(lock_path)
+        except FileNotFoundError:
+            return
+        if (current.st_dev, current.st_ino) == (lock_stat.st_dev, lock_stat.st_ino):
+            self.remove(lock_path)
+
+    def account(self, size: int):
+        """Add a stored file to the size estimate and evict when over budget."""
+        with self.lock:
+            if self.stored_bytes is not None:
+                self.stored_bytes += size
+            if self.stored_bytes is not None and self.stored_bytes <= self.max_bytes:
+                return
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently served files down to the low-water mark."""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(('.part', '.lock')):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    file_stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((file_stat.st_mtime, file_stat.st_size, path))
+
+        total = sum(size for mtime, size, path in files)
+        if total > self.max_bytes:
+            for mtime, size, path in sorted(files):
+                if total <= self.max_bytes * LOW_WATER_MARK:
+                    break
+                self.remove(path)
+                total -= size
+
+        with self.lock:
+            self.stored_bytes = total
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+segment_cache = SegmentCache(settings.SEGMENT_CACHE['DIR'], settings.SEGMENT_CACHE['MAX_BYTES'])
+
+
+def manifest_segments(manifest_name: str, count: int) -> list:
+    """
+    Read the first segment names (and the init segment) of a rendition.
+
+    Args:
+        manifest_name: Storage name of the rendition's index.m3u8
+        count: Number of media segments
+
+    Returns:
+        List of storage names
+    """
+    prefix = posixpath.dirname(manifest_name)
+    names = []
+    segments = 0
+    with open_media(manifest_name) as f:
+        for line in f.read().decode('utf-8').splitlines():
+            line = line.strip()
+            if line.startswith('#EXT-X-MAP:'):
+                match = MAP_URI.search(line)
+                if match:
+                    names.append(join_name(prefix, match.group(1)))
+            elif line and not line.startswith('#'):
+                names.append(join_name(prefix, line))
+                segments += 1
+                if segments >= count:
+                    break
+    return names
+
+
+def prewarm_stream(video_id, entry: dict):
+    """
+    Fetch the first segments of every rendition of a video into the cache.
+
+    Args:
+        video_id: ID of the video
+        entry: Stream catalog entry of the video
+    """
+    version = entry.get('version')
+    prefixes = set(entry['renditions'].values())
+    if entry['legacy']:
+        prefixes.add(entry['legacy'])
+
+    for prefix in prefixes:
+        manifest_name = join_name(prefix, 'index.m3u8')
+        try:
+            names = manifest_segments(manifest_name, settings.SEGMENT_CACHE['PREWARM_SEGMENTS'])
+        except FileNotFoundError:
+            continue
+        for name in names:
+            try:
+                segment_cache.fetch(name, version)
+            except Exception as e:
+                logger.warning(f"Could not pre-warm segment {name} of video {video_id}: {e}")
+
+
+def schedule_prewarm(video_id, entry: dict):
+    """
+    Pre-warm a video in the background once per published version.
+
+    Called when a manifest is served, so the first player on each node
+    after a video (re)publishes warms the segments that everyone requests
+    next.
+
+    Args:
+        video_id: ID of the video
+        entry: Stream catalog entry of the video
+    """
+    if not segment_cache_enabled() or not entry['available'] or not entry.get('version'):
+        return
+
+    key = f'{video_id}:{entry["version"]}'
+    if prewarmed.get(key):
+        return
+    prewarmed.set(key, True)
+    prewarm_executor.submit(prewarm_stream, video_id, entry)
@@ -0,0 +1,320 @@
+"""
+Per-rendition segment index and dynamic HLS manifests.
+
+When a rendition is published, the FFmpeg playlist is parsed once into a
+compact binary sidecar (``segments.idx``) next to it: sequence, duration,
+byte offset and size of every segment. Manifests are then rendered from
+the index on demand, for any host, signature, trimmed window or resume
+position, without reading or re-parsing the playlist file. Parsed indexes
+are cached per process and in the shared Django cache.
+
+Sidecar layout (little endian)::
+
+    header   magic 'VFSX', format, flags, target duration,
+             media sequence, segment count
+    records  per segment: duration (microseconds), byte offset, size
+    names    UTF-8, newline separated: init segment ('' if none), then
+             the URI of every segment
+"""
+
+import os
+import struct
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from .manifest_cache import MAP_URI, LocalLRUCache
+from .storage import join_name, open_media, save_content
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_INDEX_NAME = 'segments.idx'
+
+MAGIC = b'VFSX'
+FORMAT_VERSION = 1
+FLAG_BYTE_RANGES = 1
+
+HEADER = struct.Struct('<4sBBHIII')
+RECORD = struct.Struct('<IQI')
+
+local_indexes = LocalLRUCache(settings.HLS_MANIFEST_CACHE['LOCAL_ENTRIES'])
+
+
+class SegmentIndex:
+    """
+    Parsed segment index of one rendition.
+    """
+
+    __slots__ = (
+        'target_duration', 'media_sequence', 'init', 'names', 'durations',
+        'offsets', 'sizes', 'byte_ranges', 'starts', 'lines'
+    )
+
+    def __init__(self, target_duration: int, media_sequence: int, init: str, names: list,
+                 durations, offsets, sizes, byte_ranges: bool):
+        self.target_duration = target_duration
+        self.media_sequence = media_sequence
+        self.init = init
+        self.names = names
+        self.durations = array('I', durations)
+        self.offsets = array('Q', offsets)
+        self.sizes = array('I', sizes)
+        self.byte_ranges = byte_ranges
+
+        # Start time of every segment (and the end of the last) for seeking
+        self.starts = array('Q', [0])
+        for duration in self.durations:
+            self.starts.append(self.starts[-1] + duration)
+
+        # Per-segment playlist lines up to the URI, built once per index
+        self.lines = []
+        for index, duration in enumerate(self.durations):
+            line = f'#EXTINF:{duration / 1e6:.6f},\n'
+            if byte_ranges:
+                line += f'#EXT-X-BYTERANGE:{self.sizes[index]}@{self.offsets[index]}\n'
+            self.lines.append(line)
+
+    def __len__(self):
+        return len(self.durations)
+
+    @property
+    def duration(self) -> float:
+        """Total duration in seconds."""
+        return self.starts[-1] / 1e6
+
+    def segment_at(self, seconds: float) -> int:
+        """
+        Find the segment playing at a point in time (binary search).
+
+        Args:
+            seconds: Position in seconds
+
+        Returns:
+            Index of the segment, clamped to the rendition
+        """
+        position = bisect_right(self.starts, int(max(seconds, 0) * 1e6)) - 1
+        return min(max(position, 0), len(self) - 1)
+
+    def render(self, base_url: str, query: str = '', start: float = None, end: float = None,
+               resume: float = None) -> bytes:
+        """
+        Render an HLS media playlist.
+
+        Args:
+            base_url: Absolute URL of the rendition, ending with a slash
+            query: Optional query string (e.g. the URL signature) for every URI
+            start: Optional start of a trimmed window in seconds
+            end: Optional end of a trimmed window in seconds
+            resume: Optional playback position to start at, in seconds
+
+        Returns:
+            Playlist bytes
+        """
+        first = self.segment_at(start) if start is not None else 0
+        last = len(self) - 1
+        if end is not None:
+            last = min(max(bisect_left(self.starts, int(end * 1e6)) - 1, first), last)
+
+        suffix = f'?{query}' if query else ''
+        version = 7 if self.init else 4 if self.byte_ranges else 3
+        parts = [
+            f'#EXTM3U\n#EXT-X-VERSION:{version}\n#EXT-X-TARGETDURATION:{self.target_duration}\n'
+            f'#EXT-X-MEDIA-SEQUENCE:{self.media_sequence + first}\n#EXT-X-PLAYLIST-TYPE:VOD\n'
+        ]
+        if self.init:
+            parts.append(f'#EXT-X-MAP:URI="{base_url}{self.init}{suffix}"\n')
+        if resume is not None:
+            offset = max(resume - self.starts[first] / 1e6, 0)
+            parts.append(f'#EXT-X-START:TIME-OFFSET={offset:.3f},PRECISE=YES\n')
+
+        for index in range(first, last + 1):
+            parts.append(self.lines[index])
+            parts.append(f'{base_url}{self.names[index]}{suffix}\n')
+        parts.append('#EXT-X-ENDLIST\n')
+        return ''.join(parts).encode('utf-8')
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index to the sidecar format."""
+        flags = FLAG_BYTE_RANGES if self.byte_ranges else 0
+        records = b''.join(
+            RECORD.pack(duration, offset, size)
+            for duration, offset, size in zip(self.durations, self.offsets, self.sizes)
+        )
+        names = '\n'.join([self.init, *self.names]).encode('utf-8')
+        return HEADER.pack(
+            MAGIC, FORMAT_VERSION, flags, 0, self.target_duration, self.media_sequence, len(self)
+        ) + records + names
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """
+        Load an index from the sidecar format.
+
+        Raises:
+            ValueError: If the data is not a segment index of this format
+        """
+        magic, version, flags, _, target_duration, media_sequence, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a segment index")
+
+        records_end = HEADER.size + count * RECORD.size
+        durations, offsets, sizes = [], [], []
+        for duration, offset, size in RECORD.iter_unpack(data[HEADER.size:records_end]):
+            durations.append(duration)
+            offsets.append(offset)
+            sizes.append(size)
+
+        init, *names = data[records_end:].decode('utf-8').split('\n')
+        if len(names) != count:
+            raise ValueError("Corrupt segment index")
+        return cls(
+            target_duration, media_sequence, init, names, durations, offsets, sizes,
+            bool(flags & FLAG_BYTE_RANGES)
+        )
+
+
+def parse_playlist(content: str, segment_size) -> SegmentIndex:
+    """
+    Build a segment index from an FFmpeg VOD media playlist.
+
+    Args:
+        content: Playlist text
+        segment_size: Callable returning the size of a segment file by URI
+            (used when the playlist has no byte ranges)
+
+    Returns:
+        SegmentIndex
+    """
+    target_duration = media_sequence = 0
+    init = ''
+    names, durations, offsets, sizes = [], [], [], []
+    duration = None
+    byte_range = None
+    byte_ranges = False
+    next_offset = 0
+
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            target_duration = int(float(line.split(':', 1)[1]))
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MAP:'):
+            match = MAP_URI.search(line)
+            if match:
+                init = match.group(1)
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-BYTERANGE:'):
+            length, _, offset = line.split(':', 1)[1].partition('@')
+            byte_range = (int(length), int(offset) if offset else next_offset)
+            byte_ranges = True
+        elif line and not line.startswith('#'):
+            if byte_range:
+                size, offset = byte_range
+            else:
+                size, offset = segment_size(line), 0
+            names.append(line)
+            durations.append(round((duration or 0) * 1e6))
+            offsets.append(offset)
+            sizes.append(size)
+            next_offset = offset + size
+            duration = byte_range = None
+
+    return SegmentIndex(target_duration, media_sequence, init, names, durations, offsets, sizes, byte_ranges)
+
+
+def write_segment_index(output_dir: str):
+    """
+    Write the segment index of a freshly encoded rendition directory.
+
+    Args:
+        output_dir: Local directory with index.m3u8 and its segments
+
+    Returns:
+        Path of the sidecar, or None if the directory has no playlist
+    """
+    playlist_path = os.path.join(output_dir, 'index.m3u8')
+    if not os.path.exists(playlist_path):
+        return None
+
+    def segment_size(uri):
+        try:
+            return os.path.getsize(os.path.join(output_dir, uri))
+        except OSError:
+            return 0
+
+    with open(playlist_path, encoding='utf-8') as f:
+        index = parse_playlist(f.read(), segment_size)
+
+    index_path = os.path.join(output_dir, SEGMENT_INDEX_NAME)
+    with open(index_path, 'wb') as f:
+        f.write(index.to_bytes())
+    return index_path
+
+
+def build_stored_segment_index(prefix: str) -> SegmentIndex:
+    """
+    Write the segment index of an already published rendition.
+
+    Args:
+        prefix: Storage prefix of the rendition
+
+    Returns:
+        SegmentIndex
+    """
+    def segment_size(uri):
+        try:
+            return default_storage.size(join_name(prefix, uri))
+        except (FileNotFoundError, OSError):
+            return 0
+
+    with open_media(join_name(prefix, 'index.m3u8')) as f:
+        index = parse_playlist(f.read().decode('utf-8'), segment_size)
+    save_content(join_name(prefix, SEGMENT_INDEX_NAME), index.to_bytes())
+    return index
+
+
+def load_segment_index(prefix: str, version):
+    """
+    Get the segment index of a rendition, from cache if possible.
+
+    Args:
+        prefix: Storage prefix of the rendition
+        version: Stream version of the video (see ``stream_catalog``)
+
+    Returns:
+        SegmentIndex, or None if the rendition has no index
+    """
+    key = f'segment_index:{prefix}:{version}'
+    index = local_indexes.get(key)
+    if index is not None:
+        return index
+
+    data = None
+    try:
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Segment index cache unavailable: {e}")
+
+    if data is None:
+        try:
+            with open_media(join_name(prefix, SEGMENT_INDEX_NAME)) as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            cache.set(key, data, settings.STREAM_CATALOG['TIMEOUT'])
+        except Exception as e:
+            logger.warning(f"Segment index cache unavailable: {e}")
+
+    try:
+        index = SegmentIndex.from_bytes(data)
+    except (ValueError, struct.error) as e:
+        logger.error(f"Invalid segment index for {prefix}: {e}")
+        return None
+
+    local_indexes.set(key, index)
+    return index
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_save, post_delete
+import threading
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import SuspiciousFileOperation
-import os
-from .models import Video
+from .models import Genre, Video, VideoQuality, WatchProgress
 
 
 @receiver(post_save, sender=Video)
@@ -17,7 +18,9 @@ def video_post_save(sender, instance, created, **kwargs):
     logger.info(f"🎬 SIGNAL TRIGGERED: Video {instance.id} saved, created={created}")
     print(f"🎬 SIGNAL TRIGGERED: Video {instance.id} saved, created={created}")
     
-    if created and instance.video_file:
+    deferred = getattr(instance, '_defer_processing', False)
+    
+    if created and instance.video_file and not instance.is_processed and not deferred:
         logger.info(f"🚀 Starting background processing for video {instance.id}")
         print(f"🚀 Starting background processing for video {instance.id}")
         try:
@@ -38,29 +41,197 @@ def video_post_save(sender, instance, created, **kwargs):
         print(f"⏭️ Skipping processing: created={created}, has_file={bool(instance.video_file)}")
 
 
+@receiver(pre_delete, sender=Video)
+def video_pre_delete(sender, instance, **kwargs):
+    """
+    Remember rendition locations before the qualities are cascade-deleted.
+    """
+    from .storage import storage_name
+    
+    instance._rendition_prefixes = [
+        storage_name(quality.file_path)
+        for quality in instance.qualities.all()
+        if quality.file_path
+    ]
+
+
 @receiver(post_delete, sender=Video)
 def video_post_delete(sender, instance, **kwargs):
     """
     Signal handler for when a video is deleted.
-    Cleans up associated files from filesystem.
+    Cleans up associated files from media storage, unless another video
+    still reuses them after content-hash deduplication.
     """
-    if instance.video_file and os.path.isfile(instance.video_file.path):
+    from .models import legacy_hls_path
+    from .storage import delete_prefix
+    from .utils import is_shared_media_file
+    
+    if instance.video_file and not is_shared_media_file('video_file', instance.video_file.name):
         try:
-            os.remove(instance.video_file.path)
-        except OSError:
+            instance.video_file.storage.delete(instance.video_file.name)
+        except (OSError, SuspiciousFileOperation):
             pass
     
-    if instance.thumbnail:
+    if instance.thumbnail and not is_shared_media_file('thumbnail', instance.thumbnail.name):
         try:
-            thumbnail_path = instance.thumbnail.path
-            if os.path.isfile(thumbnail_path):
-                os.remove(thumbnail_path)
+            instance.thumbnail.storage.delete(instance.thumbnail.name)
         except (OSError, ValueError, SuspiciousFileOperation):
             pass
     
-    for quality in instance.qualities.all():
-        if quality.file_path and os.path.isfile(quality.file_path):
-            try:
-                os.remove(quality.file_path)
-            except OSError:
-                pass
+    rendition_prefixes = getattr(instance, '_rendition_prefixes', [])
+    shared_prefixes = set(
+        VideoQuality.objects.filter(file_path__in=rendition_prefixes).values_list('file_path', flat=True)
+    )
+    
+    for prefix in rendition_prefixes:
+        if prefix in shared_prefixes:
+            continue
+        try:
+            delete_prefix(prefix)
+        except (OSError, SuspiciousFileOperation):
+            pass
+    
+    try:
+        delete_prefix(legacy_hls_path(instance.id))
+    except (OSError, SuspiciousFileOperation):
+        pass
+
+
+# Fields that end up in playback descriptors, manifests, the stream catalog,
+# the dashboard or the suggestion index; saves touching none of them
+# refresh nothing
+VIDEO_SERVED_FIELDS = (
+    'title', 'description', 'genre', 'video_file', 'thumbnail', 'duration', 'is_processed',
+)
+QUALITY_SERVED_FIELDS = ('video', 'quality', 'file_path', 'file_size', 'is_ready')
+
+pending_refreshes = threading.local()
+
+
+def served_fields_changed(instance, fields, created, update_fields) -> bool:
+    """
+    Check whether a save changed any of the given fields.
+
+    Instances not loaded from the database count as changed. The loaded
+    values are moved forward, so saving the same instance again compares
+    against what was just written.
+
+    Args:
+        instance: Saved model instance (a ``LoadedValuesModel``)
+        fields: Names of the fields to compare
+        created: Whether the save inserted the row
+        update_fields: ``update_fields`` of the save, or None
+
+    Returns:
+        True if a refresh is needed
+    """
+    model_fields = [instance._meta.get_field(name) for name in fields]
+    loaded = getattr(instance, '_loaded_values', None)
+    current = {
+        field.attname: field.get_prep_value(getattr(instance, field.attname))
+        for field in model_fields if field.attname in instance.__dict__
+    }
+    instance._loaded_values = {**(loaded or {}), **current}
+
+    if created or loaded is None:
+        return True
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return False
+    return any(
+        attname not in loaded or loaded[attname] != value
+        for attname, value in current.items()
+    )
+
+
+def schedule_video_refresh(video_id, *parts):
+    """
+    Refresh derived data of a video once the current transaction commits.
+
+    Every part requested for a video within a transaction is done once,
+    by the first of its commit callbacks to run, however many rows were
+    saved.
+
+    Args:
+        video_id: ID of the video
+        parts: Any of 'playback', 'manifests', 'stream', 'dashboard' and
+            'suggestions'
+    """
+    if not hasattr(pending_refreshes, 'videos') or not transaction.get_connection().in_atomic_block:
+        # Outside a transaction anything still pending was rolled back
+        pending_refreshes.videos = {}
+    pending = pending_refreshes.videos.setdefault(video_id, set())
+    pending.update(parts)
+    transaction.on_commit(lambda: run_video_refresh(video_id, pending))
+
+
+def run_video_refresh(video_id, pending: set):
+    """Do the refresh parts collected for a video (see ``schedule_video_refresh``)."""
+    from .dashboard import invalidate_dashboard
+    from .manifest_cache import invalidate_manifests
+    from .playback import write_playback
+    from .stream_catalog import refresh_stream_entry
+    from .suggestions import update_suggestions
+    
+    if pending_refreshes.videos.get(video_id) is not pending:
+        return
+    parts = pending_refreshes.videos.pop(video_id)
+    
+    if 'playback' in parts:
+        write_playback(video_id)
+    if 'manifests' in parts:
+        invalidate_manifests(video_id)
+    if 'stream' in parts:
+        refresh_stream_entry(video_id)
+    if 'dashboard' in parts:
+        invalidate_dashboard()
+    if 'suggestions' in parts:
+        update_suggestions(video_id)
+
+
+@receiver([post_save, post_delete], sender=VideoQuality)
+def video_quality_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Drop cached manifests and refresh the playback descriptor, the stream
+    catalog and the dashboard when a rendition is published, replaced or
+    removed.
+    """
+    if kwargs.get('signal') is post_save and not served_fields_changed(
+        instance, QUALITY_SERVED_FIELDS, created, update_fields
+    ):
+        return
+    
+    schedule_video_refresh(instance.video_id, 'playback', 'manifests', 'stream', 'dashboard')
+
+
+@receiver([post_save, post_delete], sender=Video)
+def video_stream_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Refresh the playback descriptor, the stream catalog, the dashboard and
+    the title suggestions when a video is published, edited or removed.
+    """
+    if kwargs.get('signal') is post_delete:
+        schedule_video_refresh(instance.id, 'stream', 'dashboard', 'suggestions')
+        return
+    
+    if served_fields_changed(instance, VIDEO_SERVED_FIELDS, created, update_fields):
+        schedule_video_refresh(instance.id, 'playback', 'stream', 'dashboard', 'suggestions')
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    """
+    Refresh the dashboard when a genre rail is renamed or removed.
+    """
+    from .dashboard import invalidate_dashboard
+    
+    invalidate_dashboard()
+
+
+@receiver([post_save, post_delete], sender=WatchProgress)
+def watch_progress_changed(sender, instance, **kwargs):
+    """
+    Refresh the user's continue-watching block when their progress changes.
+    """
+    from .dashboard import invalidate_user_dashboard
+    
+    invalidate_user_dashboard(instance.user_id)
@@ -0,0 +1,307 @@
+"""
+Media storage used by the encoding pipeline and the streaming views.
+
+Everything goes through Django's default storage (``settings.STORAGES``), so
+sources, renditions and thumbnails can live on the local media volume
+(FileSystemStorage) or in any S3-compatible bucket (S3Storage from
+django-storages, e.g. MinIO). This module adds the few operations the
+pipeline needs on top of the storage API: getting a local copy of a source,
+encoding into a workspace that is published afterwards, and removing a
+whole rendition prefix.
+"""
+
+import os
+import stat
+import shutil
+import tempfile
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+
+logger = logging.getLogger(__name__)
+
+
+def is_local_storage(storage=None) -> bool:
+    """
+    Check if media files are stored on a local filesystem.
+
+    Args:
+        storage: Storage to check (default storage if not given)
+
+    Returns:
+        True if the storage exposes local file paths
+    """
+    return isinstance(storage or default_storage, FileSystemStorage)
+
+
+def storage_name(path) -> str:
+    """
+    Convert a stored media reference to a storage name.
+
+    Older rows keep absolute paths below MEDIA_ROOT, newer rows keep storage
+    names such as ``videos/5/hls/720p``. Both map to the storage name.
+
+    Args:
+        path: Absolute path or storage name
+
+    Returns:
+        Storage name with forward slashes and no leading slash
+    """
+    path = str(path)
+    media_root = str(settings.MEDIA_ROOT)
+    if path.startswith(media_root):
+        path = os.path.relpath(path, media_root)
+    return path.replace('\\', '/').lstrip('/')
+
+
+def join_name(*parts) -> str:
+    """Join storage name parts with forward slashes."""
+    return '/'.join(str(part).strip('/') for part in parts if str(part).strip('/'))
+
+
+def media_exists(name: str) -> bool:
+    """Check if a storage name exists."""
+    try:
+        return default_storage.exists(name)
+    except Exception as e:
+        logger.error(f"Error checking media file {name}: {e}")
+        return False
+
+
+def media_stat(name: str):
+    """
+    Get size and modification time of a stored file in one lookup.
+
+    Args:
+        name: Storage name of the file
+
+    Returns:
+        Tuple (size, modified datetime), or None if the file does not exist
+    """
+    if is_local_storage():
+        try:
+            result = os.stat(default_storage.path(name))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(result.st_mode):
+            return None
+        return result.st_size, datetime.fromtimestamp(result.st_mtime, tz=timezone.utc)
+
+    if not media_exists(name):
+        return None
+    return default_storage.size(name), default_storage.get_modified_time(name)
+
+
+def open_media(name: str, mode: str = 'rb'):
+    """Open a stored media file."""
+    return default_storage.open(name, mode)
+
+
+def media_url(name: str) -> str:
+    """Get the public URL of a stored media file or prefix."""
+    return default_storage.url(name)
+
+
+@contextmanager
+def local_copy(name: str):
+    """
+    Provide a local filesystem path for a stored file.
+
+    Local storage yields the file in place; remote storage downloads it to a
+    temporary file that is removed afterwards.
+
+    Args:
+        name: Storage name of the file
+
+    Yields:
+        Local path of the file
+    """
+    if is_local_storage():
+        yield default_storage.path(name)
+        return
+
+    suffix = os.path.splitext(name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=settings.MEDIA_WORK_DIR) as tmp:
+        with default_storage.open(name, 'rb') as source:
+            shutil.copyfileobj(source, tmp, length=1024 * 1024)
+        tmp.flush()
+        yield tmp.name
+
+
+def save_file(name: str, local_path: str) -> str:
+    """
+    Store a local file under an exact storage name, replacing existing content.
+
+    Args:
+        name: Target storage name
+        local_path: Path of the local file
+
+    Returns:
+        The storage name
+    """
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    with open(local_path, 'rb') as f:
+        return default_storage.save(name, File(f))
+
+
+def save_content(name: str, content: bytes) -> str:
+    """
+    Store bytes under an exact storage name, replacing existing content.
+
+    Args:
+        name: Target storage name
+        content: File content
+
+    Returns:
+        The storage name
+    """
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(content))
+
+
+def copy_media(source: str, target: str) -> str:
+    """
+    Copy a stored file to an exact storage name, replacing existing content.
+
+    Local storage hard-links the file when possible so large sources are not
+    duplicated on disk.
+
+    Args:
+        source: Storage name of the file
+        target: Target storage name
+
+    Returns:
+        The target storage name
+    """
+    if is_local_storage():
+        source_path = default_storage.path(source)
+        target_path = default_storage.path(target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        try:
+            os.link(source_path, target_path)
+        except OSError:
+            shutil.copy2(source_path, target_path)
+        return target
+
+    if default_storage.exists(target):
+        default_storage.delete(target)
+    with default_storage.open(source, 'rb') as f:
+        return default_storage.save(target, File(f))
+
+
+def copy_prefix(source: str, target: str) -> int:
+    """
+    Copy all files below a storage prefix to another prefix.
+
+    Args:
+        source: Source storage prefix
+        target: Target storage prefix
+
+    Returns:
+        Number of copied files
+    """
+    names = list_prefix(source)
+    for name in names:
+        copy_media(name, join_name(target, name[len(source.strip('/')):]))
+    return len(names)
+
+
+def publish_directory(local_dir: str, prefix: str) -> int:
+    """
+    Upload every file of a local directory below a storage prefix.
+
+    Args:
+        local_dir: Local directory with rendition files
+        prefix: Target storage prefix
+
+    Returns:
+        Total size of the published files in bytes
+    """
+    total_size = 0
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        for filename in filenames:
+            local_path = os.path.join(dirpath, filename)
+            relative = os.path.relpath(local_path, local_dir).replace('\\', '/')
+            save_file(join_name(prefix, relative), local_path)
+            total_size += os.path.getsize(local_path)
+    return total_size
+
+
+@contextmanager
+def rendition_workspace(prefix: str):
+    """
+    Provide a local directory to encode into, published to ``prefix`` on exit.
+
+    Local storage encodes directly into the final directory. Remote storage
+    encodes into a temporary directory that is uploaded and then removed.
+    Nothing is published if the block raises.
+
+    Args:
+        prefix: Storage prefix of the rendition
+
+    Yields:
+        Local output directory
+    """
+    if is_local_storage():
+        output_dir = default_storage.path(prefix)
+        os.makedirs(output_dir, exist_ok=True)
+        yield output_dir
+        return
+
+    output_dir = tempfile.mkdtemp(dir=settings.MEDIA_WORK_DIR)
+    try:
+        yield output_dir
+        publish_directory(output_dir, prefix)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def list_prefix(prefix: str) -> list:
+    """
+    List all file names below a storage prefix, recursively.
+
+    Args:
+        prefix: Storage prefix
+
+    Returns:
+        List of storage names
+    """
+    try:
+        directories, files = default_storage.listdir(prefix)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+    names = [join_name(prefix, filename) for filename in files]
+    for directory in directories:
+        names.extend(list_prefix(join_name(prefix, directory)))
+    return names
+
+
+def prefix_size(prefix: str) -> int:
+    """Get the total size of all files below a storage prefix."""
+    return sum(default_storage.size(name) for name in list_prefix(prefix))
+
+
+def delete_prefix(prefix: str):
+    """
+    Delete all files below a storage prefix.
+
+    Args:
+        prefix: Storage prefix
+    """
+    if not prefix.strip('/'):
+        return
+
+    for name in list_prefix(prefix):
+        default_storage.delete(name)
+
+    if is_local_storage():
+        shutil.rmtree(default_storage.path(prefix), ignore_errors=True)
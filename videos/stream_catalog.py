@@ -0,0 +1,184 @@
+"""
+Stream catalog: where the HLS output of each video lives.
+
+One entry per video records whether it can be streamed, the storage prefix
+of every ready rendition and of the legacy stream-copy output, and which of
+them have a published manifest, so manifest requests pick their prefix
+without probing storage. Entries are
+kept in the shared Django cache (Redis) and, for a few seconds, in process
+memory, so segment requests resolve their location without touching the
+database. Unknown and unprocessed videos are cached as well (negative
+caching) with a shorter lifetime.
+
+The pipeline refreshes an entry whenever a video or one of its renditions
+is saved or deleted (see ``signals``), and after bulk changes that bypass
+model signals.
+"""
+
+import time
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .manifest_cache import LocalLRUCache
+from .models import Video, VideoQuality, legacy_hls_path
+from .segment_index import SEGMENT_INDEX_NAME
+from .storage import join_name, media_exists, media_stat, storage_name
+
+logger = logging.getLogger(__name__)
+
+local_entries = LocalLRUCache(settings.STREAM_CATALOG['LOCAL_ENTRIES'])
+
+
+def catalog_key(video_id) -> str:
+    """Build the cache key of a catalog entry."""
+    return f'stream_catalog:{video_id}'
+
+
+def build_stream_entry(video_id) -> dict:
+    """
+    Build the catalog entry of a video from the database and storage.
+
+    Args:
+        video_id: ID of the video
+
+    Returns:
+        Entry dictionary with ``available``, ``renditions``, ``legacy``,
+        ``source``, ``version``, ``manifests`` and ``indexed`` keys
+    """
+    video = Video.objects.filter(id=video_id).values('is_processed', 'video_file').first()
+    if not video or not video['is_processed']:
+        return {
+            'available': False, 'renditions': {}, 'legacy': '', 'source': False,
+            'version': 0, 'manifests': [], 'indexed': [],
+        }
+
+    renditions = {
+        quality: storage_name(file_path)
+        for quality, file_path in VideoQuality.objects.filter(
+            video_id=video_id, is_ready=True
+        ).exclude(file_path='').values_list('quality', 'file_path')
+    }
+
+    legacy = legacy_hls_path(video_id)
+    if not media_exists(join_name(legacy, 'index.m3u8')):
+        legacy = ''
+
+    # Republishing rewrites the manifests, so their newest modification
+    # time identifies the published segments (see ``segment_cache``)
+    version = 0
+    manifests = []
+    indexed = []
+    for prefix in filter(None, (*renditions.values(), legacy)):
+        manifest_stat = media_stat(join_name(prefix, 'index.m3u8'))
+        if manifest_stat:
+            version = max(version, int(manifest_stat[1].timestamp()))
+            manifests.append(prefix)
+        if media_exists(join_name(prefix, SEGMENT_INDEX_NAME)):
+            indexed.append(prefix)
+
+    return {
+        'available': True,
+        'renditions': renditions,
+        'legacy': legacy,
+        'source': bool(video['video_file']),
+        'version': version,
+        'manifests': manifests,
+        'indexed': indexed,
+    }
+
+
+def store_stream_entry(video_id, entry: dict):
+    """Write an entry to the shared cache and the local cache."""
+    timeout = (
+        settings.STREAM_CATALOG['TIMEOUT'] if entry['available']
+        else settings.STREAM_CATALOG['NEGATIVE_TIMEOUT']
+    )
+    try:
+        cache.set(catalog_key(video_id), entry, timeout)
+    except Exception as e:
+        logger.warning(f"Stream catalog unavailable: {e}")
+    local_entries.set(catalog_key(video_id), (time.monotonic() + settings.STREAM_CATALOG['LOCAL_TIMEOUT'], entry))
+
+
+def get_stream_entry(video_id) -> dict:
+    """
+    Get the catalog entry of a video.
+
+    Args:
+        video_id: ID of the video
+
+    Returns:
+        Entry dictionary (see ``build_stream_entry``)
+    """
+    key = catalog_key(video_id)
+
+    cached = local_entries.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    entry = None
+    try:
+        entry = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Stream catalog unavailable: {e}")
+
+    if entry is None:
+        entry = build_stream_entry(video_id)
+        store_stream_entry(video_id, entry)
+    else:
+        local_entries.set(key, (time.monotonic() + settings.STREAM_CATALOG['LOCAL_TIMEOUT'], entry))
+    return entry
+
+
+def resolve_stream(video_id, resolution: str):
+    """
+    Resolve the storage prefix holding the segments of a resolution.
+
+    Args:
+        video_id: ID of the video
+        resolution: Quality name
+
+    Returns:
+        Storage prefix of the rendition (or of the legacy output), or None
+        if the video cannot be streamed
+    """
+    return stream_prefix(get_stream_entry(video_id), resolution)
+
+
+def stream_prefix(entry: dict, resolution: str):
+    """
+    Get the storage prefix of a resolution from a catalog entry.
+
+    Args:
+        entry: Catalog entry of the video
+        resolution: Quality name
+
+    Returns:
+        Storage prefix of the rendition (or of the legacy output), or None
+    """
+    if not entry['available']:
+        return None
+    return entry['renditions'].get(resolution) or entry['legacy'] or None
+
+
+def refresh_stream_entry(video_id):
+    """
+    Drop the entry of a video and rebuild it once the current transaction
+    commits, so readers never cache uncommitted state for long.
+
+    Args:
+        video_id: ID of the video
+    """
+    key = catalog_key(video_id)
+
+    def refresh():
+        local_entries.delete(key)
+        store_stream_entry(video_id, build_stream_entry(video_id))
+
+    local_entries.delete(key)
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Stream catalog unavailable: {e}")
+    transaction.on_commit(refresh)
@@ -0,0 +1,366 @@
+"""
+Delivery of stored media files (HLS segments and source videos).
+
+Files are never read into memory. By default they are streamed with
+FileResponse; for local storage the WSGI server hands the open file to
+``os.sendfile``. With ``MEDIA_OFFLOAD`` set, Django only authorizes the
+request and returns an ``X-Accel-Redirect`` (nginx) or ``X-Sendfile``
+(Apache, lighttpd) header so the front proxy sends the bytes.
+
+With remote storage, segments can be served from an on-disk cache on the
+web node (see ``segment_cache``).
+
+Under ASGI the body is produced by an async iterator that reads the file in
+worker threads, so one event loop can feed many slow clients.
+
+Responses carry a strong ETag and Last-Modified derived from the stored
+file, answer conditional requests with 304 and byte ranges with 206
+(``multipart/byteranges`` for several ranges).
+"""
+
+import os
+import uuid
+import asyncio
+import hashlib
+import mimetypes
+import posixpath
+import logging
+from datetime import datetime, timezone
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .segment_cache import segment_cache, segment_cache_enabled
+from .storage import is_local_storage, media_stat, open_media
+
+logger = logging.getLogger(__name__)
+
+# Segment names are never reused for different content within a rendition
+SEGMENT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+SOURCE_CACHE_CONTROL = 'public, max-age=86400'
+
+MAX_RANGES = 16
+BLOCK_SIZE = 64 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+}
+
+
+def get_offload_mode() -> str:
+    """
+    Get the configured offload mode.
+
+    Returns:
+        'x-accel', 'x-sendfile' or '' to stream from Django
+    """
+    mode = settings.MEDIA_OFFLOAD['MODE'].lower()
+    if mode == 'x-sendfile' and not is_local_storage():
+        # X-Sendfile needs a path on the proxy's filesystem
+        return ''
+    return mode
+
+
+def offload_response(name: str, mode: str) -> HttpResponse:
+    """
+    Build an empty response that tells the front proxy to send a file.
+
+    Args:
+        name: Storage name of the file
+        mode: 'x-accel' or 'x-sendfile'
+
+    Returns:
+        HttpResponse with the redirect header set
+    """
+    response = HttpResponse()
+    if mode == 'x-accel':
+        prefix = settings.MEDIA_OFFLOAD['ACCEL_PREFIX'].rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(name)}'
+    else:
+        response['X-Sendfile'] = default_storage.path(name)
+    return response
+
+
+def media_etag(name: str, size: int, modified) -> str:
+    """
+    Build a strong ETag from the identity of a stored file.
+
+    Args:
+        name: Storage name of the file
+        size: File size in bytes
+        modified: Modification time of the file
+
+    Returns:
+        Quoted ETag value
+    """
+    identity = f'{name}:{size}:{modified.timestamp()}'
+    return f'"{hashlib.sha1(identity.encode()).hexdigest()}"'
+
+
+def parse_range_header(header: str, size: int):
+    """
+    Parse a ``Range: bytes=...`` header.
+
+    Args:
+        header: Header value
+        size: Size of the file in bytes
+
+    Returns:
+        List of inclusive (start, end) tuples, an empty list if no range is
+        satisfiable, or None if the header should be ignored
+    """
+    if not header.startswith('bytes='):
+        return None
+
+    specs = header[len('bytes='):].split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        start, sep, end = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if not start:
+                suffix_length = int(end)
+                if suffix_length > 0:
+                    ranges.append((max(size - suffix_length, 0), size - 1))
+                continue
+            start = int(start)
+            end = int(end) if end else size - 1
+        except ValueError:
+            return None
+        if start > end:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def iter_range(file, start: int, end: int):
+    """Yield the bytes of one inclusive range of an open file."""
+    file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        block = file.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        remaining -= len(block)
+        yield block
+
+
+def iter_ranges(name: str, ranges: list, parts: list = None, opener=open_media):
+    """
+    Yield the requested ranges of a stored file, closing it afterwards.
+
+    Args:
+        name: Storage name of the file
+        ranges: List of inclusive (start, end) tuples
+        parts: Optional (header, trailer) byte strings around each range
+            for a multipart/byteranges body
+        opener: Callable opening ``name`` (e.g. a local cached copy)
+    """
+    file = opener(name)
+    try:
+        for index, (start, end) in enumerate(ranges):
+            if parts:
+                yield parts[index][0]
+            yield from iter_range(file, start, end)
+            if parts:
+                yield parts[index][1]
+    finally:
+        file.close()
+
+
+async def aiter_ranges(name: str, ranges: list, parts: list = None, opener=open_media):
+    """
+    Asynchronous ``iter_ranges`` for ASGI: file access runs in worker
+    threads so slow clients never block the event loop.
+
+    Args:
+        name: Storage name of the file
+        ranges: List of inclusive (start, end) tuples
+        parts: Optional (header, trailer) byte strings around each range
+        opener: Callable opening ``name``
+    """
+    file = await asyncio.to_thread(opener, name)
+    try:
+        for index, (start, end) in enumerate(ranges):
+            if parts:
+                yield parts[index][0]
+            await asyncio.to_thread(file.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = await asyncio.to_thread(file.read, min(BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+            if parts:
+                yield parts[index][1]
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+def range_response(name: str, ranges: list, size: int, content_type: str, asynchronous: bool = False,
+                   opener=open_media):
+    """
+    Build a 206 response for one or more byte ranges.
+
+    Args:
+        name: Storage name of the file
+        ranges: List of inclusive (start, end) tuples
+        size: File size in bytes
+        content_type: Content type of the file
+        asynchronous: Stream with an async iterator (ASGI)
+        opener: Callable opening ``name``
+
+    Returns:
+        StreamingHttpResponse with status 206
+    """
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        if asynchronous:
+            body = aiter_ranges(name, ranges, opener=opener)
+        else:
+            body = iter_ranges(name, ranges, opener=opener)
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'.encode(),
+            b'\r\n'
+        )
+        for start, end in ranges
+    ]
+    closing = f'--{boundary}--\r\n'.encode()
+
+    def body():
+        yield from iter_ranges(name, ranges, parts, opener)
+        yield closing
+
+    async def abody():
+        async for block in aiter_ranges(name, ranges, parts, opener):
+            yield block
+        yield closing
+
+    response = StreamingHttpResponse(
+        abody() if asynchronous else body(),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = str(
+        sum(len(head) + end - start + 1 + len(tail) for (head, tail), (start, end) in zip(parts, ranges))
+        + len(closing)
+    )
+    return response
+
+
+def cached_segment(name: str, version):
+    """
+    Get the local copy of a segment from the segment cache.
+
+    Args:
+        name: Storage name of the segment
+        version: Stream version of the video
+
+    Returns:
+        Tuple (local path, size, modified), or None to serve from storage
+    """
+    try:
+        path = segment_cache.fetch(name, version)
+    except Exception as e:
+        logger.warning(f"Segment cache unavailable for {name}: {e}")
+        return None
+    if path is None:
+        return None
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return None
+    # The stream version is the same on every node, unlike local file times
+    return path, size, datetime.fromtimestamp(version, tz=timezone.utc)
+
+
+def serve_media(request, name: str, content_type: str = None, cache_control: str = SEGMENT_CACHE_CONTROL,
+                asynchronous: bool = False, cache_version=None):
+    """
+    Serve a stored media file without buffering it in the worker.
+
+    Args:
+        request: Current request (for conditional and range headers)
+        name: Storage name of the file
+        content_type: Content type (guessed from the name if not given)
+        cache_control: Cache-Control header value
+        asynchronous: Stream the body with an async iterator (ASGI)
+        cache_version: Stream version of the video; serve the file through
+            the local segment cache if given and the cache is enabled
+
+    Returns:
+        200/206/304/416 response, or an offload response for the front proxy
+
+    Raises:
+        Http404: If the file does not exist
+    """
+    mode = get_offload_mode()
+    opener = open_media
+    cached = None
+    if cache_version and not mode and segment_cache_enabled():
+        cached = cached_segment(name, cache_version)
+
+    if cached:
+        path, size, modified = cached
+        opener = lambda name: open(path, 'rb')
+    else:
+        file_stat = media_stat(name)
+        if file_stat is None:
+            raise Http404("File not found")
+        size, modified = file_stat
+
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    etag = media_etag(name, size, modified)
+    last_modified = int(modified.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        ranges = None
+        if not mode and 'HTTP_RANGE' in request.META:
+            if_range = request.META.get('HTTP_IF_RANGE')
+            if not if_range or if_range in (etag, http_date(last_modified)):
+                ranges = parse_range_header(request.META['HTTP_RANGE'], size)
+
+        if mode:
+            # The proxy handles Range requests itself
+            response = offload_response(name, mode)
+            response['Content-Type'] = content_type
+        elif ranges == []:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif ranges:
+            response = range_response(name, ranges, size, content_type, asynchronous, opener)
+        elif asynchronous:
+            response = StreamingHttpResponse(
+                aiter_ranges(name, [(0, size - 1)], opener=opener), content_type=content_type
+            )
+            response['Content-Length'] = str(size)
+        else:
+            response = FileResponse(opener(name), filename=posixpath.basename(name))
+            response['Content-Type'] = content_type
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+    for header, value in CORS_HEADERS.items():
+        response[header] = value
+    return response
@@ -0,0 +1,271 @@
+"""
+Search-as-you-type title suggestions.
+
+Every processed video is stored in a prefix index once per word of its
+title, so "matr" completes "The Matrix" as well. Each entry is the
+normalized title from that word on, followed by the word position, the
+video ID and the display title, and entries are kept in lexicographic
+order; a completion is a range scan from the prefix, answered without
+touching the database.
+
+With the Redis cache the index is a sorted set of equal-score members read
+with ``ZRANGEBYLEX``, plus a hash of each video's members for updates.
+Other cache backends (development, tests) use a sorted list in process
+memory. Video saves and deletes update the index (see ``signals``), and
+``rebuild_suggestions`` rebuilds it from the database; a missing index is
+rebuilt on first use.
+"""
+
+import json
+import bisect
+import logging
+import threading
+import unicodedata
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = '\x00'
+
+
+def normalize(text: str) -> str:
+    """Fold case and accents and collapse whitespace."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+def title_entries(video_id: int, title: str) -> list:
+    """
+    Build the index entries of a title, one per word.
+
+    Args:
+        video_id: ID of the video
+        title: Display title
+
+    Returns:
+        List of entry strings
+    """
+    words = normalize(title).split(' ')
+    display = ' '.join(title.split())
+    return [
+        SEPARATOR.join((' '.join(words[position:]), str(position), str(video_id), display))
+        for position in range(len(words))
+        if words[position]
+    ]
+
+
+def parse_entry(entry: str) -> tuple:
+    """Split an entry into (word position, video ID, display title)."""
+    _, position, video_id, title = entry.split(SEPARATOR, 3)
+    return int(position), int(video_id), title
+
+
+def rank_completions(entries: list, limit: int) -> list:
+    """
+    Pick the suggestions for a range of matching entries.
+
+    Titles that start with the prefix come before titles matching at a
+    later word; every video is suggested once.
+
+    Args:
+        entries: Matching entries in index order
+        limit: Maximum number of suggestions
+
+    Returns:
+        List of {'id', 'title'} dictionaries
+    """
+    ranked = sorted(enumerate(map(parse_entry, entries)), key=lambda item: (item[1][0] > 0, item[0]))
+    suggestions = []
+    seen = set()
+    for _, (position, video_id, title) in ranked:
+        if video_id not in seen:
+            seen.add(video_id)
+            suggestions.append({'id': video_id, 'title': title})
+    return suggestions[:limit]
+
+
+class RedisPrefixIndex:
+    """
+    Prefix index in a Redis sorted set.
+
+    Args:
+        client: redis-py client
+        key: Name of the sorted set (the members hash gets a suffix)
+    """
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+        self.members_key = f'{key}:members'
+
+    def is_built(self) -> bool:
+        """Check whether the index exists."""
+        return bool(self.client.exists(self.members_key))
+
+    def complete(self, prefix: str, count: int) -> list:
+        """Get up to ``count`` entries starting with a normalized prefix."""
+        start = prefix.encode()
+        entries = self.client.zrangebylex(self.key, b'[' + start, b'[' + start + b'\xff', 0, count)
+        return [entry.decode() for entry in entries]
+
+    def update(self, video_id: int, title: str = None):
+        """Replace the entries of a video (remove them if title is None)."""
+        if not self.is_built():
+            # A partial index would look complete; the next read rebuilds it
+            return
+        old = self.client.hget(self.members_key, video_id)
+        pipe = self.client.pipeline()
+        if old:
+            pipe.zrem(self.key, *json.loads(old))
+        # Titles of only whitespace or combining marks have no entries
+        entries = title_entries(video_id, title) if title else []
+        if entries:
+            pipe.zadd(self.key, dict.fromkeys(entries, 0))
+            pipe.hset(self.members_key, video_id, json.dumps(entries))
+        else:
+            pipe.hdel(self.members_key, video_id)
+        pipe.execute()
+
+    def rebuild(self, videos):
+        """Replace the whole index with (id, title) pairs, swapped in atomically."""
+        staging, staging_members = f'{self.key}:staging', f'{self.members_key}:staging'
+        self.client.delete(staging, staging_members)
+        # Keeps the members hash existing (see ``is_built``) for empty catalogs
+        self.client.hset(staging_members, 'built', '[]')
+        pipe = self.client.pipeline()
+        for video_id, title in videos:
+            entries = title_entries(video_id, title)
+            if entries:
+                pipe.zadd(staging, dict.fromkeys(entries, 0))
+                pipe.hset(staging_members, video_id, json.dumps(entries))
+            if len(pipe) >= 1000:
+                pipe.execute()
+        pipe.execute()
+
+        pipe = self.client.pipeline()
+        if self.client.exists(staging):
+            pipe.rename(staging, self.key)
+        else:
+            pipe.delete(self.key)
+        pipe.rename(staging_members, self.members_key)
+        pipe.execute()
+
+
+class MemoryPrefixIndex:
+    """
+    Prefix index in a sorted list in process memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.members = None
+
+    def is_built(self) -> bool:
+        """Check whether the index exists."""
+        return self.members is not None
+
+    def complete(self, prefix: str, count: int) -> list:
+        """Get up to ``count`` entries starting with a normalized prefix."""
+        with self.lock:
+            start = bisect.bisect_left(self.entries, prefix)
+            end = bisect.bisect_right(self.entries, prefix + '\U0010ffff', start)
+            return self.entries[start:min(end, start + count)]
+
+    def update(self, video_id: int, title: str = None):
+        """Replace the entries of a video (remove them if title is None)."""
+        with self.lock:
+            if self.members is None:
+                return
+            for entry in self.members.pop(video_id, []):
+                self.entries.pop(bisect.bisect_left(self.entries, entry))
+            entries = title_entries(video_id, title) if title else []
+            if entries:
+                self.members[video_id] = entries
+                for entry in entries:
+                    bisect.insort(self.entries, entry)
+
+    def rebuild(self, videos):
+        """Replace the whole index with (id, title) pairs."""
+        members = {video_id: title_entries(video_id, title) for video_id, title in videos}
+        entries = sorted(entry for video_entries in members.values() for entry in video_entries)
+        with self.lock:
+            self.members, self.entries = members, entries
+
+
+memory_index = MemoryPrefixIndex()
+
+
+def get_index():
+    """Get the prefix index of the configured cache backend."""
+    try:
+        from django_redis import get_redis_connection
+        client = get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return memory_index
+    return RedisPrefixIndex(client, cache.make_key(settings.VIDEO_SUGGESTIONS['KEY']))
+
+
+def rebuild_suggestions() -> int:
+    """
+    Rebuild the suggestion index from the database.
+
+    Returns:
+        Number of indexed videos
+    """
+    from .models import Video
+
+    videos = list(Video.objects.filter(is_processed=True).values_list('id', 'title'))
+    get_index().rebuild(videos)
+    logger.info(f"Suggestion index rebuilt with {len(videos)} videos")
+    return len(videos)
+
+
+def suggest(query: str, limit: int = None) -> list:
+    """
+    Get title completions for what the user typed so far.
+
+    Args:
+        query: Typed text
+        limit: Maximum number of suggestions (default from settings)
+
+    Returns:
+        List of {'id', 'title'} dictionaries
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    limit = min(limit or settings.VIDEO_SUGGESTIONS['LIMIT'], settings.VIDEO_SUGGESTIONS['MAX_LIMIT'])
+
+    index = get_index()
+    try:
+        if not index.is_built():
+            rebuild_suggestions()
+        # Read extra entries for videos matching at several words
+        entries = index.complete(prefix, limit * 4)
+    except Exception as e:
+        logger.warning(f"Suggestion index unavailable: {e}")
+        return []
+    return rank_completions(entries, limit)
+
+
+def update_suggestions(video_id: int):
+    """
+    Re-index a video from the database once the current transaction
+    commits; unprocessed and deleted videos are removed.
+
+    Args:
+        video_id: ID of the video
+    """
+    def update():
+        from .models import Video
+
+        title = Video.objects.filter(id=video_id, is_processed=True).values_list('title', flat=True).first()
+        try:
+            get_index().update(video_id, title)
+        except Exception as e:
+            logger.warning(f"Suggestion index unavailable: {e}")
+
+    transaction.on_commit(update)
@@ -1,17 +1,18 @@
 import os
+import time
+import subprocess
 import django_rq
 from django.conf import settings
-from django.core.files.base import ContentFile
 from datetime import timedelta
-from .models import Video, VideoQuality
+from django.db import transaction
+from .models import Video, VideoQuality, UploadSession
+from .encoding import build_hls_args, build_video_args, get_encoding_ladder
+from .storage import local_copy
 from .utils import (
-    get_video_duration,
-    extract_thumbnail,
-    convert_video_quality,
-    convert_to_hls_segments,
-    get_directory_size,
-    get_file_size,
-    clean_filename
+    get_source_duration,
+    create_hls_rendition,
+    ensure_encoding_ladder,
+    generate_thumbnail
 )
 import logging
 
@@ -27,30 +28,14 @@ def process_video_upload(video_id: int):
     """
     try:
         video = Video.objects.get(id=video_id)
-        video_path = video.video_file.path
-        
-        duration_seconds = get_video_duration(video_path)
-        if duration_seconds > 0:
-            video.duration = timedelta(seconds=duration_seconds)
-        
-        if not video.thumbnail:
-            thumbnail_filename = f"thumb_{video.id}.jpg"
-            thumbnail_path = os.path.join(
-                settings.MEDIA_ROOT,
-                'thumbnails',
-                str(video.id),
-                thumbnail_filename
-            )
-            
-            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        
+        with local_copy(video.video_file.name) as video_path:
+            duration_seconds = get_source_duration(video, video_path)
+            if duration_seconds > 0:
+                video.duration = timedelta(seconds=duration_seconds)
             
-            if extract_thumbnail(video_path, thumbnail_path):
-                with open(thumbnail_path, 'rb') as thumb_file:
-                    video.thumbnail.save(
-                        thumbnail_filename,
-                        ContentFile(thumb_file.read()),
-                        save=False
-                    )
+            if not video.thumbnail:
+                generate_thumbnail(video, video_path, save=False)
         
         create_video_qualities(video_id)
         
@@ -75,68 +60,30 @@ def create_video_qualities(video_id: int):
     """
     try:
         video = Video.objects.get(id=video_id)
-        source_path = video.video_file.path
         
-        qualities = ['480p', '720p', '1080p']
+        if not video.duration and (video.probe_info or {}).get('duration'):
+            video.duration = timedelta(seconds=video.probe_info['duration'])
         
-        for quality in qualities:
-            if VideoQuality.objects.filter(video=video, quality=quality).exists():
-                continue
+        with local_copy(video.video_file.name) as source_path:
+            qualities = list(get_encoding_ladder())
+            ladder = ensure_encoding_ladder(video, source_path)
             
-            # Create HLS segments for each quality instead of MP4 files
-            hls_output_dir = os.path.join(
-                settings.MEDIA_ROOT,
-                'videos',
-                str(video.id),
-                'hls',
-                quality
-            )
-            os.makedirs(hls_output_dir, exist_ok=True)
-            
-            if convert_to_hls_segments(source_path, hls_output_dir, quality):
-                m3u8_path = os.path.join(hls_output_dir, 'index.m3u8')
+            for quality in qualities:
+                if VideoQuality.objects.filter(video=video, quality=quality).exists():
+                    continue
                 
-                if os.path.exists(m3u8_path):
-                    file_size = get_directory_size(hls_output_dir)
-                    
-                    VideoQuality.objects.create(
-                        video=video,
-                        quality=quality,
-                        file_path=hls_output_dir,  # Directory path, not file
-                        file_size=file_size,
-                        is_ready=True
-                    )
-                    
-                    logger.info(f"Created HLS {quality} quality for video: {video.title}")
-                else:
-                    logger.error(f"HLS manifest not found for {quality}: {m3u8_path}")
-            else:
-                logger.error(f"Failed to create HLS {quality} for video: {video.title}")
-        
-        video.is_processed = True
-        video.save()
-        
-        # Extract actual video thumbnail after processing is complete
-        if not video.thumbnail:
-            thumbnail_filename = f"thumb_{video.id}.jpg"
-            thumbnail_path = os.path.join(
-                settings.MEDIA_ROOT,
-                'thumbnails',
-                thumbnail_filename
-            )
+                # Create HLS segments for each quality instead of MP4 files
+                create_hls_rendition(video, source_path, quality, ladder.get(quality))
             
-            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            video.is_processed = True
+            video.save()
             
-            if extract_thumbnail(source_path, thumbnail_path, time_offset="00:00:02"):
-                with open(thumbnail_path, 'rb') as thumb_file:
-                    video.thumbnail.save(
-                        thumbnail_filename,
-                        ContentFile(thumb_file.read()),
-                        save=True
-                    )
-                logger.info(f"Generated video thumbnail for: {video.title}")
-            else:
-                logger.warning(f"Could not extract thumbnail for: {video.title}")
+            # Extract actual video thumbnail after processing is complete
+            if not video.thumbnail:
+                if generate_thumbnail(video, source_path, time_offset="00:00:02"):
+                    logger.info(f"Generated video thumbnail for: {video.title}")
+                else:
+                    logger.warning(f"Could not extract thumbnail for: {video.title}")
         
         logger.info(f"Video {video.title} marked as processed - all qualities created!")
         
@@ -148,6 +95,101 @@ def create_video_qualities(video_id: int):
         logger.error(f"Error creating video qualities for {video_id}: {e}")
 
 
+@django_rq.job('default', timeout=7200)
+def ingest_upload_stream(session_id):
+    """
+    Background task encoding a streaming upload while it is still arriving.
+    
+    The contiguous prefix of the part file is piped into FFmpeg as chunks
+    land, producing the lowest rendition of the ladder and the thumbnail.
+    Containers that cannot be decoded from a pipe (e.g. MP4 with the moov
+    atom at the end) make the ingest fail, and the regular pipeline takes
+    over after finalizing.
+    
+    Args:
+        session_id: ID of the streaming upload session
+    """
+    from .chunked_upload import get_part_path, get_stream_dir, publish_stream_outputs
+    
+    config = settings.CHUNKED_UPLOAD
+    
+    try:
+        session = UploadSession.objects.get(id=session_id)
+        quality, profile = next(iter(get_encoding_ladder().items()))
+        
+        stream_dir = get_stream_dir(session)
+        output_dir = os.path.join(stream_dir, 'hls', quality)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        cmd = [
+            'ffmpeg', '-i', 'pipe:0',
+            *build_video_args(profile),
+            *build_hls_args(profile, output_dir),
+            '-map', '0:v:0',
+            '-ss', '00:00:02',
+            '-frames:v', '1',
+            '-q:v', '2',
+            '-vf', 'scale=320:240',
+            '-an',
+            '-y', os.path.join(stream_dir, 'thumb.jpg')
+        ]
+        
+        source = open(get_part_path(session), 'rb')
+    except (UploadSession.DoesNotExist, StopIteration, OSError) as e:
+        logger.error(f"Could not start streaming ingest for upload {session_id}: {e}")
+        UploadSession.objects.filter(id=session_id).update(ingest_status='failed')
+        return
+    
+    logger.info(f"Streaming ingest of upload {session_id} started ({quality})")
+    
+    fed = 0
+    idle_since = time.monotonic()
+    succeeded = False
+    
+    with open(os.path.join(stream_dir, 'ffmpeg.log'), 'wb') as log_file, source:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log_file)
+        try:
+            while fed < session.total_size:
+                session.refresh_from_db(fields=['received_chunks', 'status'])
+                if session.status == 'aborted':
+                    break
+                
+                available = session.contiguous_bytes
+                if available > fed:
+                    source.seek(fed)
+                    while fed < available:
+                        block = source.read(min(1024 * 1024, available - fed))
+                        if not block:
+                            break
+                        process.stdin.write(block)
+                        fed += len(block)
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > config['STREAM_IDLE_TIMEOUT']:
+                    logger.warning(f"Streaming ingest of upload {session_id} timed out waiting for data")
+                    break
+                else:
+                    time.sleep(config['STREAM_POLL_INTERVAL'])
+            
+            process.stdin.close()
+            succeeded = fed == session.total_size and process.wait(timeout=1800) == 0
+        except (BrokenPipeError, subprocess.TimeoutExpired) as e:
+            logger.error(f"FFmpeg stopped during streaming ingest of upload {session_id}: {e}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+    
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session_id)
+        session.ingest_status = 'done' if succeeded else 'failed'
+        session.save(update_fields=['ingest_status', 'updated_at'])
+    
+    logger.info(f"Streaming ingest of upload {session_id} finished: {session.ingest_status}")
+    
+    if session.video_id:
+        publish_stream_outputs(session)
+
+
 def queue_video_processing(video_id: int):
     """
     Queue video processing task.
@@ -173,7 +215,7 @@ def get_processing_status(video_id: int) -> dict:
         video = Video.objects.get(id=video_id)
         qualities = VideoQuality.objects.filter(video=video)
         
-        total_qualities = 3
+        total_qualities = len(get_encoding_ladder())
         ready_qualities = qualities.filter(is_ready=True).count()
         
         return {
@@ -1,4 +1,8 @@
-from django.test import TestCase
+import os
+import json
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -10,6 +14,28 @@ from .models import Video, Genre, WatchProgress
 User = get_user_model()
 
 
+def use_temporary_media_root(test_case, **overrides):
+    """
+    Point MEDIA_ROOT at a fresh directory for one test and remove it afterwards.
+
+    Args:
+        test_case: Running TestCase
+        **overrides: Further settings to override; callables get the media root
+
+    Returns:
+        Path of the temporary media root
+    """
+    media_root = tempfile.mkdtemp(prefix='videoflix-test-media-')
+    test_case.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    settings_override = override_settings(MEDIA_ROOT=media_root, **{
+        name: value(media_root) if callable(value) else value
+        for name, value in overrides.items()
+    })
+    settings_override.enable()
+    test_case.addCleanup(settings_override.disable)
+    return media_root
+
+
 class VideoModelTest(TestCase):
     """Test cases for video model."""
     
@@ -55,7 +81,8 @@ class VideoViewTest(TestCase):
     """Test cases for video views."""
     
     def setUp(self):
-        """Set up test client and data."""
+        """Set up a temporary media root, test client and data."""
+        use_temporary_media_root(self)
         self.client = APIClient()
         self.user = User.objects.create_user(
             email='test@example.com',
@@ -76,8 +103,9 @@ class VideoViewTest(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Test Video')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Test Video')
+        self.assertIsNone(response.data['next'])
     
     def test_video_detail_view(self):
         """Test video detail API."""
@@ -94,7 +122,7 @@ class VideoViewTest(TestCase):
         
         video_file = SimpleUploadedFile(
             "test.mp4",
-            b"fake video content",
+            b"\x00\x00\x00\x18ftypisom fake video content",
             content_type="video/mp4"
         )
         
@@ -125,10 +153,10 @@ class VideoViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
     
     def test_content_page_list_view(self):
-        """Test content page list view."""
+        """Test content page list view (legacy array mode)."""
         self.client.force_authenticate(user=self.user)
         url = reverse('videos:video-list')
-        response = self.client.get(url)
+        response = self.client.get(url, {'legacy': '1'})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsInstance(response.data, list)
@@ -142,3 +170,1858 @@ class VideoViewTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('hero_video', response.data)
         self.assertIn('genres', response.data)
+
+
+class VideoListPaginationTest(TestCase):
+    """Test cases for keyset pagination of the video list."""
+    
+    def setUp(self):
+        """Create processed videos, several sharing a creation time."""
+        from django.utils import timezone
+        
+        self.client = APIClient()
+        genre = Genre.objects.create(name='Drama')
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(25):
+                Video.objects.create(title=f'Video {index}', genre=genre, is_processed=True)
+        # Ties on created_at are ordered by id
+        Video.objects.filter(title__in=['Video 3', 'Video 4', 'Video 5']).update(
+            created_at=timezone.now() - timezone.timedelta(days=1)
+        )
+        Video.objects.create(title='Draft', genre=genre, is_processed=False)
+    
+    def walk(self, **params):
+        """Follow next links and return the titles of all pages."""
+        pages = []
+        response = self.client.get(reverse('videos:video-list'), params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([video['title'] for video in response.data['results']])
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+    
+    def test_pages_cover_catalog_once_in_order(self):
+        """Test that pages list every processed video exactly once, newest first."""
+        pages = self.walk(page_size=4)
+        titles = [title for page in pages for title in page]
+        expected = list(
+            Video.objects.filter(is_processed=True).order_by('-created_at', '-id').values_list('title', flat=True)
+        )
+        
+        self.assertEqual(titles, expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 4, 4, 1])
+    
+    def test_cursor_is_stable_across_inserts(self):
+        """Test that videos published between requests do not shift the next page."""
+        first = self.client.get(reverse('videos:video-list'), {'page_size': 10})
+        Video.objects.create(title='Brand new', genre=Genre.objects.get(), is_processed=True)
+        second = self.client.get(first.data['next'])
+        
+        titles = [video['title'] for video in first.data['results'] + second.data['results']]
+        self.assertNotIn('Brand new', titles)
+        self.assertEqual(len(set(titles)), 20)
+    
+    def test_deep_page_costs_the_same_queries(self):
+        """Test that a deep page runs as many queries as the first one."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        url = reverse('videos:video-list')
+        with CaptureQueriesContext(connection) as first_queries:
+            first = self.client.get(url, {'page_size': 5})
+        deep = self.client.get(self.client.get(first.data['next']).data['next'])
+        with CaptureQueriesContext(connection) as deep_queries:
+            self.client.get(deep.data['next'])
+        
+        self.assertEqual(len(first_queries), len(deep_queries))
+        self.assertEqual(len(first_queries), 1)
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(reverse('videos:video-list'), {'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_search_falls_back_to_icontains(self):
+        """Test that search without PostgreSQL matches title or description substrings."""
+        from .search import full_text_search_enabled
+        
+        Video.objects.filter(title='Video 7').update(description='A heist in Lisbon')
+        response = self.client.get(reverse('videos:video-list'), {'search': 'lisbon'})
+        
+        self.assertFalse(full_text_search_enabled())
+        self.assertEqual([video['title'] for video in response.data['results']], ['Video 7'])
+        self.assertEqual(len(self.walk(search='Video 1')[0]), 11)
+    
+    def test_legacy_mode_returns_whole_catalog(self):
+        """Test that legacy mode returns one array of all processed videos."""
+        response = self.client.get(reverse('videos:video-list'), {'legacy': '1'})
+        
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 25)
+
+
+class PerTitleEncodingTest(TestCase):
+    """Test cases for per-title complexity analysis."""
+    
+    def test_simple_content_gets_cheaper_ladder(self):
+        """Test that low complexity raises CRF and lowers the bitrate cap."""
+        from .utils import derive_encoding_ladder
+        
+        ladder = derive_encoding_ladder(0.5)
+        
+        self.assertGreater(int(ladder['1080p']['crf']), 18)
+        self.assertEqual(ladder['1080p']['bitrate'], '3000k')
+    
+    def test_complex_content_gets_richer_ladder(self):
+        """Test that high complexity lowers CRF and raises the bitrate cap."""
+        from .utils import derive_encoding_ladder
+        
+        ladder = derive_encoding_ladder(1.5)
+        
+        self.assertLess(int(ladder['720p']['crf']), 23)
+        self.assertEqual(ladder['720p']['bitrate'], '3000k')
+    
+    def test_failed_analysis_keeps_defaults(self):
+        """Test that a failed probe yields no overrides."""
+        from .utils import derive_encoding_ladder
+        
+        self.assertEqual(derive_encoding_ladder(0.0), {})
+    
+    @patch('videos.utils.subprocess.run')
+    def test_probe_encode_bitrate_becomes_factor(self, mock_run):
+        """Test complexity factor computed from probe encode stats."""
+        from .utils import analyze_video_complexity
+        
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stderr='video:300kB audio:0kB subtitle:0kB other streams:0kB'
+        )
+        
+        factor = analyze_video_complexity('/tmp/source.mp4', duration=120.0)
+        
+        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(factor, 1.6)
+
+
+class EncodingLadderTest(TestCase):
+    """Test cases for the encoding ladder registry."""
+    
+    def test_ladder_comes_from_settings(self):
+        """Test that the ladder and quality choices follow settings."""
+        from .encoding import get_encoding_ladder, quality_choices
+        
+        ladder = get_encoding_ladder()
+        
+        self.assertEqual(list(ladder), ['480p', '720p', '1080p'])
+        self.assertEqual(ladder['720p']['segment_duration'], 10)
+        self.assertIn(('1080p', '1080p'), quality_choices())
+    
+    @override_settings(VIDEO_QUALITIES={
+        '1080p-hevc': {'width': 1920, 'height': 1080, 'codec': 'hevc', 'crf': 24, 'bitrate': '3500k'},
+    })
+    def test_hevc_profile_uses_fmp4_segments(self):
+        """Test that an HEVC tier encodes with libx265 into fMP4 segments."""
+        from .encoding import build_hls_args, build_video_args, get_profile
+        
+        profile = get_profile('1080p-hevc')
+        video_args = build_video_args(profile)
+        hls_args = build_hls_args(profile, '/tmp/out')
+        
+        self.assertIn('libx265', video_args)
+        self.assertIn('hvc1', video_args)
+        self.assertIn('fmp4', hls_args)
+        self.assertEqual(hls_args[-1], '/tmp/out/index.m3u8')
+    
+    @override_settings(VIDEO_QUALITIES={
+        '720p-av1': {'width': 1280, 'height': 720, 'codec': 'av1', 'preset': 8, 'rate_control': 'cbr', 'bitrate': '1200k'},
+    })
+    def test_av1_cbr_profile(self):
+        """Test that an AV1 tier uses SVT-AV1 with constant bitrate."""
+        from .encoding import build_video_args, get_profile
+        
+        video_args = build_video_args(get_profile('720p-av1'))
+        
+        self.assertIn('libsvtav1', video_args)
+        self.assertEqual(video_args[video_args.index('-minrate') + 1], '1200k')
+
+    
+    @override_settings(VIDEO_QUALITIES={
+        '2160p-hdr10-hevc-main10': {'width': 3840, 'height': 2160, 'codec': 'hevc'},
+        'x' * 33: {'width': 640, 'height': 360},
+        '../480p': {'width': 854, 'height': 480},
+        'source': {'width': 854, 'height': 480},
+    })
+    def test_invalid_quality_names_are_skipped(self):
+        """Test that tier names must fit the quality column and be path safe."""
+        from .encoding import get_encoding_ladder
+        
+        with self.assertLogs('videos.encoding', 'ERROR'):
+            ladder = get_encoding_ladder()
+        
+        self.assertEqual(list(ladder), ['2160p-hdr10-hevc-main10'])
+
+class UploadDeduplicationTest(TestCase):
+    """Test cases for content-hash deduplication of uploads."""
+    
+    def setUp(self):
+        """Set up a temporary media root and an already processed video."""
+        import hashlib
+        
+        use_temporary_media_root(self)
+        from .models import VideoQuality
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.genre = Genre.objects.create(name='Action')
+        self.content = b"\x00\x00\x00\x18ftypisom identical trailer content"
+        self.source = Video.objects.create(
+            title='Original',
+            genre=self.genre,
+            video_file='videos/1/trailer.mp4',
+            thumbnail='thumbnails/thumb_1.jpg',
+            content_hash=hashlib.sha256(self.content).hexdigest(),
+            is_processed=True
+        )
+        VideoQuality.objects.create(
+            video=self.source,
+            quality='720p',
+            file_path='/media/videos/1/hls/720p',
+            file_size=1234,
+            is_ready=True
+        )
+    
+    def upload(self, content):
+        """Upload a video with the given content."""
+        data = {
+            'title': 'Re-upload',
+            'genre_id': self.genre.id,
+            'video_file': SimpleUploadedFile("copy.mp4", content, content_type="video/mp4")
+        }
+        with patch('videos.api.views.get_queue') as mock_queue, \
+                patch('django_rq.get_queue'), \
+                patch('videos.hls_utils.hls_processor.convert_to_hls') as self.mock_convert:
+            response = self.client.post(reverse('videos:video-upload'), data, format='multipart')
+        return response, mock_queue
+    
+    def test_duplicate_upload_reuses_renditions(self):
+        """Test that a known file is not stored or encoded again."""
+        response, mock_queue = self.upload(self.content)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.exclude(id=self.source.id).get()
+        self.assertTrue(video.is_processed)
+        self.assertEqual(video.video_file.name, self.source.video_file.name)
+        self.assertEqual(video.thumbnail.name, self.source.thumbnail.name)
+        self.assertEqual(video.qualities.get().file_path, '/media/videos/1/hls/720p')
+        mock_queue.assert_not_called()
+        self.mock_convert.assert_not_called()
+    
+    def test_new_content_is_processed(self):
+        """Test that unknown content is stored and queued for encoding."""
+        response, mock_queue = self.upload(b"\x00\x00\x00\x18ftypisom different content")
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.exclude(id=self.source.id).get()
+        self.assertFalse(video.is_processed)
+        self.assertEqual(len(video.content_hash), 64)
+        mock_queue.return_value.enqueue.assert_called_once()
+
+
+class ChunkedUploadTest(TestCase):
+    """Test cases for resumable chunked uploads."""
+    
+    def setUp(self):
+        """Set up a temporary media root, authenticated client and upload content."""
+        use_temporary_media_root(self, CHUNKED_UPLOAD=lambda media_root: {
+            'DIR': os.path.join(media_root, 'uploads'),
+            'CHUNK_SIZE': 256 * 1024,
+            'MIN_CHUNK_SIZE': 256 * 1024,
+            'MAX_CHUNK_SIZE': 1024 * 1024,
+            'MAX_SIZE': 10 * 1024 * 1024,
+            'EXPIRY_HOURS': 24,
+        })
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.genre = Genre.objects.create(name='Action')
+        self.chunk_size = 256 * 1024
+        self.content = b'\x1a\x45\xdf\xa3' + bytes(range(256)) * 2500
+    
+    def start_session(self):
+        """Create an upload session for the test content."""
+        response = self.client.post(reverse('videos:upload-session-create'), {
+            'filename': 'movie.mp4',
+            'total_size': len(self.content),
+            'title': 'Chunked Video',
+            'genre_id': self.genre.id
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+    
+    def put_chunk(self, upload_id, index):
+        """Upload a single chunk using a Content-Range header."""
+        start = index * self.chunk_size
+        chunk = self.content[start:start + self.chunk_size]
+        return self.client.generic(
+            'PUT',
+            reverse('videos:upload-session-detail', kwargs={'upload_id': upload_id}),
+            chunk,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(chunk) - 1}/{len(self.content)}'
+        )
+    
+    def test_out_of_order_chunks_assemble_video(self):
+        """Test that chunks in any order produce the original file."""
+        upload_id = self.start_session()
+        
+        for index in [2, 0, 1]:
+            response = self.put_chunk(upload_id, index)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(response.data['missing_chunks'], [])
+        
+        with patch('django_rq.get_queue'):
+            response = self.client.post(
+                reverse('videos:upload-session-complete', kwargs={'upload_id': upload_id})
+            )
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.get(id=response.data['id'])
+        with open(video.video_file.path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+    
+    def test_part_file_is_removed_after_commit(self):
+        """Test that the part file outlives the transaction creating the video."""
+        import os
+        from .models import UploadSession
+        from .chunked_upload import finalize_upload, get_part_path
+        
+        upload_id = self.start_session()
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        session = UploadSession.objects.get(id=upload_id)
+        
+        with patch('django_rq.get_queue'):
+            with self.captureOnCommitCallbacks(execute=True):
+                video = finalize_upload(session)
+                self.assertTrue(os.path.exists(get_part_path(session)))
+        
+        self.assertFalse(os.path.exists(get_part_path(session)))
+        with open(video.video_file.path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+    
+    def test_rejected_file_reopens_session(self):
+        """Test that a failed validation leaves the session retryable."""
+        from .models import UploadSession
+        from .chunked_upload import ChunkedUploadError, finalize_upload
+        
+        upload_id = self.start_session()
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        session = UploadSession.objects.get(id=upload_id)
+        
+        def reject(path):
+            raise ChunkedUploadError('Not a video.')
+        
+        with self.assertRaises(ChunkedUploadError):
+            finalize_upload(session, validate=reject)
+        
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'active')
+        self.assertFalse(Video.objects.exists())
+    
+    def test_abort_only_removes_active_sessions(self):
+        """Test that DELETE leaves finalizing and completed sessions alone."""
+        import os
+        from .models import UploadSession
+        from .chunked_upload import get_part_path
+        
+        finished_id = self.start_session()
+        for index in range(3):
+            self.put_chunk(finished_id, index)
+        complete_url = reverse('videos:upload-session-complete', kwargs={'upload_id': finished_id})
+        with patch('django_rq.get_queue'):
+            video_id = self.client.post(complete_url).data['id']
+        
+        response = self.client.delete(reverse('videos:upload-session-detail', kwargs={'upload_id': finished_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(UploadSession.objects.get(id=finished_id).status, 'complete')
+        self.assertEqual(self.client.post(complete_url).data['id'], video_id)
+        
+        busy_id = self.start_session()
+        UploadSession.objects.filter(id=busy_id).update(status='finalizing')
+        response = self.client.delete(reverse('videos:upload-session-detail', kwargs={'upload_id': busy_id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(os.path.exists(get_part_path(UploadSession.objects.get(id=busy_id))))
+        
+        active_id = self.start_session()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('videos:upload-session-detail', kwargs={'upload_id': active_id}))
+        session = UploadSession.objects.get(id=active_id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(session.status, 'aborted')
+        self.assertFalse(os.path.exists(get_part_path(session)))
+    
+    def test_chunks_are_refused_while_finalizing(self):
+        """Test that a chunk cannot change the file once finalizing started."""
+        import io
+        from .models import UploadSession
+        from .chunked_upload import UploadInProgressError, get_part_path, write_chunk
+        
+        upload_id = self.start_session()
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        # Loaded by the chunk request before the session was claimed
+        stale_session = UploadSession.objects.get(id=upload_id)
+        UploadSession.objects.filter(id=upload_id).update(status='finalizing')
+        
+        with self.assertRaises(UploadInProgressError):
+            write_chunk(stale_session, 0, self.chunk_size, io.BytesIO(b'x' * self.chunk_size))
+        self.assertEqual(self.put_chunk(upload_id, 1).status_code, status.HTTP_409_CONFLICT)
+        
+        with open(get_part_path(stale_session), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+    
+    def test_resume_reports_missing_chunks(self):
+        """Test that progress lists chunks still to be sent."""
+        upload_id = self.start_session()
+        self.put_chunk(upload_id, 1)
+        
+        response = self.client.get(
+            reverse('videos:upload-session-detail', kwargs={'upload_id': upload_id})
+        )
+        
+        self.assertEqual(response.data['missing_chunks'], [0, 2])
+        self.assertEqual(response.data['received_bytes'], self.chunk_size)
+    
+    def test_complete_rejects_missing_chunks(self):
+        """Test that finalizing an incomplete upload fails."""
+        upload_id = self.start_session()
+        self.put_chunk(upload_id, 0)
+        
+        response = self.client.post(
+            reverse('videos:upload-session-complete', kwargs={'upload_id': upload_id})
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Video.objects.exists())
+
+    def test_malformed_chunk_headers_are_rejected(self):
+        """Test that bad Content-Length and Content-Range headers return 400."""
+        upload_id = self.start_session()
+        url = reverse('videos:upload-session-detail', kwargs={'upload_id': upload_id})
+        chunk = self.content[:self.chunk_size]
+        total = len(self.content)
+        
+        for headers in (
+            {'CONTENT_LENGTH': 'abc', 'HTTP_CONTENT_RANGE': f'bytes 0-{self.chunk_size - 1}/{total}'},
+            {'HTTP_CONTENT_RANGE': f'bytes 0-{self.chunk_size - 2}/{total}'},
+            {'HTTP_CONTENT_RANGE': f'bytes 10-0/{total}'},
+        ):
+            response = self.client.generic('PUT', url, chunk, content_type='application/octet-stream', **headers)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.assertEqual(self.client.get(url).data['received_bytes'], 0)
+    
+    def test_streaming_session_queues_ingest_and_defers_pipeline(self):
+        """Test that streaming uploads start encoding with the first chunk."""
+        import uuid
+        from .tasks import ingest_upload_stream
+        
+        response = self.client.post(reverse('videos:upload-session-create'), {
+            'filename': 'movie.mkv',
+            'total_size': len(self.content),
+            'title': 'Streamed Video',
+            'genre_id': self.genre.id,
+            'streaming': True
+        }, format='json')
+        upload_id = response.data['id']
+        
+        with patch('django_rq.get_queue') as mock_queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.put_chunk(upload_id, 0)
+            mock_queue.return_value.enqueue.assert_called_once_with(ingest_upload_stream, uuid.UUID(upload_id))
+            
+            mock_queue.reset_mock()
+            self.put_chunk(upload_id, 1)
+            self.put_chunk(upload_id, 2)
+            response = self.client.post(
+                reverse('videos:upload-session-complete', kwargs={'upload_id': upload_id})
+            )
+            
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            mock_queue.return_value.enqueue.assert_not_called()
+    
+    def test_streaming_ingest_needs_local_storage(self):
+        """Test that workers are not asked to read part files they cannot reach."""
+        response = self.client.post(reverse('videos:upload-session-create'), {
+            'filename': 'movie.mkv',
+            'total_size': len(self.content),
+            'title': 'Streamed Video',
+            'genre_id': self.genre.id,
+            'streaming': True
+        }, format='json')
+        
+        with patch('videos.chunked_upload.is_local_storage', return_value=False), \
+                patch('django_rq.get_queue') as mock_queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.put_chunk(response.data['id'], 0)
+        
+        mock_queue.return_value.enqueue.assert_not_called()
+    
+    def test_ingest_pipes_upload_into_ffmpeg(self):
+        """Test that the ingest task feeds every received byte to FFmpeg."""
+        import io
+        from .models import UploadSession
+        from .chunked_upload import create_part_file, get_part_path
+        from .tasks import ingest_upload_stream
+        
+        session = UploadSession.objects.create(
+            user=self.user,
+            filename='movie.mkv',
+            total_size=len(self.content),
+            chunk_size=self.chunk_size,
+            received_chunks=[0, 1, 2],
+            title='Streamed Video',
+            genre=self.genre,
+            streaming=True,
+            ingest_status='running'
+        )
+        create_part_file(session)
+        with open(get_part_path(session), 'r+b') as part_file:
+            part_file.write(self.content)
+        
+        fed = io.BytesIO()
+        fed.close = lambda: None
+        with patch('videos.tasks.subprocess.Popen') as mock_popen:
+            mock_popen.return_value.stdin = fed
+            mock_popen.return_value.wait.return_value = 0
+            ingest_upload_stream(session.id)
+        
+        session.refresh_from_db()
+        self.assertEqual(fed.getvalue(), self.content)
+        self.assertEqual(session.ingest_status, 'done')
+
+
+class UploadPreflightTest(TestCase):
+    """Test cases for the upload pre-flight check."""
+    
+    def setUp(self):
+        """Set up a temporary media root and authenticated client."""
+        use_temporary_media_root(self)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.genre = Genre.objects.create(name='Action')
+    
+    def upload(self, content):
+        """Upload a video with the given content."""
+        data = {
+            'title': 'Upload',
+            'genre_id': self.genre.id,
+            'video_file': SimpleUploadedFile("clip.mp4", content, content_type="video/mp4")
+        }
+        with patch('videos.api.views.get_queue'):
+            return self.client.post(reverse('videos:video-upload'), data, format='multipart')
+    
+    def test_container_signatures(self):
+        """Test magic-byte sniffing of common containers."""
+        from .utils import sniff_video_container
+        
+        self.assertEqual(sniff_video_container(b'\x00\x00\x00\x20ftypmp42'), 'mp4')
+        self.assertEqual(sniff_video_container(b'\x1a\x45\xdf\xa3\x01'), 'matroska')
+        self.assertEqual(sniff_video_container(b'RIFF\x00\x00\x00\x00AVI LIST'), 'avi')
+        self.assertEqual(sniff_video_container(b'%PDF-1.7 not a video'), '')
+    
+    def test_mislabelled_file_is_rejected(self):
+        """Test that a non-video with a video extension is rejected."""
+        response = self.upload(b'%PDF-1.7 this is a document')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('video_file', response.data)
+        self.assertFalse(Video.objects.exists())
+    
+    @patch('videos.utils.subprocess.run')
+    def test_undecodable_file_is_rejected(self, mock_run):
+        """Test that a file ffprobe cannot decode is rejected."""
+        mock_run.return_value = MagicMock(returncode=1, stdout=b'', stderr=b'moov atom not found')
+        
+        response = self.upload(b'\x00\x00\x00\x18ftypisom truncated')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Video.objects.exists())
+    
+    @patch('videos.utils.subprocess.run')
+    def test_probe_result_is_stored(self, mock_run):
+        """Test that the probe summary is kept for the pipeline."""
+        import json
+        mock_run.return_value = MagicMock(returncode=0, stderr=b'', stdout=json.dumps({
+            'format': {'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'duration': '12.5', 'bit_rate': '800000'},
+            'streams': [{'codec_type': 'video', 'codec_name': 'h264', 'width': 1280, 'height': 720}]
+        }).encode())
+        
+        response = self.upload(b'\x00\x00\x00\x18ftypisom probed')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        video = Video.objects.get()
+        self.assertEqual(video.probe_info['duration'], 12.5)
+        self.assertEqual(video.probe_info['width'], 1280)
+
+
+IN_MEMORY_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def signed_segment_url(video_id, resolution, segment):
+    """Get the signed URL of an HLS segment, as written into manifests."""
+    from .signing import signed_query
+    
+    url = reverse('videos:hls-segment', kwargs={
+        'movie_id': video_id, 'resolution': resolution, 'segment': segment
+    })
+    return f'{url}?{signed_query(video_id, resolution)}'
+
+
+class MediaStorageTest(TestCase):
+    """Test cases for the pipeline on a remote (non-filesystem) storage."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video."""
+        use_temporary_media_root(self)
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Remote Video',
+            description='Stored in a bucket',
+            genre=self.genre,
+            is_processed=True
+        )
+    
+    def test_rendition_is_published_from_workspace(self):
+        """Test that encoder output is uploaded below the rendition prefix."""
+        import os
+        from .storage import is_local_storage, list_prefix, rendition_workspace
+        
+        self.assertFalse(is_local_storage())
+        with rendition_workspace('videos/1/hls/480p') as output_dir:
+            for name in ('index.m3u8', 'segment_000.ts'):
+                with open(os.path.join(output_dir, name), 'wb') as f:
+                    f.write(b'data')
+        
+        self.assertFalse(os.path.exists(output_dir))
+        self.assertEqual(
+            sorted(list_prefix('videos/1/hls/480p')),
+            ['videos/1/hls/480p/index.m3u8', 'videos/1/hls/480p/segment_000.ts']
+        )
+    
+    def test_failed_encode_publishes_nothing(self):
+        """Test that a failing encode leaves the storage untouched."""
+        from .storage import list_prefix, rendition_workspace
+        
+        with self.assertRaises(RuntimeError):
+            with rendition_workspace('videos/1/hls/480p') as output_dir:
+                open(f'{output_dir}/index.m3u8', 'wb').close()
+                raise RuntimeError('ffmpeg failed')
+        
+        self.assertEqual(list_prefix('videos/1/hls/480p'), [])
+    
+    def test_local_copy_downloads_source(self):
+        """Test that a remote source is made available as a local file."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .storage import local_copy
+        
+        name = default_storage.save('videos/source.mp4', ContentFile(b'source bytes'))
+        with local_copy(name) as path:
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'source bytes')
+    
+    def test_segments_and_manifest_are_served_from_storage(self):
+        """Test that streaming reads renditions through the storage API."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import VideoQuality, rendition_path
+        
+        prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{prefix}/index.m3u8', ContentFile(b'#EXTM3U\nsegment_000.ts\n'))
+        default_storage.save(f'{prefix}/segment_000.ts', ContentFile(b'segment bytes'))
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=prefix, is_ready=True)
+        
+        response = self.client.get(signed_segment_url(self.video.id, '480p', 'segment_000.ts'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'segment bytes')
+        
+        response = self.client.get(reverse('videos:hls-manifest', kwargs={
+            'movie_id': self.video.id, 'resolution': '480p'
+        }))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f'/api/video/{self.video.id}/480p/segment_000.ts', response.content.decode())
+    
+    def test_delete_removes_renditions(self):
+        """Test that deleting a video removes its rendition prefix."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import VideoQuality, rendition_path
+        
+        prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{prefix}/segment_000.ts', ContentFile(b'segment bytes'))
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=prefix, is_ready=True)
+        
+        self.video.delete()
+        
+        self.assertFalse(default_storage.exists(f'{prefix}/segment_000.ts'))
+
+
+class ShardedMediaLayoutTest(TestCase):
+    """Test cases for the hash fan-out media layout."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a genre."""
+        use_temporary_media_root(self)
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        self.genre = Genre.objects.create(name='Action')
+    
+    def test_paths_fan_out_by_hash(self):
+        """Test that media paths are spread over hashed directories."""
+        from .models import media_shard, rendition_path, legacy_hls_path
+        
+        shard = media_shard(42)
+        self.assertRegex(shard, r'^[0-9a-f]{2}/[0-9a-f]{2}$')
+        self.assertEqual(rendition_path(42, '720p'), f'videos/{shard}/42/hls/720p')
+        self.assertEqual(legacy_hls_path(42), f'hls/{shard}/42')
+        self.assertNotEqual(media_shard(43), shard)
+    
+    def test_command_moves_flat_media(self):
+        """Test that existing flat files are moved and references updated."""
+        from io import StringIO
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from .models import VideoQuality, rendition_path
+        
+        video = Video.objects.create(
+            title='Old Video',
+            description='Flat layout',
+            genre=self.genre,
+            is_processed=True
+        )
+        default_storage.save(f'videos/{video.id}/movie.mp4', ContentFile(b'source'))
+        default_storage.save(f'thumbnails/thumb_{video.id}.jpg', ContentFile(b'thumb'))
+        default_storage.save(f'videos/{video.id}/hls/480p/index.m3u8', ContentFile(b'#EXTM3U'))
+        Video.objects.filter(id=video.id).update(
+            video_file=f'videos/{video.id}/movie.mp4',
+            thumbnail=f'thumbnails/thumb_{video.id}.jpg'
+        )
+        VideoQuality.objects.create(
+            video=video, quality='480p', file_path=f'videos/{video.id}/hls/480p', is_ready=True
+        )
+        
+        call_command('shard_media_layout', stdout=StringIO())
+        
+        video.refresh_from_db()
+        quality = video.qualities.get()
+        self.assertEqual(quality.file_path, rendition_path(video.id, '480p'))
+        self.assertTrue(default_storage.exists(f'{quality.file_path}/index.m3u8'))
+        self.assertTrue(video.video_file.name.endswith(f'/{video.id}/movie.mp4'))
+        self.assertEqual(default_storage.open(video.video_file.name).read(), b'source')
+        self.assertEqual(default_storage.open(video.thumbnail.name).read(), b'thumb')
+        self.assertFalse(default_storage.exists(f'videos/{video.id}/movie.mp4'))
+        self.assertFalse(default_storage.exists(f'videos/{video.id}/hls/480p/index.m3u8'))
+        
+        output = StringIO()
+        call_command('shard_media_layout', stdout=output)
+        self.assertIn('Moved 0 media locations', output.getvalue())
+
+
+class SegmentDeliveryTest(TestCase):
+    """Test cases for streaming and offloaded media delivery."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video with a segment."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import VideoQuality, rendition_path
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        
+        genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Stream Video',
+            description='Segments',
+            genre=genre,
+            is_processed=True
+        )
+        self.prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{self.prefix}/segment_000.ts', ContentFile(b'segment bytes'))
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=self.prefix, is_ready=True)
+        self.url = signed_segment_url(self.video.id, '480p', 'segment_000.ts')
+    
+    def test_segment_is_streamed(self):
+        """Test that segments are streamed instead of buffered."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'video/MP2T')
+        self.assertEqual(response['Content-Length'], str(len(b'segment bytes')))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('"'))
+    
+    def test_conditional_request_returns_304(self):
+        """Test that a cached segment is revalidated without a body."""
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_single_range(self):
+        """Test that a byte range returns 206 with only the requested bytes."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=8-12')
+        
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'bytes')
+        self.assertEqual(response['Content-Range'], 'bytes 8-12/13')
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), b'bytes')
+    
+    def test_multiple_ranges(self):
+        """Test that several ranges are returned as multipart/byteranges."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-6,8-')
+        
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(body), int(response['Content-Length']))
+        self.assertIn(b'Content-Range: bytes 0-6/13\r\n\r\nsegment\r\n', body)
+        self.assertIn(b'Content-Range: bytes 8-12/13\r\n\r\nbytes\r\n', body)
+    
+    def test_unsatisfiable_range(self):
+        """Test that a range beyond the end of the file returns 416."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-200')
+        
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */13')
+    
+    def test_stale_if_range_returns_full_file(self):
+        """Test that a range for an outdated copy returns the whole file."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-6', HTTP_IF_RANGE='"outdated"')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'segment bytes')
+    
+    @override_settings(MEDIA_OFFLOAD={'MODE': 'x-accel', 'ACCEL_PREFIX': '/protected-media/'})
+    def test_segment_is_offloaded_to_proxy(self):
+        """Test that offload mode only returns the internal redirect."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.prefix}/segment_000.ts')
+        self.assertEqual(response['Content-Type'], 'video/MP2T')
+    
+    def test_missing_segment_returns_404(self):
+        """Test that unknown segments are not found."""
+        response = self.client.get(signed_segment_url(self.video.id, '480p', 'segment_999.ts'))
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    async def test_segment_is_streamed_asynchronously(self):
+        """Test that ASGI requests get an async streaming body."""
+        response = await self.async_client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Length'], str(len(b'segment bytes')))
+        self.assertEqual(b''.join([block async for block in response.streaming_content]), b'segment bytes')
+    
+    async def test_async_ranges(self):
+        """Test that byte ranges are served by the async body as well."""
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=8-12'})
+        
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join([block async for block in response.streaming_content]), b'bytes')
+        
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=0-6,8-'})
+        body = b''.join([block async for block in response.streaming_content])
+        self.assertEqual(len(body), int(response['Content-Length']))
+        self.assertIn(b'Content-Range: bytes 8-12/13\r\n\r\nbytes\r\n', body)
+
+
+class ManifestCacheTest(TestCase):
+    """Test cases for the rewritten-manifest cache."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video with a manifest."""
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .manifest_cache import local_manifests
+        from .models import VideoQuality, rendition_path
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_manifests.clear()
+        local_entries.clear()
+        
+        genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Manifest Video',
+            description='Cached',
+            genre=genre,
+            is_processed=True
+        )
+        prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(
+            f'{prefix}/index.m3u8',
+            ContentFile(b'#EXTM3U\n#EXTINF:10.0,\nsegment_000.ts\n#EXT-X-ENDLIST\n')
+        )
+        self.quality = VideoQuality.objects.create(
+            video=self.video, quality='480p', file_path=prefix, is_ready=True
+        )
+        self.url = reverse('videos:hls-manifest', kwargs={'movie_id': self.video.id, 'resolution': '480p'})
+    
+    def test_repeat_loads_are_served_from_cache(self):
+        """Test that the manifest is read and rewritten only once."""
+        from .storage import open_media
+        
+        with patch('videos.manifest_cache.open_media', wraps=open_media) as mock_open:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(f'http://testserver/api/video/{self.video.id}/480p/segment_000.ts', first.content.decode())
+    
+    def test_repeat_loads_do_not_touch_storage(self):
+        """Test that a cached manifest is served without storage calls."""
+        from django.core.files.storage import InMemoryStorage
+        
+        first = self.client.get(self.url)
+        
+        with patch.object(InMemoryStorage, 'exists') as mock_exists, \
+                patch.object(InMemoryStorage, 'get_modified_time') as mock_modified, \
+                patch.object(InMemoryStorage, 'open') as mock_open:
+            second = self.client.get(self.url)
+        
+        self.assertEqual(second.content, first.content)
+        mock_exists.assert_not_called()
+        mock_modified.assert_not_called()
+        mock_open.assert_not_called()
+    
+    @override_settings(ALLOWED_HOSTS=['testserver', 'cdn.example.com'])
+    def test_hosts_get_their_own_urls(self):
+        """Test that cached manifests are not shared between hosts."""
+        self.client.get(self.url)
+        
+        response = self.client.get(self.url, HTTP_HOST='cdn.example.com')
+        
+        self.assertIn('http://cdn.example.com/api/video/', response.content.decode())
+    
+    def test_revalidation_returns_304(self):
+        """Test that players can revalidate the manifest with its ETag."""
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_republish_invalidates_local_cache(self):
+        """Test that republishing a rendition drops the video's cached manifests."""
+        from .manifest_cache import local_manifests
+        
+        self.client.get(self.url)
+        self.assertTrue(local_manifests.entries)
+        
+        self.quality.save()
+        self.assertTrue(local_manifests.entries)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quality.file_size = 2048
+            self.quality.save()
+        
+        self.assertFalse(local_manifests.entries)
+
+
+class StreamCatalogTest(TestCase):
+    """Test cases for the stream catalog."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video with a segment."""
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import rendition_path
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_entries.clear()
+        
+        self.genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Catalog Video',
+            description='Indexed',
+            genre=self.genre,
+            is_processed=True
+        )
+        self.prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{self.prefix}/segment_000.ts', ContentFile(b'segment bytes'))
+    
+    def segment_url(self, video_id):
+        """Get the URL of the first 480p segment of a video."""
+        return signed_segment_url(video_id, '480p', 'segment_000.ts')
+    
+    def test_segments_are_served_without_queries(self):
+        """Test that repeat segment requests do not touch the database."""
+        from .models import VideoQuality
+        
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=self.prefix, is_ready=True)
+        self.assertEqual(self.client.get(self.segment_url(self.video.id)).status_code, status.HTTP_200_OK)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.segment_url(self.video.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_unknown_video_is_negatively_cached(self):
+        """Test that misses are cached as well."""
+        self.assertEqual(self.client.get(self.segment_url(9999)).status_code, status.HTTP_404_NOT_FOUND)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.segment_url(9999))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_publishing_a_rendition_updates_the_catalog(self):
+        """Test that a published rendition is streamable immediately."""
+        from .models import VideoQuality
+        from .stream_catalog import resolve_stream
+        
+        self.assertIsNone(resolve_stream(self.video.id, '480p'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.create(video=self.video, quality='480p', file_path=self.prefix, is_ready=True)
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_stream(self.video.id, '480p'), self.prefix)
+
+    
+    def test_manifest_prefix_comes_from_the_catalog(self):
+        """Test that the legacy fallback is picked without probing storage."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import InMemoryStorage, default_storage
+        from .manifest_cache import local_manifests
+        from .models import VideoQuality, legacy_hls_path
+        from .storage import open_media
+        
+        local_manifests.clear()
+        legacy_manifest = f'{legacy_hls_path(self.video.id)}/index.m3u8'
+        default_storage.save(legacy_manifest, ContentFile(b'#EXTM3U\n#EXTINF:10.0,\nsegment_000.ts\n'))
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.create(video=self.video, quality='480p', file_path=self.prefix, is_ready=True)
+        url = reverse('videos:hls-manifest', kwargs={'movie_id': self.video.id, 'resolution': '480p'})
+        
+        with patch.object(InMemoryStorage, 'exists') as mock_exists, \
+                patch('videos.manifest_cache.open_media', wraps=open_media) as mock_open:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_exists.assert_not_called()
+        mock_open.assert_called_once_with(legacy_manifest)
+
+class SignedStreamUrlTest(TestCase):
+    """Test cases for HMAC-signed segment URLs."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video with a rendition."""
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .manifest_cache import local_manifests
+        from .models import VideoQuality, rendition_path
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_manifests.clear()
+        local_entries.clear()
+        
+        genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Signed Video',
+            description='Protected',
+            genre=genre,
+            is_processed=True
+        )
+        prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{prefix}/index.m3u8', ContentFile(b'#EXTM3U\nsegment_000.ts\n'))
+        default_storage.save(f'{prefix}/segment_000.ts', ContentFile(b'segment bytes'))
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=prefix, is_ready=True)
+        self.segment_url = reverse('videos:hls-segment', kwargs={
+            'movie_id': self.video.id, 'resolution': '480p', 'segment': 'segment_000.ts'
+        })
+    
+    def test_manifest_links_are_signed(self):
+        """Test that segment URLs from the manifest can be fetched."""
+        manifest = self.client.get(reverse('videos:hls-manifest', kwargs={
+            'movie_id': self.video.id, 'resolution': '480p'
+        })).content.decode()
+        segment_url = [line for line in manifest.split('\n') if 'segment_000.ts' in line][0]
+        
+        self.assertIn('?exp=', segment_url)
+        self.assertEqual(self.client.get(segment_url).status_code, status.HTTP_200_OK)
+    
+    def test_unsigned_request_is_forbidden(self):
+        """Test that segments cannot be fetched without a signature."""
+        self.assertEqual(self.client.get(self.segment_url).status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_tampered_and_expired_signatures_are_forbidden(self):
+        """Test that a signature only works for its rendition and lifetime."""
+        from urllib.parse import parse_qs
+        from .signing import signed_query
+        
+        other = parse_qs(signed_query(self.video.id, '720p'))
+        response = self.client.get(self.segment_url, {'exp': other['exp'][0], 'sig': other['sig'][0]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        expired = parse_qs(signed_query(self.video.id, '480p', now=0))
+        response = self.client.get(self.segment_url, {'exp': expired['exp'][0], 'sig': expired['sig'][0]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_source_fallback_is_signed_and_published_only(self):
+        """Test that the progressive source needs a signature and a processed video."""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .signing import SOURCE_RENDITION, signed_query
+        
+        self.video.video_file = default_storage.save(f'videos/{self.video.id}/source.mp4', ContentFile(b'mp4'))
+        self.video.save()
+        source_url = reverse('videos:video-source', kwargs={'movie_id': self.video.id})
+        
+        self.assertEqual(self.client.get(source_url).status_code, status.HTTP_403_FORBIDDEN)
+        signed_url = f'{source_url}?{signed_query(self.video.id, SOURCE_RENDITION)}'
+        self.assertEqual(self.client.get(signed_url).status_code, status.HTTP_200_OK)
+        
+        Video.objects.filter(id=self.video.id).update(is_processed=False)
+        self.assertEqual(self.client.get(signed_url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_expiry_is_bucketed(self):
+        """Test that viewers within one bucket get identical URLs."""
+        from .signing import signed_query
+        
+        self.assertEqual(signed_query(self.video.id, '480p', now=1200), signed_query(self.video.id, '480p', now=1799))
+        self.assertNotEqual(signed_query(self.video.id, '480p', now=1200), signed_query(self.video.id, '480p', now=1800))
+
+
+class SegmentCacheTest(TestCase):
+    """Test cases for the on-disk segment cache in front of remote storage."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage, a cache directory and a published video."""
+        import tempfile
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import VideoQuality, rendition_path
+        from .segment_cache import segment_cache
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_entries.clear()
+        
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        for patcher in (
+            patch.object(segment_cache, 'directory', cache_dir.name),
+            patch.object(segment_cache, 'stored_bytes', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = segment_cache
+        
+        genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Release Video',
+            description='Popular',
+            genre=genre,
+            is_processed=True
+        )
+        self.prefix = rendition_path(self.video.id, '480p')
+        default_storage.save(f'{self.prefix}/index.m3u8', ContentFile(
+            b'#EXTM3U\n#EXT-X-MAP:URI="init.mp4"\nsegment_000.m4s\nsegment_001.m4s\nsegment_002.m4s\n'
+        ))
+        for name in ('init.mp4', 'segment_000.m4s', 'segment_001.m4s', 'segment_002.m4s'):
+            default_storage.save(f'{self.prefix}/{name}', ContentFile(b'bytes of ' + name.encode()))
+        VideoQuality.objects.create(video=self.video, quality='480p', file_path=self.prefix, is_ready=True)
+    
+    @override_settings(SEGMENT_CACHE={'ENABLED': True, 'PREWARM_SEGMENTS': 3, 'FETCH_TIMEOUT': 5})
+    def test_segments_are_served_from_local_copy(self):
+        """Test that a cached segment no longer needs the origin."""
+        from django.core.files.storage import default_storage
+        
+        url = signed_segment_url(self.video.id, '480p', 'segment_000.m4s')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        default_storage.delete(f'{self.prefix}/segment_000.m4s')
+        
+        response = self.client.get(url, HTTP_RANGE='bytes=9-')
+        
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'segment_000.m4s')
+    
+    @override_settings(SEGMENT_CACHE={'ENABLED': True, 'PREWARM_SEGMENTS': 3, 'FETCH_TIMEOUT': 5})
+    def test_concurrent_misses_fetch_once(self):
+        """Test that simultaneous misses for one segment share a single origin read."""
+        import time
+        import threading
+        from . import segment_cache as segment_cache_module
+        
+        opened = []
+        open_media = segment_cache_module.open_media
+        
+        def slow_open(name):
+            opened.append(name)
+            time.sleep(0.2)
+            return open_media(name)
+        
+        name = f'{self.prefix}/segment_001.m4s'
+        paths = []
+        with patch.object(segment_cache_module, 'open_media', slow_open):
+            threads = [
+                threading.Thread(target=lambda: paths.append(self.cache.fetch(name, 1)))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(opened, [name])
+        self.assertEqual(len(set(paths)), 1)
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(f.read(), b'bytes of segment_001.m4s')
+    
+    def test_truncated_download_is_not_published(self):
+        """Test that a copy shorter than the stored segment never lands in the cache."""
+        import io
+        import os
+        from . import segment_cache as segment_cache_module
+        
+        name = f'{self.prefix}/segment_002.m4s'
+        with patch.object(segment_cache_module, 'open_media', lambda name: io.BytesIO(b'bytes of')):
+            with self.assertRaises(OSError):
+                self.cache.fetch(name, 1)
+        
+        self.assertIsNone(self.cache.get(name, 1))
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path(name, 1))), [])
+        with open(self.cache.fetch(name, 1), 'rb') as f:
+            self.assertEqual(f.read(), b'bytes of segment_002.m4s')
+    
+    def test_least_recently_used_files_are_evicted(self):
+        """Test that the cache stays within its size budget."""
+        import os
+        
+        names = [f'{self.prefix}/segment_00{index}.m4s' for index in range(3)]
+        with patch.object(self.cache, 'max_bytes', 50):
+            first = self.cache.fetch(names[0], 1)
+            os.utime(first, (1, 1))
+            self.cache.fetch(names[1], 1)
+            self.cache.fetch(names[2], 1)
+        
+        self.assertIsNone(self.cache.get(names[0], 1))
+        self.assertIsNotNone(self.cache.get(names[2], 1))
+    
+    def test_prewarm_fetches_first_segments(self):
+        """Test that publishing warms the init and first segments of each rendition."""
+        from .segment_cache import prewarm_stream
+        from .stream_catalog import get_stream_entry
+        
+        entry = get_stream_entry(self.video.id)
+        self.assertTrue(entry['version'])
+        
+        with self.settings(SEGMENT_CACHE={'ENABLED': True, 'PREWARM_SEGMENTS': 2, 'FETCH_TIMEOUT': 5}):
+            prewarm_stream(self.video.id, entry)
+        
+        for name in ('init.mp4', 'segment_000.m4s', 'segment_001.m4s'):
+            self.assertIsNotNone(self.cache.get(f'{self.prefix}/{name}', entry['version']))
+        self.assertIsNone(self.cache.get(f'{self.prefix}/segment_002.m4s', entry['version']))
+
+
+class SegmentIndexTest(TestCase):
+    """Test cases for segment indexes and dynamic manifests."""
+    
+    PLAYLIST = (
+        '#EXTM3U\n#EXT-X-VERSION:7\n#EXT-X-TARGETDURATION:10\n#EXT-X-MEDIA-SEQUENCE:0\n'
+        '#EXT-X-MAP:URI="init.mp4"\n'
+        '#EXTINF:10.000000,\nsegment_000.m4s\n'
+        '#EXTINF:10.000000,\nsegment_001.m4s\n'
+        '#EXTINF:5.500000,\nsegment_002.m4s\n'
+        '#EXT-X-ENDLIST\n'
+    )
+    
+    def setUp(self):
+        """Set up an empty in-memory storage and a processed video with an indexed rendition."""
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .models import rendition_path
+        from .segment_index import local_indexes
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_entries.clear()
+        local_indexes.clear()
+        
+        genre = Genre.objects.create(name='Action')
+        self.video = Video.objects.create(
+            title='Indexed Video',
+            description='Dynamic',
+            genre=genre,
+            is_processed=True
+        )
+        self.prefix = rendition_path(self.video.id, '1080p')
+        default_storage.save(f'{self.prefix}/index.m3u8', ContentFile(self.PLAYLIST.encode()))
+        for name, size in (('segment_000.m4s', 100), ('segment_001.m4s', 80), ('segment_002.m4s', 40)):
+            default_storage.save(f'{self.prefix}/{name}', ContentFile(b'x' * size))
+        self.url = reverse('videos:hls-manifest', kwargs={'movie_id': self.video.id, 'resolution': '1080p'})
+    
+    def test_index_roundtrip_and_seek(self):
+        """Test that the sidecar keeps every segment and supports time lookups."""
+        from .segment_index import SegmentIndex, parse_playlist
+        
+        sizes = {'segment_000.m4s': 100, 'segment_001.m4s': 80, 'segment_002.m4s': 40}
+        index = SegmentIndex.from_bytes(parse_playlist(self.PLAYLIST, sizes.get).to_bytes())
+        
+        self.assertEqual(index.names, ['segment_000.m4s', 'segment_001.m4s', 'segment_002.m4s'])
+        self.assertEqual(index.init, 'init.mp4')
+        self.assertEqual(list(index.sizes), [100, 80, 40])
+        self.assertEqual(index.duration, 25.5)
+        self.assertEqual([index.segment_at(t) for t in (0, 9.99, 10, 24, 99)], [0, 0, 1, 2, 2])
+    
+    def test_byte_range_playlist(self):
+        """Test that single-file playlists keep their byte ranges."""
+        from .segment_index import parse_playlist
+        
+        index = parse_playlist(
+            '#EXTM3U\n#EXT-X-TARGETDURATION:10\n'
+            '#EXTINF:10.0,\n#EXT-X-BYTERANGE:500@0\nstream.ts\n'
+            '#EXTINF:10.0,\n#EXT-X-BYTERANGE:300\nstream.ts\n',
+            lambda uri: 0
+        )
+        
+        self.assertEqual(list(index.offsets), [0, 500])
+        self.assertIn('#EXT-X-BYTERANGE:300@500\nhttp://cdn/stream.ts\n', index.render('http://cdn/').decode())
+    
+    def test_manifest_is_rendered_from_index(self):
+        """Test that indexed renditions no longer need their playlist file."""
+        from django.core.files.storage import default_storage
+        from .models import VideoQuality
+        from .segment_index import build_stored_segment_index
+        
+        build_stored_segment_index(self.prefix)
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.create(video=self.video, quality='1080p', file_path=self.prefix, is_ready=True)
+        default_storage.delete(f'{self.prefix}/index.m3u8')
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn(f'#EXT-X-MAP:URI="http://testserver/api/video/{self.video.id}/1080p/init.mp4?exp=', content)
+        self.assertEqual(content.count('#EXTINF:'), 3)
+        self.assertTrue(content.endswith('#EXT-X-ENDLIST\n'))
+    
+    def test_trimmed_window_with_resume_offset(self):
+        """Test that a window only lists its segments and starts at the resume point."""
+        from .models import VideoQuality
+        from .segment_index import build_stored_segment_index
+        
+        build_stored_segment_index(self.prefix)
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.create(video=self.video, quality='1080p', file_path=self.prefix, is_ready=True)
+        
+        content = self.client.get(self.url, {'start': 12, 'end': 20, 't': 15}).content.decode()
+        
+        self.assertIn('#EXT-X-MEDIA-SEQUENCE:1\n', content)
+        self.assertIn('#EXT-X-START:TIME-OFFSET=5.000,PRECISE=YES\n', content)
+        self.assertIn('segment_001.m4s', content)
+        self.assertNotIn('segment_000.m4s', content)
+        self.assertNotIn('segment_002.m4s', content)
+
+
+class HLSLoadTestTest(TestCase):
+    """Test cases for the HLS viewer load generator."""
+    
+    def setUp(self):
+        """Set up an empty in-memory storage."""
+        from django.core.cache import cache
+        from .stream_catalog import local_entries
+        
+        storage_override = override_settings(STORAGES=IN_MEMORY_STORAGES)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+        cache.clear()
+        local_entries.clear()
+    
+    def http(self):
+        """Wrap the test client in the requests-like interface of ViewerSession."""
+        from types import SimpleNamespace
+        
+        client = self.client
+        
+        class Http:
+            def get(self, url, timeout=None):
+                response = client.get(url)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                return SimpleNamespace(status_code=response.status_code, content=content)
+        
+        return Http()
+    
+    def test_sessions_stream_synthetic_video(self):
+        """Test that simulated viewers play, seek and switch without errors."""
+        import time
+        import random
+        from .loadtest import LoadStats, ViewerSession, create_synthetic_video
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            video = create_synthetic_video(['480p', '720p'], segments=5, segment_kb=1)
+        stats = LoadStats()
+        
+        ViewerSession(
+            self.http(), 'http://testserver', video.id, ['480p', '720p'], stats, speed=0,
+            seek_probability=0.2, switch_probability=0.3, rng=random.Random(1)
+        ).run(time.monotonic() + 0.5)
+        
+        report = stats.summary()
+        self.assertEqual(report['errors'], {})
+        self.assertGreater(report['requests'], 10)
+        self.assertGreater(report['bytes'], 0)
+        self.assertGreater(report['seeks'] + report['switches'], 0)
+        self.assertGreater(report['segment_p99_ms'], 0)
+    
+    def test_synthetic_video_is_removed_with_its_media(self):
+        """Test that the synthetic video leaves nothing behind, even when publishing fails."""
+        from .loadtest import create_synthetic_video, delete_synthetic_video
+        from .models import video_media_path
+        from .storage import list_prefix
+        
+        video = create_synthetic_video(['480p'], segments=2, segment_kb=1)
+        video_id = video.id
+        self.assertTrue(list(list_prefix(video_media_path(video_id))))
+        
+        delete_synthetic_video(video)
+        
+        self.assertFalse(Video.objects.filter(id=video_id).exists())
+        self.assertEqual(list(list_prefix(video_media_path(video_id))), [])
+        
+        with patch('videos.segment_index.build_stored_segment_index', side_effect=OSError('storage down')):
+            with self.assertRaises(OSError):
+                create_synthetic_video(['480p'], segments=2, segment_kb=1)
+        self.assertFalse(Video.objects.filter(genre__name='Benchmark').exists())
+    
+    def test_percentile(self):
+        """Test the percentile helper used by the reports."""
+        from .loadtest import percentile
+        
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile(list(range(1, 101)), 0.5), 51)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 100)
+
+
+class TranscodeBenchmarkTest(TestCase):
+    """Test cases for the transcoding benchmark helpers."""
+    
+    def test_quality_metrics_are_parsed(self):
+        """Test that PSNR and SSIM are read from FFmpeg's filter output."""
+        from .transcode_benchmark import parse_quality_metrics
+        
+        stderr = (
+            '[Parsed_psnr_4 @ 0x55] PSNR y:40.10 u:45.20 v:46.00 average:41.52 min:39.00 max:44.00\n'
+            '[Parsed_ssim_5 @ 0x56] SSIM Y:0.980 (16.98) U:0.990 (20.00) V:0.991 (20.46) All:0.9853 (18.32)\n'
+        )
+        
+        self.assertEqual(parse_quality_metrics(stderr), {'psnr': 41.52, 'ssim': 0.9853})
+        self.assertEqual(parse_quality_metrics(''), {'psnr': None, 'ssim': None})
+    
+    def test_reports_are_compared_per_encode(self):
+        """Test that matching encodes of two reports are compared metric by metric."""
+        from .transcode_benchmark import compare_reports
+        
+        def result(speed, size):
+            return {
+                'source': 'noise_1280x720_10s.mp4', 'mode': 'ladder', 'quality': '720p',
+                'preset': 'medium', 'crf_setting': 'config', 'ok': True,
+                'speed_x_realtime': speed, 'output_bytes': size,
+            }
+        
+        rows = compare_reports(
+            {'results': [result(2.0, 1000)]},
+            {'results': [result(3.0, 900), {**result(1.0, 1), 'quality': '1080p'}]}
+        )
+        
+        self.assertEqual(
+            [(metric, change) for key, metric, old, new, change in rows],
+            [('speed_x_realtime', 0.5), ('output_bytes', -0.1)]
+        )
+
+
+class PlaybackDescriptorTest(TestCase):
+    """Test cases for the denormalized playback descriptor."""
+    
+    def setUp(self):
+        """Create a video with two renditions."""
+        from .models import VideoQuality
+        
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.video = Video.objects.create(
+                title='Descriptor', genre=Genre.objects.create(name='Docs'), is_processed=True
+            )
+            for quality in ('480p', '720p'):
+                VideoQuality.objects.create(
+                    video=self.video, quality=quality, file_path=f'videos/x/hls/{quality}',
+                    file_size=1000, is_ready=True
+                )
+    
+    def test_descriptor_written_on_publish(self):
+        """Test that rendition changes rewrite the stored descriptor."""
+        from .models import VideoQuality
+        
+        self.video.refresh_from_db()
+        renditions = self.video.playback['renditions']
+        
+        self.assertEqual([r['quality'] for r in renditions], ['480p', '720p'])
+        self.assertEqual(renditions[1]['url'], '/media/videos/x/hls/720p')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.filter(quality='480p').get().delete()
+        self.video.refresh_from_db()
+        self.assertEqual([r['quality'] for r in self.video.playback['renditions']], ['720p'])
+    
+    def test_refreshes_are_coalesced_and_skipped(self):
+        """Test that one transaction refreshes a video once and no-op saves not at all."""
+        from .models import VideoQuality
+        
+        with patch('videos.playback.write_playback') as mock_write, \
+                patch('videos.stream_catalog.refresh_stream_entry') as mock_refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for quality in VideoQuality.objects.filter(video=self.video):
+                    quality.file_size = 2000
+                    quality.save()
+                self.video.title = 'Renamed'
+                self.video.save()
+            
+            mock_write.assert_called_once_with(self.video.id)
+            mock_refresh.assert_called_once_with(self.video.id)
+            
+            mock_write.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.video.save()
+                self.video.probe_info = {'format': 'mp4'}
+                self.video.save(update_fields=['probe_info'])
+                VideoQuality.objects.filter(video=self.video).first().save()
+            
+            mock_write.assert_not_called()
+    
+    def test_serializers_read_descriptor(self):
+        """Test that list and detail responses are built from the descriptor alone."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('videos:video-list'))
+        video = response.data['results'][0]
+        
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(video['video_file'], 'http://testserver/media/videos/x/hls/720p')
+        self.assertEqual(video['qualities'][0]['video_url'], 'http://testserver/media/videos/x/hls/480p')
+        self.assertEqual(video['thumbnail_url'], 'http://testserver/static/images/video-placeholder.png')
+        
+        detail = self.client.get(reverse('videos:video-detail', kwargs={'pk': self.video.pk}))
+        self.assertEqual(detail.data['qualities'], video['qualities'])
+    
+    def test_backfill_command(self):
+        """Test that rows without a descriptor are filled in."""
+        from io import StringIO
+        from django.core.management import call_command
+        
+        Video.objects.update(playback={})
+        call_command('backfill_playback', stdout=StringIO())
+        
+        self.video.refresh_from_db()
+        self.assertEqual(len(self.video.playback['renditions']), 2)
+
+
+class FastListSerializationTest(TestCase):
+    """Test cases for the ModelSerializer-free list path."""
+    
+    def setUp(self):
+        """Create videos covering every field variant."""
+        from datetime import timedelta
+        from .models import VideoQuality
+        
+        genre = Genre.objects.create(name='Parity')
+        plain = Video.objects.create(title='Plain', description='', genre=genre, is_processed=True)
+        full = Video.objects.create(
+            title='Full', description='Long text', genre=genre, is_processed=True,
+            duration=timedelta(minutes=90, seconds=5), thumbnail='thumbnails/ab/cd/1/poster ä.jpg',
+            video_file='videos/ab/cd/1/source.mp4'
+        )
+        for quality, ready in (('480p', True), ('720p', True), ('1080p', False)):
+            VideoQuality.objects.create(
+                video=full, quality=quality, file_path=f'videos/ab/cd/1/hls/{quality}',
+                file_size=123, is_ready=ready
+            )
+        stale = Video.objects.create(
+            title='Stale', genre=genre, is_processed=True, video_file='videos/ab/cd/2/source.mp4'
+        )
+        VideoQuality.objects.create(video=stale, quality='720p', file_path='', is_ready=True)
+        Video.objects.filter(id=stale.id).update(playback={})
+        self.ids = [plain.id, full.id, stale.id]
+    
+    def test_output_matches_model_serializers(self):
+        """Test that the fast path returns exactly the DRF serializer output."""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .api.serializers import (
+            VideoDetailSerializer, VideoListSerializer, complete_playback, serialize_video_row,
+            serialize_video_rows, url_builder, video_rows
+        )
+        
+        queryset = Video.objects.filter(id__in=self.ids).order_by('id')
+        request = Request(APIRequestFactory().get('/api/video/'))
+        for context_request in (request, None):
+            expected = VideoListSerializer(queryset, many=True, context={'request': context_request}).data
+            fast = serialize_video_rows(video_rows(queryset), context_request)
+            
+            self.assertEqual(json.loads(json.dumps(fast)), json.loads(json.dumps(expected)))
+            for video, row in zip(queryset, complete_playback(list(video_rows(queryset)))):
+                self.assertEqual(
+                    serialize_video_row(row, url_builder(context_request), detail=True),
+                    json.loads(json.dumps(VideoDetailSerializer(video, context={'request': context_request}).data))
+                )
+    
+    def test_stale_descriptors_load_in_one_batch(self):
+        """Test that rows without a descriptor cost one batched lookup in total."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .api.serializers import serialize_video_rows, video_rows
+        
+        Video.objects.update(playback={})
+        with CaptureQueriesContext(connection) as queries:
+            videos = serialize_video_rows(video_rows(Video.objects.filter(id__in=self.ids)))
+        
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(len(videos), 3)
+
+
+class VideoSuggestionTest(TestCase):
+    """Test cases for search-as-you-type title suggestions."""
+    
+    def setUp(self):
+        """Create videos and start from an unbuilt in-memory index."""
+        from .suggestions import memory_index
+        
+        memory_index.members = None
+        self.client = APIClient()
+        self.genre = Genre.objects.create(name='Sci-Fi')
+        for title in ['The Matrix', 'Matrix Reloaded', 'Mad Max', 'Amélie']:
+            Video.objects.create(title=title, genre=self.genre, is_processed=True)
+        Video.objects.create(title='Matrix draft', genre=self.genre, is_processed=False)
+    
+    def suggest(self, query, **params):
+        """Call the endpoint and return (titles, number of queries)."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('videos:video-suggestions'), {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['suggestions']], len(queries)
+    
+    def test_completes_title_and_word_prefixes(self):
+        """Test that title starts rank before later words and drafts are excluded."""
+        self.suggest('x')
+        titles, queries = self.suggest('MAT')
+        
+        self.assertEqual(titles, ['Matrix Reloaded', 'The Matrix'])
+        self.assertEqual(queries, 0)
+        self.assertEqual(self.suggest('ame')[0], ['Amélie'])
+        self.assertEqual(self.suggest('ma', limit=1)[0], ['Mad Max'])
+    
+    def test_publish_rename_and_delete_update_index(self):
+        """Test that video changes are reflected after commit."""
+        self.suggest('x')
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Video.objects.get(title='Matrix draft')
+            draft.is_processed = True
+            draft.save()
+            renamed = Video.objects.get(title='Mad Max')
+            renamed.title = 'Fury Road'
+            renamed.save()
+            Video.objects.get(title='The Matrix').delete()
+        
+        self.assertEqual(self.suggest('ma')[0], ['Matrix draft', 'Matrix Reloaded'])
+        self.assertEqual(self.suggest('fury road')[0], ['Fury Road'])
+
+    
+    def test_title_without_words_removes_entries(self):
+        """Test that a title normalizing to nothing drops the old entries."""
+        from .suggestions import RedisPrefixIndex, memory_index
+        
+        self.suggest('x')
+        video = Video.objects.get(title='Mad Max')
+        for title in ['   ', '\u0301\u0301']:
+            memory_index.update(video.id, 'Mad Max')
+            memory_index.update(video.id, title)
+            self.assertEqual(self.suggest('mad')[0], [])
+            self.assertNotIn(video.id, memory_index.members)
+        
+        client = MagicMock()
+        client.hget.return_value = json.dumps(['mad max'])
+        RedisPrefixIndex(client, 'suggestions').update(video.id, '   ')
+        pipe = client.pipeline.return_value
+        pipe.zadd.assert_not_called()
+        pipe.zrem.assert_called_once_with('suggestions', 'mad max')
+        pipe.hdel.assert_called_once_with('suggestions:members', video.id)
+
+class DashboardQueryTest(TestCase):
+    """Test cases for the constant-query dashboard."""
+    
+    def setUp(self):
+        """Set up a client and a user with watch progress."""
+        from datetime import timedelta
+        from .models import VideoQuality
+        
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='viewer@example.com', password='testpass123')
+        self.add_genres(2)
+        watched = Video.objects.filter(is_processed=True).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            VideoQuality.objects.create(video=watched, quality='720p', file_path='videos/x/hls/720p', is_ready=True)
+        WatchProgress.objects.create(user=self.user, video=watched, current_time=timedelta(seconds=30))
+    
+    def add_genres(self, count):
+        """Add genres with a dozen processed videos each."""
+        from .models import VideoQuality
+        
+        for number in range(Genre.objects.count(), Genre.objects.count() + count):
+            genre = Genre.objects.create(name=f'Genre {number}')
+            with self.captureOnCommitCallbacks(execute=True):
+                for index in range(12):
+                    video = Video.objects.create(
+                        title=f'{genre.name} video {index}', genre=genre, is_processed=True
+                    )
+                    VideoQuality.objects.create(
+                        video=video, quality='480p', file_path=f'videos/{video.id}/hls/480p', is_ready=True
+                    )
+            Video.objects.create(title=f'{genre.name} draft', genre=genre, is_processed=False)
+    
+    def dashboard_queries(self, warm=False):
+        """Load the dashboard and return (response, number of queries)."""
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('videos:dashboard'))
+        return response, len(queries)
+    
+    def test_query_count_does_not_grow_with_genres(self):
+        """Test that more genres and videos do not add queries."""
+        self.client.force_authenticate(user=self.user)
+        response, few = self.dashboard_queries()
+        self.add_genres(6)
+        response, many = self.dashboard_queries()
+        
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 4)
+        self.assertEqual(len(response.data['genres']), 8)
+        self.assertEqual(len(response.data['continue_watching']), 1)
+    
+    def test_rails_hold_newest_processed_videos(self):
+        """Test that each rail lists the ten newest processed videos of its genre."""
+        response, queries = self.dashboard_queries()
+        
+        self.assertEqual(queries, 1)
+        rail = response.data['genres'][0]
+        self.assertEqual(rail['genre']['name'], 'Genre 0')
+        self.assertEqual(
+            [video['title'] for video in rail['videos']],
+            [f'Genre 0 video {index}' for index in range(11, 1, -1)]
+        )
+        self.assertEqual(response.data['hero_video']['title'], 'Genre 1 video 11')
+        self.assertEqual(rail['videos'][0]['qualities'][0]['quality'], '480p')
+    
+    def test_warm_dashboard_runs_no_queries(self):
+        """Test that a cached dashboard is served without queries."""
+        self.client.force_authenticate(user=self.user)
+        cold, _ = self.dashboard_queries()
+        warm, queries = self.dashboard_queries(warm=True)
+        
+        self.assertEqual(queries, 0)
+        self.assertEqual(warm.json(), cold.json())
+    
+    def test_video_edit_invalidates_shared_part(self):
+        """Test that editing a video rebuilds the cached rails and hero video."""
+        self.dashboard_queries()
+        hero = Video.objects.get(title='Genre 1 video 11')
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.title = 'Renamed'
+            hero.save()
+        
+        response, queries = self.dashboard_queries(warm=True)
+        
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.data['hero_video']['title'], 'Renamed')
+    
+    def test_progress_update_refreshes_continue_watching(self):
+        """Test that watch progress changes only rebuild the user's block."""
+        from datetime import timedelta
+        
+        self.client.force_authenticate(user=self.user)
+        self.dashboard_queries()
+        other = Video.objects.get(title='Genre 0 video 5')
+        with self.captureOnCommitCallbacks(execute=True):
+            WatchProgress.objects.create(user=self.user, video=other, current_time=timedelta(seconds=10))
+        
+        response, queries = self.dashboard_queries(warm=True)
+        
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(response.data['continue_watching'][0]['video']['title'], 'Genre 0 video 5')
+        self.assertEqual(len(response.data['continue_watching']), 2)
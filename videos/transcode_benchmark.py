@@ -0,0 +1,234 @@
+"""
+Transcoding benchmark used by the ``benchmark_transcode`` command.
+
+Synthetic sources are generated with FFmpeg's ``lavfi`` inputs at several
+lengths, resolutions and complexities (``testsrc2`` is easy, ``mandelbrot``
+is detailed, ``noise`` is close to incompressible) and cached between runs.
+Each source is encoded with the real pipeline (``convert_to_hls_segments``,
+optionally with per-title overrides) and measured: wall time relative to
+real time, CPU seconds of the encoder per output minute, output size and
+bitrate, and optionally PSNR/SSIM against the source.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import platform
+import resource
+import subprocess
+from django.conf import settings
+from .encoding import get_profile
+from .utils import (
+    analyze_video_complexity, convert_to_hls_segments, derive_encoding_ladder,
+    get_directory_size
+)
+
+PATTERNS = {
+    'testsrc2': 'testsrc2=size={size}:rate=30',
+    'mandelbrot': 'mandelbrot=size={size}:rate=30',
+    'noise': 'color=c=gray:size={size}:rate=30,noise=alls=60:allf=t+u',
+}
+
+MODES = ('ladder', 'per-title')
+
+PSNR_AVERAGE = re.compile(r'PSNR .*?average:([\d.]+|inf)')
+SSIM_ALL = re.compile(r'SSIM .*?All:([\d.]+)')
+
+
+def source_name(pattern: str, size: str, seconds: int) -> str:
+    """Get the file name of a synthetic source."""
+    return f'{pattern}_{size}_{seconds}s.mp4'
+
+
+def generate_source(work_dir: str, pattern: str, size: str, seconds: int) -> str:
+    """
+    Generate a synthetic source (cached in ``work_dir``).
+
+    Args:
+        work_dir: Directory for sources
+        pattern: Key of PATTERNS
+        size: Frame size, e.g. '1920x1080'
+        seconds: Length in seconds
+
+    Returns:
+        Path of the source file
+
+    Raises:
+        RuntimeError: If FFmpeg fails
+    """
+    path = os.path.join(work_dir, source_name(pattern, size, seconds))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(work_dir, exist_ok=True)
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', PATTERNS[pattern].format(size=size),
+        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+        '-t', str(seconds),
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '12', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '192k',
+        path + '.part.mp4'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not generate {pattern} {size}: {result.stderr[-500:]}")
+    os.replace(path + '.part.mp4', path)
+    return path
+
+
+def child_cpu_seconds() -> float:
+    """Get the CPU time used by finished child processes so far."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def parse_quality_metrics(stderr: str) -> dict:
+    """
+    Read PSNR and SSIM from the output of FFmpeg's psnr/ssim filters.
+
+    Returns:
+        Dictionary with 'psnr' and 'ssim' (None if missing)
+    """
+    psnr = PSNR_AVERAGE.search(stderr)
+    ssim = SSIM_ALL.search(stderr)
+    return {
+        'psnr': (float(psnr.group(1)) if psnr.group(1) != 'inf' else 100.0) if psnr else None,
+        'ssim': float(ssim.group(1)) if ssim else None,
+    }
+
+
+def measure_quality(output_dir: str, source_path: str, profile: dict) -> dict:
+    """
+    Compare a rendition with its source (scaled to the rendition size).
+
+    Returns:
+        Dictionary with 'psnr' and 'ssim'
+    """
+    size = f"{profile['width']}:{profile['height']}"
+    cmd = [
+        'ffmpeg', '-i', os.path.join(output_dir, 'index.m3u8'), '-i', source_path,
+        '-lavfi',
+        f'[0:v]scale={size},split[out0][out1];[1:v]scale={size},split[ref0][ref1];'
+        f'[out0][ref0]psnr;[out1][ref1]ssim',
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
+    return parse_quality_metrics(result.stderr)
+
+
+def encode_rendition(source_path: str, seconds: float, quality: str, overrides: dict,
+                     work_dir: str, quality_metrics: bool = False) -> dict:
+    """
+    Encode one rendition with the pipeline and measure it.
+
+    Args:
+        source_path: Path of the source
+        seconds: Source length in seconds
+        quality: Quality name from the encoding ladder
+        overrides: Profile overrides (per-title values, preset, CRF)
+        work_dir: Scratch directory for the output
+        quality_metrics: Also compute PSNR/SSIM
+
+    Returns:
+        Result dictionary
+    """
+    output_dir = os.path.join(work_dir, 'output')
+    shutil.rmtree(output_dir, ignore_errors=True)
+    profile = {**get_profile(quality), **overrides}
+
+    cpu_before = child_cpu_seconds()
+    started = time.monotonic()
+    ok = convert_to_hls_segments(source_path, output_dir, quality, overrides)
+    wall = time.monotonic() - started
+    cpu = child_cpu_seconds() - cpu_before
+
+    result = {
+        'quality': quality,
+        'ok': ok,
+        'preset': profile['preset'],
+        'crf': str(profile['crf']),
+        'bitrate_cap': profile['bitrate'],
+        'wall_seconds': round(wall, 3),
+        'speed_x_realtime': round(seconds / wall, 3) if wall else None,
+        'cpu_seconds_per_output_minute': round(cpu / (seconds / 60), 2) if seconds else None,
+    }
+    if ok:
+        size = get_directory_size(output_dir)
+        result['output_bytes'] = size
+        result['output_kbps'] = round(size * 8 / 1000 / seconds, 1) if seconds else None
+        if quality_metrics:
+            result.update(measure_quality(output_dir, source_path, profile))
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    return result
+
+
+def mode_overrides(mode: str, source_path: str, seconds: float) -> dict:
+    """
+    Get the per-quality overrides the pipeline would use in a mode.
+
+    Returns:
+        Dictionary mapping quality to overrides
+    """
+    if mode == 'per-title':
+        return derive_encoding_ladder(analyze_video_complexity(source_path, seconds))
+    return {}
+
+
+def environment() -> dict:
+    """Describe the machine and code version a report was made with."""
+    def output(cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return ''
+
+    ffmpeg_version = output(['ffmpeg', '-version']).split('\n', 1)[0]
+    return {
+        'commit': output(['git', '-C', str(settings.BASE_DIR), 'rev-parse', '--short', 'HEAD']),
+        'ffmpeg': ffmpeg_version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def result_key(result: dict) -> tuple:
+    """Identify a result across reports."""
+    return (result['source'], result['mode'], result['quality'], result['preset'], result['crf_setting'])
+
+
+def compare_reports(baseline: dict, current: dict) -> list:
+    """
+    Compare the results of two reports.
+
+    Args:
+        baseline: Earlier report
+        current: New report
+
+    Returns:
+        List of (key, metric, old, new, change ratio) for matching results
+    """
+    old_results = {result_key(result): result for result in baseline['results'] if result.get('ok')}
+    rows = []
+    for result in current['results']:
+        old = old_results.get(result_key(result))
+        if not old or not result.get('ok'):
+            continue
+        for metric in ('speed_x_realtime', 'cpu_seconds_per_output_minute', 'output_bytes', 'psnr', 'ssim'):
+            if old.get(metric) and result.get(metric) is not None:
+                rows.append((
+                    result_key(result), metric, old[metric], result[metric],
+                    round(result[metric] / old[metric] - 1, 4)
+                ))
+    return rows
+
+
+def load_report(path: str) -> dict:
+    """Read a report written by ``benchmark_transcode``."""
+    with open(path) as f:
+        return json.load(f)
@@ -1,17 +1,23 @@
 from django.urls import path
+from . import views as stream_views
 from .api import views
 
 app_name = 'videos'
 
 urlpatterns = [
     path('video/', views.VideoListView.as_view(), name='video-list'),
-    path('video/<int:movie_id>/<str:resolution>/index.m3u8', views.hls_manifest, name='hls-manifest'),
-    path('videos/<int:movie_id>/<str:resolution>/index.m3u8', views.hls_manifest, name='hls-manifest-plural'),
-    path('video/<int:movie_id>/<str:resolution>/<str:segment>', views.hls_segment, name='hls-segment'),
-    path('videos/<int:movie_id>/<str:resolution>/<str:segment>', views.hls_segment, name='hls-segment-plural'),
+    path('video/suggest/', views.video_suggestions, name='video-suggestions'),
+    path('video/<int:movie_id>/<str:resolution>/index.m3u8', stream_views.hls_manifest, name='hls-manifest'),
+    path('videos/<int:movie_id>/<str:resolution>/index.m3u8', stream_views.hls_manifest, name='hls-manifest-plural'),
+    path('video/<int:movie_id>/source/', stream_views.video_source, name='video-source'),
+    path('video/<int:movie_id>/<str:resolution>/<str:segment>', stream_views.hls_segment, name='hls-segment'),
+    path('videos/<int:movie_id>/<str:resolution>/<str:segment>', stream_views.hls_segment, name='hls-segment-plural'),
     
     path('video/<int:pk>/', views.VideoDetailView.as_view(), name='video-detail'),
     path('video/upload/', views.VideoUploadView.as_view(), name='video-upload'),
+    path('video/uploads/', views.UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('video/uploads/<uuid:upload_id>/', views.upload_session_detail, name='upload-session-detail'),
+    path('video/uploads/<uuid:upload_id>/complete/', views.complete_upload_session, name='upload-session-complete'),
     path('video/<int:video_id>/delete/', views.delete_video, name='video-delete'),
     
     path('genres/', views.GenreListView.as_view(), name='genre-list'),
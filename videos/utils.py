@@ -2,8 +2,11 @@ import os
 import subprocess
 import logging
 from django.conf import settings
-from django.core.files.base import ContentFile
-from .models import Video, VideoQuality
+from django.core.files import File
+from .models import Video, VideoQuality, rendition_path
+from .segment_index import write_segment_index
+from .storage import local_copy, rendition_workspace
+from .encoding import MAX_CRF, build_hls_args, build_video_args, get_encoding_ladder, get_profile, kbps
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +78,23 @@ def get_video_duration(video_path: str) -> float:
         return 0.0
 
 
+def get_source_duration(video, video_path: str) -> float:
+    """
+    Get the source duration, reusing the upload pre-flight probe if present.
+    
+    Args:
+        video: Video instance
+        video_path: Path to source video
+        
+    Returns:
+        Duration in seconds
+    """
+    probed = (video.probe_info or {}).get('duration') or 0.0
+    if probed > 0:
+        return float(probed)
+    return get_video_duration(video_path)
+
+
 def extract_thumbnail(video_path: str, thumbnail_path: str, time_offset: str = "00:00:01") -> bool:
     """
     Extract thumbnail from video at specified time using FFmpeg.
@@ -116,43 +136,34 @@ def extract_thumbnail(video_path: str, thumbnail_path: str, time_offset: str = "
         return False
 
 
-def convert_video_quality(input_path: str, output_path: str, quality: str) -> bool:
+def convert_video_quality(input_path: str, output_path: str, quality: str,
+                          overrides: dict = None) -> bool:
     """
     Convert video to specified quality using FFmpeg.
     
     Args:
         input_path: Source video path
         output_path: Output video path
-        quality: Target quality (480p, 720p, 1080p)
+        quality: Target quality name from the encoding ladder
+        overrides: Optional per-title values ('crf', 'bitrate') replacing the defaults
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        quality_settings = {
-            '480p': {'width': 640, 'height': 360, 'bitrate': '400k', 'crf': '32'},
-            '720p': {'width': 1280, 'height': 720, 'bitrate': '2000k', 'crf': '23'},
-            '1080p': {'width': 1920, 'height': 1080, 'bitrate': '6000k', 'crf': '18'},
-        }
+        profile = get_profile(quality)
         
-        if quality not in quality_settings:
+        if profile is None:
             logger.error(f"Unsupported quality: {quality}")
             return False
         
-        settings_dict = quality_settings[quality]
+        profile = {**profile, **(overrides or {})}
         
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         cmd = [
             'ffmpeg', '-i', input_path,
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', settings_dict['crf'],
-            '-vf', f"scale={settings_dict['width']}:{settings_dict['height']}",
-            '-maxrate', settings_dict['bitrate'],
-            '-bufsize', f"{int(settings_dict['bitrate'][:-1]) * 2}k",
-            '-c:a', 'aac',
-            '-b:a', '128k',
+            *build_video_args(profile),
             '-movflags', '+faststart',
             '-y', output_path
         ]
@@ -175,55 +186,43 @@ def convert_video_quality(input_path: str, output_path: str, quality: str) -> bo
         return False
 
 
-def convert_to_hls_segments(input_path: str, output_dir: str, quality: str) -> bool:
+def convert_to_hls_segments(input_path: str, output_dir: str, quality: str,
+                            overrides: dict = None) -> bool:
     """
     Convert video to HLS format with proper segmentation for each quality.
     
     Args:
         input_path: Source video path
         output_dir: Output directory for HLS files
-        quality: Target quality (480p, 720p, 1080p)
+        quality: Target quality name from the encoding ladder
+        overrides: Optional per-title values ('crf', 'bitrate') replacing the defaults
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        quality_settings = {
-            '480p': {'width': 640, 'height': 360, 'bitrate': '400k', 'crf': '32'},
-            '720p': {'width': 1280, 'height': 720, 'bitrate': '2000k', 'crf': '23'},
-            '1080p': {'width': 1920, 'height': 1080, 'bitrate': '6000k', 'crf': '18'},
-        }
+        profile = get_profile(quality)
         
-        if quality not in quality_settings:
+        if profile is None:
             return False
         
-        settings_dict = quality_settings[quality]
+        profile = {**profile, **(overrides or {})}
         
         os.makedirs(output_dir, exist_ok=True)
         
         playlist_path = os.path.join(output_dir, 'index.m3u8')
-        segment_pattern = os.path.join(output_dir, 'segment_%03d.ts')
         
         cmd = [
             'ffmpeg', '-i', input_path,
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', settings_dict['crf'],
-            '-vf', f"scale={settings_dict['width']}:{settings_dict['height']}",
-            '-maxrate', settings_dict['bitrate'],
-            '-bufsize', f"{int(settings_dict['bitrate'][:-1]) * 2}k",
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-hls_time', '10',
-            '-hls_list_size', '0',
-            '-hls_segment_filename', segment_pattern,
-            '-y', playlist_path
+            *build_video_args(profile),
+            *build_hls_args(profile, output_dir)
         ]
         
-        logger.info(f"Converting to HLS segments for {quality}: {output_dir}")
+        logger.info(f"Converting to HLS segments for {quality} ({profile['codec']}): {output_dir}")
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800)
         
         if result.returncode == 0 and os.path.exists(playlist_path):
+            write_segment_index(output_dir)
             logger.info(f"HLS segmentation successful: {quality}")
             return True
         else:
@@ -235,6 +234,136 @@ def convert_to_hls_segments(input_path: str, output_dir: str, quality: str) -> b
         return False
 
 
+def analyze_video_complexity(video_path: str, duration: float = 0.0) -> float:
+    """
+    Estimate how hard a video is to encode with a fast low-resolution probe encode.
+    
+    A few short windows of the source are encoded at a fixed CRF and the
+    resulting bitrate is compared to a reference bitrate for "typical" content.
+    
+    Args:
+        video_path: Path to source video
+        duration: Source duration in seconds (probed if not given)
+        
+    Returns:
+        Complexity factor (1.0 = typical content), or 0.0 if analysis failed
+    """
+    config = settings.PER_TITLE_ENCODING
+    sample_seconds = config['SAMPLE_SECONDS']
+    
+    if duration <= 0:
+        duration = get_video_duration(video_path)
+    
+    if duration <= sample_seconds * len(config['SAMPLE_POINTS']):
+        offsets = [0.0]
+        sample_seconds = duration or sample_seconds
+    else:
+        offsets = [duration * point for point in config['SAMPLE_POINTS']]
+    
+    total_kbits = 0.0
+    total_seconds = 0.0
+    
+    for offset in offsets:
+        cmd = [
+            'ffmpeg', '-ss', f'{offset:.2f}', '-t', str(sample_seconds),
+            '-i', video_path,
+            '-vf', f"scale=-2:{config['PROBE_HEIGHT']}",
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-crf', '23',
+            '-an',
+            '-f', 'null', '-'
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Complexity probe timed out at {offset:.2f}s: {video_path}")
+            continue
+        except Exception as e:
+            logger.error(f"Error running complexity probe: {e}")
+            return 0.0
+        
+        if result.returncode != 0:
+            logger.warning(f"Complexity probe failed at {offset:.2f}s: {result.stderr[-500:]}")
+            continue
+        
+        import re
+        match = re.search(r'video:\s*([\d.]+)\s*(?:k|Ki)B', result.stderr)
+        if match:
+            total_kbits += float(match.group(1)) * 8
+            total_seconds += sample_seconds
+    
+    if total_seconds <= 0:
+        return 0.0
+    
+    probe_kbps = total_kbits / total_seconds
+    factor = probe_kbps / config['REFERENCE_KBPS']
+    factor = max(config['MIN_FACTOR'], min(config['MAX_FACTOR'], factor))
+    
+    logger.info(f"Complexity probe for {video_path}: {probe_kbps:.0f} kbps -> factor {factor:.2f}")
+    return round(factor, 3)
+
+
+def derive_encoding_ladder(complexity: float) -> dict:
+    """
+    Derive per-title CRF and maxrate values from a complexity factor.
+    
+    Simple content (factor < 1) gets a higher CRF and a lower bitrate cap,
+    complex content (factor > 1) gets a lower CRF and a higher cap.
+    
+    Args:
+        complexity: Complexity factor as returned by analyze_video_complexity
+        
+    Returns:
+        Dictionary mapping quality to {'crf', 'bitrate'} overrides
+    """
+    if complexity <= 0:
+        return {}
+    
+    import math
+    crf_delta = max(-3, min(4, round(-math.log2(complexity) * 3)))
+    
+    ladder = {}
+    for quality, profile in get_encoding_ladder().items():
+        base_kbps = kbps(profile['bitrate'])
+        ladder[quality] = {
+            'crf': str(max(0, min(MAX_CRF[profile['codec']], int(profile['crf']) + crf_delta))),
+            'bitrate': f"{int(round(base_kbps * complexity / 50.0)) * 50 or 50}k",
+        }
+    return ladder
+
+
+def ensure_encoding_ladder(video, video_path: str) -> dict:
+    """
+    Run per-title analysis for a video once and store the derived ladder on it.
+    
+    Args:
+        video: Video instance
+        video_path: Path to source video
+        
+    Returns:
+        Per-quality overrides (empty if analysis is disabled or failed)
+    """
+    if video.encoding_ladder or not settings.PER_TITLE_ENCODING['ENABLED']:
+        return video.encoding_ladder or {}
+    
+    if video.duration:
+        duration = video.duration.total_seconds()
+    else:
+        duration = (video.probe_info or {}).get('duration') or 0.0
+    complexity = analyze_video_complexity(video_path, duration)
+    ladder = derive_encoding_ladder(complexity)
+    
+    if ladder:
+        video.complexity_score = complexity
+        video.encoding_ladder = ladder
+        Video.objects.filter(id=video.id).update(
+            complexity_score=complexity,
+            encoding_ladder=ladder
+        )
+    return ladder
+
+
 def get_directory_size(directory: str) -> int:
     """
     Get total size of all files in a directory.
@@ -266,37 +395,25 @@ def convert_to_hls(input_path: str, output_dir: str, quality: str) -> bool:
     Args:
         input_path: Source video path
         output_dir: Output directory for HLS files
-        quality: Target quality (480p, 720p, 1080p)
+        quality: Target quality name from the encoding ladder
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        quality_settings = {
-            '480p': {'width': 640, 'height': 360, 'bitrate': '400k', 'crf': '32'},
-            '720p': {'width': 1280, 'height': 720, 'bitrate': '2000k', 'crf': '23'},
-            '1080p': {'width': 1920, 'height': 1080, 'bitrate': '6000k', 'crf': '18'},
-        }
+        profile = get_profile(quality)
         
-        if quality not in quality_settings:
+        if profile is None:
             return False
         
-        settings_dict = quality_settings[quality]
-        
         os.makedirs(output_dir, exist_ok=True)
         
         playlist_path = os.path.join(output_dir, f"{quality}.m3u8")
         
         cmd = [
             'ffmpeg', '-i', input_path,
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', '23',
-            '-vf', f"scale={settings_dict['width']}:{settings_dict['height']}",
-            '-b:v', settings_dict['bitrate'],
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-hls_time', '10',
+            *build_video_args(profile),
+            '-hls_time', str(profile['segment_duration']),
             '-hls_list_size', '0',
             '-hls_flags', 'single_file',
             '-y', playlist_path
@@ -363,6 +480,328 @@ def is_video_file(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in video_extensions)
 
 
+class VideoPreflightError(Exception):
+    """Raised when an upload is not a decodable video."""
+
+
+def sniff_video_container(header: bytes) -> str:
+    """
+    Identify a video container from the first bytes of a file.
+    
+    Args:
+        header: At least the first 12 bytes of the file (189 for MPEG-TS)
+        
+    Returns:
+        Container name, or an empty string if no known signature matches
+    """
+    if len(header) >= 8 and header[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip'):
+        return 'mp4'
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'matroska'
+    if header.startswith(b'RIFF') and header[8:12] == b'AVI ':
+        return 'avi'
+    if header.startswith(b'FLV'):
+        return 'flv'
+    if header.startswith(b'\x30\x26\xb2\x75\x8e\x66\xcf\x11'):
+        return 'asf'
+    if header.startswith(b'\x00\x00\x01\xba'):
+        return 'mpeg'
+    if len(header) > 188 and header[0] == 0x47 and header[188] == 0x47:
+        return 'mpegts'
+    return ''
+
+
+def probe_video_header(video_path: str) -> dict:
+    """
+    Run a bounded, time-limited ffprobe on the start of a file.
+    
+    Args:
+        video_path: Path to the file
+        
+    Returns:
+        Summary with format, duration, video/audio codecs and resolution
+        
+    Raises:
+        VideoPreflightError: If ffprobe cannot find a decodable video stream
+    """
+    config = settings.UPLOAD_PREFLIGHT
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-probesize', str(config['PROBE_SIZE']),
+        '-analyzeduration', str(config['ANALYZE_DURATION']),
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        video_path
+    ]
+    
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=config['TIMEOUT'])
+    except subprocess.TimeoutExpired:
+        raise VideoPreflightError("Video file could not be analyzed in time.")
+    
+    if result.returncode != 0:
+        logger.info(f"Pre-flight probe rejected upload: {result.stderr.decode(errors='replace')[:500]}")
+        raise VideoPreflightError("Video file is corrupt or not a supported video.")
+    
+    import json
+    info = json.loads(result.stdout or b'{}')
+    streams = info.get('streams', [])
+    video_stream = next((st for st in streams if st.get('codec_type') == 'video'), None)
+    audio_stream = next((st for st in streams if st.get('codec_type') == 'audio'), None)
+    
+    if video_stream is None:
+        raise VideoPreflightError("File does not contain a video stream.")
+    
+    fmt = info.get('format', {})
+    try:
+        duration = float(fmt.get('duration') or video_stream.get('duration') or 0)
+    except ValueError:
+        duration = 0.0
+    
+    return {
+        'format': fmt.get('format_name', ''),
+        'duration': duration,
+        'bit_rate': int(fmt.get('bit_rate') or 0),
+        'video_codec': video_stream.get('codec_name', ''),
+        'width': video_stream.get('width', 0),
+        'height': video_stream.get('height', 0),
+        'audio_codec': audio_stream.get('codec_name', '') if audio_stream else '',
+    }
+
+
+def preflight_video(video_path: str) -> dict:
+    """
+    Reject undecodable uploads before they reach the encoding queue.
+    
+    Magic bytes are always checked. The ffprobe step is skipped (with a
+    warning) when ffprobe is not installed.
+    
+    Args:
+        video_path: Path to the uploaded file
+        
+    Returns:
+        Probe summary to store with the video (may be partial)
+        
+    Raises:
+        VideoPreflightError: If the file is not a decodable video
+    """
+    with open(video_path, 'rb') as f:
+        container = sniff_video_container(f.read(512))
+    if not container:
+        raise VideoPreflightError("File content is not a recognized video container.")
+    
+    if not settings.UPLOAD_PREFLIGHT['ENABLED']:
+        return {'container': container}
+    
+    try:
+        probe = probe_video_header(video_path)
+    except FileNotFoundError:
+        logger.warning("ffprobe not available, skipping pre-flight probe")
+        return {'container': container}
+    
+    return {'container': container, **probe}
+
+
+def preflight_uploaded_file(uploaded_file) -> dict:
+    """
+    Run the pre-flight check on an uploaded file.
+    
+    Files held in memory are written to a temporary file first so ffprobe
+    can seek in them.
+    
+    Args:
+        uploaded_file: Uploaded file object
+        
+    Returns:
+        Probe summary (see preflight_video)
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return preflight_video(uploaded_file.temporary_file_path())
+    
+    import tempfile
+    suffix = os.path.splitext(uploaded_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        for chunk in uploaded_file.chunks():
+            tmp.write(chunk)
+        tmp.flush()
+        uploaded_file.seek(0)
+        return preflight_video(tmp.name)
+
+
+def compute_content_hash(file_obj) -> str:
+    """
+    Compute the SHA-256 digest of an uploaded file.
+    
+    Uploads received through the hashing upload handlers already carry the
+    digest, so the file is only read again as a fallback.
+    
+    Args:
+        file_obj: Uploaded file object
+        
+    Returns:
+        Hex digest of the file content
+    """
+    content_hash = getattr(file_obj, 'content_hash', None)
+    if content_hash:
+        return content_hash
+    
+    import hashlib
+    hasher = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        hasher.update(chunk)
+    file_obj.seek(0)
+    return hasher.hexdigest()
+
+
+def find_processed_duplicate(content_hash: str):
+    """
+    Find an already processed video with the same source content.
+    
+    Args:
+        content_hash: SHA-256 digest of the uploaded file
+        
+    Returns:
+        Matching Video instance or None
+    """
+    if not content_hash:
+        return None
+    
+    return Video.objects.filter(
+        content_hash=content_hash,
+        is_processed=True,
+        qualities__is_ready=True
+    ).order_by('created_at').first()
+
+
+def duplicate_video_fields(source) -> dict:
+    """
+    Get the field values a new video copies from a processed duplicate.
+    
+    Args:
+        source: Processed Video with identical content
+        
+    Returns:
+        Dictionary of Video field values
+    """
+    return {
+        'video_file': source.video_file.name,
+        'thumbnail': source.thumbnail.name if source.thumbnail else None,
+        'duration': source.duration,
+        'complexity_score': source.complexity_score,
+        'encoding_ladder': source.encoding_ladder,
+        'is_processed': True,
+    }
+
+
+def reuse_renditions(video, source) -> int:
+    """
+    Point a new video at the renditions of an existing one instead of encoding.
+    
+    Args:
+        video: Newly created Video instance
+        source: Processed Video with identical content
+        
+    Returns:
+        Number of renditions reused
+    """
+    qualities = [
+        VideoQuality(
+            video=video,
+            quality=quality.quality,
+            file_path=quality.file_path,
+            file_size=quality.file_size,
+            is_ready=quality.is_ready
+        )
+        for quality in source.qualities.filter(is_ready=True)
+    ]
+    VideoQuality.objects.bulk_create(qualities)
+    
+    from .dashboard import invalidate_dashboard
+    from .playback import write_playback
+    from .stream_catalog import refresh_stream_entry
+    video.playback = write_playback(video.id)
+    refresh_stream_entry(video.id)
+    invalidate_dashboard()
+    
+    logger.info(f"Video {video.id} reuses {len(qualities)} renditions of video {source.id}")
+    return len(qualities)
+
+
+def is_shared_media_file(field_name: str, name: str) -> bool:
+    """
+    Check if a stored file is still referenced by any video.
+    
+    Args:
+        field_name: Video file field name ('video_file' or 'thumbnail')
+        name: Storage name of the file
+        
+    Returns:
+        True if another video still uses the file
+    """
+    return bool(name) and Video.objects.filter(**{field_name: name}).exists()
+
+
+def generate_thumbnail(video, video_path: str, time_offset: str = "00:00:01", save: bool = True) -> bool:
+    """
+    Extract a thumbnail from the source and store it with the video.
+    
+    Args:
+        video: Video instance
+        video_path: Local path to source video
+        time_offset: Time position to extract thumbnail
+        save: Whether to save the video instance afterwards
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    import tempfile
+    
+    thumbnail_filename = f"thumb_{video.id}.jpg"
+    with tempfile.TemporaryDirectory(dir=settings.MEDIA_WORK_DIR) as work_dir:
+        thumbnail_path = os.path.join(work_dir, thumbnail_filename)
+        
+        if not extract_thumbnail(video_path, thumbnail_path, time_offset=time_offset):
+            return False
+        
+        with open(thumbnail_path, 'rb') as thumb_file:
+            video.thumbnail.save(thumbnail_filename, File(thumb_file), save=save)
+    return True
+
+
+def create_hls_rendition(video, video_path: str, quality: str, overrides: dict = None):
+    """
+    Encode one HLS rendition and publish it to media storage.
+    
+    Args:
+        video: Video instance
+        video_path: Local path to source video
+        quality: Quality name from the encoding ladder
+        overrides: Optional per-title values for the quality
+        
+    Returns:
+        The created VideoQuality, or None if encoding failed
+    """
+    prefix = rendition_path(video.id, quality)
+    
+    try:
+        with rendition_workspace(prefix) as output_dir:
+            if not convert_to_hls_segments(video_path, output_dir, quality, overrides):
+                raise RuntimeError(f"FFmpeg could not create {quality}")
+            file_size = get_directory_size(output_dir)
+    except Exception as e:
+        logger.error(f"Failed to create HLS {quality} for video {video.id}: {e}")
+        return None
+    
+    logger.info(f"Created HLS {quality} quality for video {video.id}")
+    return VideoQuality.objects.create(
+        video=video,
+        quality=quality,
+        file_path=prefix,
+        file_size=file_size,
+        is_ready=True
+    )
+
+
 def process_video_task(video_id):
     """
     Background task to process video files.
@@ -378,59 +817,36 @@ def process_video_task(video_id):
             logger.error(f"No video file found for video ID {video_id}")
             return
         
-        video_path = video.video_file.path
-        
-        if not os.path.exists(video_path):
-            logger.error(f"Video file does not exist: {video_path}")
+        if not video.video_file.storage.exists(video.video_file.name):
+            logger.error(f"Video file does not exist: {video.video_file.name}")
             return
         
         logger.info(f"Starting video processing for video ID {video_id}")
         
-        duration = get_video_duration(video_path)
-        if duration > 0:
-            from datetime import timedelta
-            try:
-                video.duration = timedelta(seconds=duration)
-                video.save()
-            except Exception as e:
-                logger.warning(f"Could not save duration as timedelta, trying float: {e}")
+        with local_copy(video.video_file.name) as video_path:
+            duration = get_source_duration(video, video_path)
+            if duration > 0:
+                from datetime import timedelta
                 try:
-                    video.duration = duration
+                    video.duration = timedelta(seconds=duration)
                     video.save()
-                except Exception as e2:
-                    logger.error(f"Could not save duration in any format: {e2}")
-        
-        if not video.thumbnail:
-            thumbnail_filename = f"thumb_{video.id}.jpg"
-            thumbnail_path = os.path.join(settings.MEDIA_ROOT, 'thumbnails', thumbnail_filename)
+                except Exception as e:
+                    logger.warning(f"Could not save duration as timedelta, trying float: {e}")
+                    try:
+                        video.duration = duration
+                        video.save()
+                    except Exception as e2:
+                        logger.error(f"Could not save duration in any format: {e2}")
+            
+            if not video.thumbnail:
+                generate_thumbnail(video, video_path, save=False)
+            
+            qualities = list(get_encoding_ladder())
+            ladder = ensure_encoding_ladder(video, video_path)
             
-            if extract_thumbnail(video_path, thumbnail_path):
-                with open(thumbnail_path, 'rb') as thumb_file:
-                    video.thumbnail.save(
-                        thumbnail_filename,
-                        ContentFile(thumb_file.read()),
-                        save=False
-                    )
-        
-        qualities = ['480p', '720p', '1080p']
-        
-        for quality in qualities:
-            if not video.qualities.filter(quality=quality).exists():
-                hls_output_dir = os.path.join(settings.MEDIA_ROOT, 'videos', str(video.id), 'hls', quality)
-                
-                if convert_to_hls_segments(video_path, hls_output_dir, quality):
-                    m3u8_path = os.path.join(hls_output_dir, 'index.m3u8')
-                    
-                    VideoQuality.objects.create(
-                        video=video,
-                        quality=quality,
-                        file_size=get_directory_size(hls_output_dir),
-                        file_path=hls_output_dir,
-                        is_ready=True
-                    )
-                    logger.info(f"Created HLS {quality} quality for video {video_id}")
-                else:
-                    logger.error(f"Failed to convert HLS {quality} for video {video_id}")
+            for quality in qualities:
+                if not video.qualities.filter(quality=quality).exists():
+                    create_hls_rendition(video, video_path, quality, ladder.get(quality))
         
         video.is_processed = True
         video.save()
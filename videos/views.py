@@ -0,0 +1,174 @@
+"""
+Streaming endpoints (HLS manifests, segments and the progressive source).
+
+These are plain Django views rather than DRF views: they are public, so
+they skip content negotiation and the authentication classes, and segment
+requests are authorized by the URL signature alone (see ``signing``)
+without database or session access.
+
+The views are asynchronous. Under ASGI (``core.asgi``) storage and cache
+access run in worker threads and file bodies are streamed by async
+iterators, so a worker serves many concurrent players; under WSGI Django
+adapts them and files are streamed as before.
+"""
+
+import hashlib
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import aget_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from .encoding import segment_content_type
+from .manifest_cache import get_rendition_manifest
+from .models import Video
+from .signing import SOURCE_RENDITION, signed_query, verify_stream_request
+from .storage import join_name, media_url
+from .segment_cache import schedule_prewarm
+from .segment_index import load_segment_index
+from .stream_catalog import get_stream_entry, stream_prefix
+from .streaming import CORS_HEADERS, SOURCE_CACHE_CONTROL, serve_media
+
+
+def manifest_response(content) -> HttpResponse:
+    """Build an uncached HLS playlist response."""
+    response = HttpResponse(content, content_type='application/vnd.apple.mpegurl')
+    response['Cache-Control'] = 'no-cache'
+    for header, value in CORS_HEADERS.items():
+        response[header] = value
+    return response
+
+
+async def serve_async(request, name: str, content_type: str = None, **kwargs):
+    """
+    Run ``serve_media`` off the event loop; the body is streamed with an
+    async iterator when the request came in through ASGI.
+    """
+    return await sync_to_async(serve_media, thread_sensitive=False)(
+        request, name, content_type, asynchronous=isinstance(request, ASGIRequest), **kwargs
+    )
+
+
+def manifest_window(request) -> dict:
+    """
+    Read the optional playlist window from the query string.
+
+    ``start`` and ``end`` trim the playlist to a time range, ``t`` sets the
+    resume position (all in seconds). Invalid values are ignored.
+    """
+    window = {}
+    for param, argument in (('start', 'start'), ('end', 'end'), ('t', 'resume')):
+        try:
+            value = float(request.GET[param])
+        except (KeyError, ValueError):
+            continue
+        if value >= 0:
+            window[argument] = value
+    return window
+
+
+@require_safe
+async def hls_manifest(request, movie_id, resolution):
+    """
+    Serve HLS manifest file for video streaming.
+    Segment URLs are absolute and signed for the requested rendition.
+    Indexed renditions are rendered from their segment index and accept
+    ``start``/``end`` (trimmed window) and ``t`` (resume position).
+    """
+    return await sync_to_async(build_manifest_response)(request, movie_id, resolution)
+
+
+def build_manifest_response(request, movie_id, resolution):
+    """Build the manifest response of ``hls_manifest`` (blocking)."""
+    entry = get_stream_entry(movie_id)
+    if not entry['available']:
+        raise Http404("Video not found")
+
+    rendition_prefix = entry['renditions'].get(resolution)
+    base_url = request.build_absolute_uri(f'/api/video/{movie_id}/{resolution}/')
+    query = signed_query(movie_id, resolution)
+    # Entries cached before manifests were recorded leave the lookup to try
+    manifests = entry.get('manifests')
+    for hls_prefix in filter(None, (rendition_prefix, entry['legacy'])):
+        index = None
+        if hls_prefix in entry.get('indexed', ()):
+            index = load_segment_index(hls_prefix, entry['version'])
+
+        if index is None and manifests is not None and hls_prefix not in manifests:
+            continue
+        if index is not None:
+            window = manifest_window(request)
+            content = index.render(base_url, query, **window)
+            cache_key = f'{hls_prefix}:{entry["version"]}:{base_url}:{query}:{sorted(window.items())}'
+        else:
+            try:
+                content, cache_key = get_rendition_manifest(
+                    movie_id, resolution, join_name(hls_prefix, 'index.m3u8'), base_url,
+                    entry['version'], query
+                )
+            except FileNotFoundError:
+                continue
+
+        schedule_prewarm(movie_id, entry)
+        etag = f'"{hashlib.sha1(cache_key.encode()).hexdigest()}"'
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = manifest_response(content)
+        response['ETag'] = etag
+        return response
+
+    if entry['source']:
+        if rendition_prefix:
+            video_url = request.build_absolute_uri(media_url(rendition_prefix))
+        else:
+            video_url = request.build_absolute_uri(
+                reverse('videos:video-source', kwargs={'movie_id': movie_id})
+            )
+            query = signed_query(movie_id, SOURCE_RENDITION)
+            if query:
+                video_url = f'{video_url}?{query}'
+
+        return manifest_response(f"""
+{video_url}
+""")
+
+    raise Http404("Video file not found")
+
+
+@require_safe
+async def hls_segment(request, movie_id, resolution, segment):
+    """
+    Serve HLS video segments for streaming.
+    Segments are streamed (or offloaded to the front proxy), never buffered,
+    and located through the stream catalog without database access.
+    """
+    if not verify_stream_request(request, movie_id, resolution):
+        return HttpResponseForbidden("Invalid or expired signature")
+
+    entry = await sync_to_async(get_stream_entry)(movie_id)
+    prefix = stream_prefix(entry, resolution)
+    if prefix:
+        return await serve_async(
+            request, join_name(prefix, segment), segment_content_type(segment),
+            cache_version=entry.get('version')
+        )
+
+    raise Http404("Segment not found")
+
+
+@require_safe
+async def video_source(request, movie_id):
+    """
+    Serve the original upload as a progressive MP4 fallback for players
+    without HLS support. Links are signed like segment URLs.
+    """
+    if not verify_stream_request(request, movie_id, SOURCE_RENDITION):
+        return HttpResponseForbidden("Invalid or expired signature")
+
+    video = await aget_object_or_404(Video, id=movie_id, is_processed=True)
+    if not video.video_file:
+        raise Http404("Video file not found")
+
+    return await serve_async(request, video.video_file.name, cache_control=SOURCE_CACHE_CONTROL)